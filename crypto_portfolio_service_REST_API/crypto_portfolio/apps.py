@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CryptoPortfolioConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "crypto_portfolio"
+
+    def ready(self):
+        # Register receiver profiling database queries of requests.
+        from . import metrics  # noqa: F401
@@ -0,0 +1,190 @@
+"""
+Offline benchmarks of API endpoints for portfolios of different sizes.
+"""
+import itertools
+import math
+import statistics
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from . import upstream
+from .catalog import reset_coin_search_index, sync_coin_catalog
+from .portfolio import add_coins
+from .prices import get_price_cache, refresh_held_coin_quotes
+
+
+DEFAULT_SIZES = [1, 10, 100, 1000]
+ENDPOINTS = ["user_create", "token_issue", "coin_add", "coin_list", "coin_delete", "available_coins"]
+BENCHMARK_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmark",
+    }
+}
+PASSWORD = "benchmark_password"
+
+
+class StubCoinGeckoAPI:
+    """Offline replacement of external API with deterministic quotes of synthetic coins.
+
+    Every call is counted.
+    """
+
+    api_base_url = "http://coingecko.invalid/api/v3/"
+    request_timeout = 1
+
+    def __init__(self, coins):
+        self.coin_ids = [f"benchcoin{index}" for index in range(coins)]
+        self._prices = {coin_id: 1 + index % 100 for index, coin_id in enumerate(self.coin_ids)}
+        self.calls = 0
+
+    def get_price(self, ids, vs_currencies, **kwargs):
+        self.calls += 1
+        ids = ids.split(",") if isinstance(ids, str) else ids
+        response = {}
+        for coin_id in ids:
+            if coin_id in self._prices:
+                response[coin_id] = {}
+                for vs_currency in vs_currencies.split(","):
+                    response[coin_id][vs_currency] = float(self._prices[coin_id])
+                    response[coin_id][f"{vs_currency}_24h_change"] = 1.0
+        return response
+
+    def get_coins_list(self, **kwargs):
+        self.calls += 1
+        return [{"id": coin_id, "symbol": coin_id[-4:], "name": coin_id.title()} for coin_id in self.coin_ids]
+
+    def get_coin_market_chart_by_id(self, id, vs_currency, days, **kwargs):
+        self.calls += 1
+        return {"prices": [[int(time.time() * 1000), float(self._prices.get(id, 0))]]}
+
+
+def _summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        "min": round(latencies[0], 3),
+        "median": round(statistics.median(latencies), 3),
+        "p95": round(latencies[math.ceil(0.95 * len(latencies)) - 1], 3),
+        "max": round(latencies[-1], 3),
+    }
+
+
+def _measure(provider, request):
+    """Return latency in ms, query count and upstream call count of request."""
+    upstream_calls = provider.calls
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = request()
+        latency = (time.perf_counter() - started) * 1000
+
+    if response.status_code >= 400:
+        raise RuntimeError(f"Benchmarked request failed with status {response.status_code}: {response.data}")
+
+    return latency, len(queries), provider.calls - upstream_calls
+
+
+def _benchmark_portfolio(provider, size, repeat, warmup):
+    """Return results of all endpoints for user with portfolio of size coins."""
+    anonymous = APIClient()
+    client = APIClient()
+    credentials = {"email": f"bench{size}@example.com", "username": f"bench{size}", "password": PASSWORD}
+    user = get_user_model().objects.create_user(**credentials)
+    add_coins(user, [(coin_id, Decimal(1)) for coin_id in provider.coin_ids[:size]])
+    refresh_held_coin_quotes()
+
+    token = anonymous.post(reverse("user:token"), credentials).data
+    client.credentials(HTTP_AUTHORIZATION=f"{token.get('token_type', 'Token')} {token['token']}")
+    extra_coin_id = provider.coin_ids[size]
+    counter = itertools.count()
+
+    def prepare_coin_delete():
+        coin = add_coins(user, [(extra_coin_id, Decimal(1))])[0]
+        return lambda: client.delete(reverse("crypto_portfolio:manage-detail", args=[coin.pk]))
+
+    def prepare_user_create():
+        number = next(counter)
+        payload = {"email": f"new{size}_{number}@example.com", "username": f"n{size}_{number}", "password": PASSWORD}
+        return lambda: anonymous.post(reverse("user:create"), payload)
+
+    scenarios = {
+        "user_create": prepare_user_create,
+        "token_issue": lambda: lambda: anonymous.post(reverse("user:token"), credentials),
+        "coin_add": lambda: lambda: client.post(
+            reverse("crypto_portfolio:manage-list"), {"name": provider.coin_ids[0], "amount": 1}
+        ),
+        "coin_list": lambda: lambda: client.get(reverse("crypto_portfolio:manage-list")),
+        "coin_delete": prepare_coin_delete,
+        "available_coins": lambda: lambda: client.get(reverse("crypto_portfolio:available_coins")),
+    }
+
+    results = []
+    for endpoint in ENDPOINTS:
+        measurements = [_measure(provider, scenarios[endpoint]()) for _ in range(warmup + repeat)][warmup:]
+        results.append({
+            "endpoint": endpoint,
+            "coins": size,
+            "latency_ms": _summarize([latency for latency, _, _ in measurements]),
+            "queries": max(queries for _, queries, _ in measurements),
+            "upstream_calls": max(calls for _, _, calls in measurements),
+        })
+
+    return results
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat=5, warmup=1):
+    """Return latency, query count and upstream call count of API endpoints for portfolios of selected sizes.
+
+    External API is replaced with offline stub and cache with local one. Data
+    created for every portfolio size is rolled back.
+    """
+    provider = StubCoinGeckoAPI(max(sizes) + 1)
+    results = []
+
+    with mock.patch.object(upstream, "cg", provider), override_settings(
+        CACHES=BENCHMARK_CACHES,
+        COINGECKO={"RATE_LIMIT": 10 ** 9},
+        PRICE_CACHE={"BACKEND": "local"},
+    ):
+        try:
+            with transaction.atomic():
+                sync_coin_catalog()
+                reset_coin_search_index()
+                for size in sizes:
+                    with transaction.atomic():
+                        results.extend(_benchmark_portfolio(provider, size, repeat, warmup))
+                        transaction.set_rollback(True)
+                transaction.set_rollback(True)
+        finally:
+            reset_coin_search_index()
+            get_price_cache().clear()
+
+    return results
+
+
+def compare_results(baseline, results):
+    """Return change of median latency, query count and upstream call count against baseline results."""
+    baseline = {(result["endpoint"], result["coins"]): result for result in baseline}
+    changes = []
+    for result in results:
+        previous = baseline.get((result["endpoint"], result["coins"]))
+        if previous is None:
+            continue
+        changes.append({
+            "endpoint": result["endpoint"],
+            "coins": result["coins"],
+            "latency_change_percent": round(
+                100 * (result["latency_ms"]["median"] / previous["latency_ms"]["median"] - 1), 1
+            ) if previous["latency_ms"]["median"] else None,
+            "queries_change": result["queries"] - previous["queries"],
+            "upstream_calls_change": result["upstream_calls"] - previous["upstream_calls"],
+        })
+
+    return changes
@@ -0,0 +1,111 @@
+"""
+Local catalog of cryptocurrencies available via external API.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from django.db import transaction
+
+from .config import get_config
+from .models import Coin
+from .upstream import get_coingecko_client
+
+
+def sync_coin_catalog():
+    """Synchronize Coin table with external API coins list.
+
+    Only new, changed and removed coins are written. Return number of each.
+    """
+    upstream_coins = {
+        coin["id"]: (coin["symbol"], coin["name"]) for coin in get_coingecko_client().get_coins_list() if coin.get("id")
+    }
+    stored_coins = {coin.coin_id: coin for coin in Coin.objects.all()}
+
+    coins_to_create = [
+        Coin(coin_id=coin_id, symbol=symbol, name=name)
+        for coin_id, (symbol, name) in upstream_coins.items()
+        if coin_id not in stored_coins
+    ]
+    coins_to_update = []
+    for coin_id, coin in stored_coins.items():
+        if coin_id in upstream_coins and (coin.symbol, coin.name) != upstream_coins[coin_id]:
+            coin.symbol, coin.name = upstream_coins[coin_id]
+            coins_to_update.append(coin)
+    coin_ids_to_delete = [coin_id for coin_id in stored_coins if coin_id not in upstream_coins]
+
+    with transaction.atomic():
+        Coin.objects.bulk_create(coins_to_create, batch_size=1000)
+        Coin.objects.bulk_update(coins_to_update, ["symbol", "name"], batch_size=1000)
+        Coin.objects.filter(coin_id__in=coin_ids_to_delete).delete()
+
+    if coins_to_create or coins_to_update or coin_ids_to_delete:
+        reset_coin_search_index()
+
+    return {
+        "created": len(coins_to_create),
+        "updated": len(coins_to_update),
+        "deleted": len(coin_ids_to_delete),
+    }
+
+
+class CoinSearchIndex:
+    """Coins catalog kept in memory for prefix and substring search.
+
+    Lowercase coin ids, symbols and names are kept in one sorted array, so coins
+    matching prefix are found with bisect. Substring matches are appended after them.
+    """
+
+    def __init__(self, coins):
+        self.coins = sorted(coins)
+        keys = sorted(
+            (key, position)
+            for position, (coin_id, symbol, name) in enumerate(self.coins)
+            for key in {coin_id.lower(), symbol.lower(), name.lower()}
+        )
+        self._keys = [key for key, _ in keys]
+        self._positions = [position for _, position in keys]
+        self._texts = ["\n".join(coin).lower() for coin in self.coins]
+
+    def search(self, query):
+        """Return (coin id, symbol, name) of coins matching query, prefix matches first."""
+        query = query.lower().strip()
+        if not query:
+            return self.coins
+
+        matched = {}
+        for index in range(bisect_left(self._keys, query), len(self._keys)):
+            if not self._keys[index].startswith(query):
+                break
+            matched.setdefault(self._positions[index])
+
+        for position, text in enumerate(self._texts):
+            if position not in matched and query in text:
+                matched[position] = None
+
+        return [self.coins[position] for position in matched]
+
+
+_coin_search_index = None
+_coin_search_index_expires_at = 0
+_coin_search_index_lock = threading.Lock()
+
+
+def get_coin_search_index():
+    """Return search index of coin catalog, rebuilt after INDEX_TTL seconds."""
+    global _coin_search_index, _coin_search_index_expires_at
+
+    with _coin_search_index_lock:
+        if _coin_search_index is None or _coin_search_index_expires_at <= time.monotonic():
+            _coin_search_index = CoinSearchIndex(Coin.objects.values_list("coin_id", "symbol", "name"))
+            _coin_search_index_expires_at = time.monotonic() + get_config("COIN_CATALOG")["INDEX_TTL"]
+
+        return _coin_search_index
+
+
+def reset_coin_search_index():
+    """Rebuild search index of coin catalog on next use."""
+    global _coin_search_index
+
+    with _coin_search_index_lock:
+        _coin_search_index = None
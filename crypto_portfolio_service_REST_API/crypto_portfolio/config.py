@@ -0,0 +1,59 @@
+"""
+Configuration of the crypto portfolio service, dict settings with default options.
+"""
+from django.conf import settings
+
+
+DEFAULTS = {
+    "AUTHENTICATION": {
+        "MODE": "token",
+        "CACHE_TTL": 300,
+        "CACHE_ALIAS": "default",
+    },
+    "COINGECKO": {
+        "RATE_LIMIT": 30,
+        "MAX_WAIT": 5,
+        "FAILURE_THRESHOLD": 3,
+        "RESET_TIMEOUT": 60,
+    },
+    "PRICE_CACHE": {
+        "BACKEND": "local",
+        "TTL": 60,
+        "MAX_SIZE": 1024,
+        "CACHE_ALIAS": "default",
+    },
+    "PRICE_QUOTES": {
+        "REFRESH_INTERVAL": 60,
+        "BATCH_SIZE": 250,
+        "MAX_AGE": 300,
+        "VS_CURRENCIES": ["usd", "eur", "gbp", "pln", "btc"],
+        "RATE_REFERENCE_COIN": "bitcoin",
+    },
+    "PORTFOLIO": {
+        "PARTICIPATION_MODE": "stored",
+        "SUMMARY_CACHE_TTL": 60,
+        "CACHE_ALIAS": "default",
+    },
+    "PORTFOLIO_SNAPSHOTS": {
+        "INTERVAL": 60 * 60,
+        "BATCH_SIZE": 1000,
+    },
+    "EXPORT": {
+        "CHUNK_SIZE": 2000,
+    },
+    "MARKET_CHARTS": {
+        "MAX_DAYS": 365,
+        "CACHE_TTL": 24 * 60 * 60,
+        "CACHE_ALIAS": "default",
+        "REFRESH_INTERVAL": 60 * 60,
+    },
+    "COIN_CATALOG": {
+        "SYNC_INTERVAL": 24 * 60 * 60,
+        "INDEX_TTL": 300,
+    },
+}
+
+
+def get_config(name):
+    """Return options of setting name, options missing in settings are taken from DEFAULTS."""
+    return {**DEFAULTS[name], **getattr(settings, name, {})}
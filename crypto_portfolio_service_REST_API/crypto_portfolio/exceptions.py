@@ -0,0 +1,22 @@
+"""
+Handling of errors raised by API views.
+"""
+import math
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler, set_rollback
+
+from .upstream import UpstreamUnavailableError
+
+
+def exception_handler(exc, context):
+    """Return 503 response for unavailable external API, default response of other errors."""
+    if isinstance(exc, UpstreamUnavailableError):
+        set_rollback()
+        headers = {}
+        if exc.retry_after is not None:
+            headers["Retry-After"] = str(math.ceil(exc.retry_after))
+        return Response({"detail": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers=headers)
+
+    return drf_exception_handler(exc, context)
@@ -0,0 +1,63 @@
+"""
+Exports of user holdings and portfolio history read from database in chunks.
+"""
+from .config import get_config
+from .models import Cryptocurrency, PortfolioSnapshot
+from .portfolio import is_participation_stored
+
+
+HOLDINGS_FIELDS = [
+    "id",
+    "name",
+    "amount",
+    "price",
+    "worth",
+    "cost_basis",
+    "realized_profit_loss",
+    "coin_profit_loss_percent_24h",
+    "coin_participation_in_portfolio",
+    "last_update",
+]
+HISTORY_FIELDS = ["taken_at", "total_value", "total_profit_loss", "coins"]
+
+
+def _iter_chunks(queryset, key_field, key_index, chunk_size):
+    """Yield rows of queryset ordered by unique key_field, reading chunk_size rows after the last key at a time.
+
+    Each chunk is a separate query, so no cursor or transaction stays open between them.
+    """
+    last_key = None
+    while True:
+        chunk = queryset if last_key is None else queryset.filter(**{f"{key_field}__gt": last_key})
+        rows = list(chunk.order_by(key_field)[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_key = rows[-1][key_index]
+
+
+def iter_holdings(user, chunk_size=None):
+    """Return iterator of rows of HOLDINGS_FIELDS of user coins, money values in USD."""
+    chunk_size = chunk_size or get_config("EXPORT")["CHUNK_SIZE"]
+    queryset = Cryptocurrency.objects.filter(user=user)
+    fields = HOLDINGS_FIELDS
+    if not is_participation_stored():
+        queryset = queryset.with_participation()
+        fields = [field if field != "coin_participation_in_portfolio" else "participation" for field in fields]
+
+    return _iter_chunks(queryset.values_list(*fields), "id", fields.index("id"), chunk_size)
+
+
+def iter_history(user, start=None, end=None, chunk_size=None):
+    """Return iterator of rows of HISTORY_FIELDS of user portfolio snapshots between start and end, oldest first."""
+    chunk_size = chunk_size or get_config("EXPORT")["CHUNK_SIZE"]
+    queryset = PortfolioSnapshot.objects.filter(user=user)
+    if start is not None:
+        queryset = queryset.filter(taken_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(taken_at__lte=end)
+
+    # Snapshots of user are unique by time they were taken at.
+    return _iter_chunks(
+        queryset.values_list(*HISTORY_FIELDS), "taken_at", HISTORY_FIELDS.index("taken_at"), chunk_size
+    )
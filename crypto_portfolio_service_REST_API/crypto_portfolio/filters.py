@@ -0,0 +1,60 @@
+"""
+Filtering and ordering of holdings in the crypto portfolio API.
+"""
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .portfolio import is_participation_stored
+
+
+class HoldingsOrderingFilter(OrderingFilter):
+    """Ordering of holdings by worth, participation or last update, e.g. "?ordering=-worth"."""
+
+    ordering_fields = {
+        "worth": "worth",
+        "participation": "coin_participation_in_portfolio",
+        "last_update": "last_update",
+    }
+
+    def get_model_field(self, field_name):
+        """Return model field or annotation ordered by selected public field name."""
+        if field_name == "participation" and not is_participation_stored():
+            return "participation"
+        return self.ordering_fields[field_name]
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if not params:
+            return self.get_default_ordering(view)
+
+        ordering = []
+        for param in params.split(","):
+            param = param.strip()
+            descending = param.startswith("-")
+            field_name = param.lstrip("-")
+            if field_name not in self.ordering_fields:
+                raise ValidationError({self.ordering_param: f"Unsupported ordering: {field_name}."})
+            ordering.append(("-" if descending else "") + self.get_model_field(field_name))
+
+        # Worth, participation and last update aren't unique, id keeps order of equal holdings stable between pages.
+        return ordering + ["id"]
+
+
+class HoldingsFilter(BaseFilterBackend):
+    """Filtering of holdings by minimum worth, e.g. "?min_worth=1" to skip dust tokens."""
+
+    def filter_queryset(self, request, queryset, view):
+        min_worth = request.query_params.get("min_worth")
+        if min_worth is None:
+            return queryset
+
+        try:
+            min_worth = Decimal(min_worth)
+        except InvalidOperation:
+            min_worth = None
+        if min_worth is None or not min_worth.is_finite():
+            raise ValidationError({"min_worth": "A valid number is required."})
+
+        return queryset.filter(worth__gte=min_worth)
@@ -0,0 +1,84 @@
+"""
+Time series of user portfolio value.
+"""
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from itertools import groupby
+
+from django.db.models import Avg, F
+from django.db.models.functions import Trunc
+
+from .config import get_config
+from .models import Cryptocurrency, PortfolioData, PortfolioSnapshot
+from .portfolio import CENTS, WORTH_PRECISION
+from .prices import format_coin_id, get_held_coin_prices
+
+
+HISTORY_INTERVALS = ["raw", "hour", "day", "week", "month"]
+
+
+def get_snapshot_time(now, interval):
+    """Return start of snapshot interval containing selected time."""
+    timestamp = int(now.timestamp()) // interval * interval
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def take_portfolio_snapshots(taken_at, batch_size=None):
+    """Record current value of all users portfolios, snapshots are saved in bulk.
+
+    Coins are valued with stored quotes, missing ones are fetched in batches,
+    coin without quote keeps its stored worth.
+    Snapshots already taken at selected time are kept. Return number of portfolios.
+    """
+    batch_size = batch_size or get_config("PORTFOLIO_SNAPSHOTS")["BATCH_SIZE"]
+    holdings = Cryptocurrency.objects.order_by("user_id").values_list("user_id", "name", "amount", "worth")
+    quotes = get_held_coin_prices()
+    initial_values = dict(PortfolioData.objects.values_list("user_id", "total_value"))
+
+    snapshots = []
+    portfolios = 0
+    for user_id, coins in groupby(holdings.iterator(chunk_size=batch_size), key=lambda coin: coin[0]):
+        coins_worth = {}
+        for _, name, amount, worth in coins:
+            quote = quotes.get(format_coin_id(name))
+            if quote is not None:
+                worth = (quote["price_in_usd"] * amount).quantize(WORTH_PRECISION)
+            coins_worth[name] = coins_worth.get(name, Decimal(0)) + worth
+
+        total_value = sum(coins_worth.values(), Decimal(0))
+        initial_value = initial_values.get(user_id, total_value)
+        snapshots.append(PortfolioSnapshot(
+            user_id=user_id,
+            taken_at=taken_at,
+            total_value=total_value,
+            total_profit_loss=(total_value - initial_value).quantize(CENTS),
+            coins={name: str(worth) for name, worth in coins_worth.items()},
+        ))
+        portfolios += 1
+
+        if len(snapshots) >= batch_size:
+            PortfolioSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+            snapshots = []
+
+    PortfolioSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+
+    return portfolios
+
+
+def get_portfolio_history(user, start, end, interval):
+    """Return portfolio value of user between start and end, averaged per interval by database."""
+    snapshots = PortfolioSnapshot.objects.filter(user=user, taken_at__gte=start, taken_at__lte=end)
+
+    if interval == "raw":
+        return list(
+            snapshots.order_by("taken_at").values(
+                "total_value", "total_profit_loss", "coins", time=F("taken_at")
+            )
+        )
+
+    return list(
+        snapshots.annotate(time=Trunc("taken_at", interval))
+        .values("time")
+        .annotate(total_value=Avg("total_value"), total_profit_loss=Avg("total_profit_loss"))
+        .order_by("time")
+    )
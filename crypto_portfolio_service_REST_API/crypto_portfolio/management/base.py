@@ -0,0 +1,54 @@
+"""
+Base of worker commands repeating their work at fixed intervals.
+"""
+import time
+from abc import ABC, abstractmethod
+
+from django.core.management.base import BaseCommand
+
+from crypto_portfolio.config import get_config
+
+
+class PeriodicCommand(BaseCommand, ABC):
+    """Worker calling run_once() every "--interval" seconds, or only once with "--once".
+
+    Default interval is read from interval_setting, (setting name, option). Failed
+    run is reported and retried after interval, with "--once" its error is raised.
+    """
+
+    interval_setting = None
+    interval_help = "Seconds between runs."
+    once_help = "Run once and exit."
+    failure_message = "Run failed"
+
+    def add_arguments(self, parser):
+        name, option = self.interval_setting
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=get_config(name)[option],
+            help=self.interval_help,
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help=self.once_help,
+        )
+
+    @abstractmethod
+    def run_once(self, **options):
+        """Do work of single run and return message about its result."""
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            try:
+                self.stdout.write(f"[INFO] --- {self.run_once(**options)} ---")
+            except Exception as error:
+                if options["once"]:
+                    raise
+                self.stderr.write(f"[ERROR] --- {self.failure_message}: {error} ---")
+
+            if options["once"]:
+                break
+            time.sleep(max(options["interval"] - (time.monotonic() - started), 0))
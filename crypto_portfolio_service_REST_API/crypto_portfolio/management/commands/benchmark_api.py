@@ -0,0 +1,103 @@
+"""
+Offline benchmark of API endpoints across portfolio sizes.
+"""
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from crypto_portfolio.benchmarks import DEFAULT_SIZES, compare_results, run_benchmarks
+
+
+class Command(BaseCommand):
+    """Measure API endpoints in separate test database with stubbed external API and save results as JSON."""
+
+    help = "Benchmark API endpoints for portfolios of different sizes without network access."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=DEFAULT_SIZES,
+            help="Numbers of coins in benchmarked portfolios.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Measured requests per endpoint and portfolio size.",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=1,
+            help="Not measured requests sent before measured ones.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Path of JSON file with results.",
+        )
+        parser.add_argument(
+            "--compare",
+            help="Path of JSON file with results of other version to compare with.",
+        )
+        parser.add_argument(
+            "--label",
+            default="",
+            help="Name of benchmarked version saved with results.",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep test database between runs.",
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1 or min(options["sizes"]) < 1:
+            raise CommandError("Repeat and portfolio sizes must be greater than 0.")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as baseline_file:
+                baseline = json.load(baseline_file)["results"]
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            results = run_benchmarks(options["sizes"], options["repeat"], options["warmup"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        self.stdout.write(f"{'endpoint':<16}{'coins':>6}{'median ms':>12}{'p95 ms':>10}{'queries':>9}{'upstream':>10}")
+        for result in results:
+            self.stdout.write(
+                f"{result['endpoint']:<16}{result['coins']:>6}{result['latency_ms']['median']:>12.2f}"
+                f"{result['latency_ms']['p95']:>10.2f}{result['queries']:>9}{result['upstream_calls']:>10}"
+            )
+
+        if baseline is not None:
+            for change in compare_results(baseline, results):
+                self.stdout.write(
+                    f"[INFO] --- {change['endpoint']} ({change['coins']} coins): "
+                    f"latency {change['latency_change_percent']}%, "
+                    f"queries {change['queries_change']:+d}, upstream calls {change['upstream_calls_change']:+d} ---"
+                )
+
+        if options["output"]:
+            report = {
+                "label": options["label"],
+                "created_at": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "repeat": options["repeat"],
+                "results": results,
+            }
+            with open(options["output"], "w") as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(f"[INFO] --- Saved results to {options['output']} ---")
@@ -0,0 +1,18 @@
+"""
+Worker warming market charts of all coins held in users portfolios.
+"""
+from crypto_portfolio.management.base import PeriodicCommand
+from crypto_portfolio.valuation import refresh_held_coin_market_charts
+
+
+class Command(PeriodicCommand):
+    """Fetch market charts of distinct held coins, so value curves of users are served from cache."""
+
+    help = "Warm cache of market charts of all coins held in users portfolios."
+    interval_setting = ("MARKET_CHARTS", "REFRESH_INTERVAL")
+    interval_help = "Seconds between refreshes."
+    once_help = "Refresh market charts once and exit."
+    failure_message = "Market charts refresh failed"
+
+    def run_once(self, **options):
+        return f"Refreshed market charts of {refresh_held_coin_market_charts()} coins"
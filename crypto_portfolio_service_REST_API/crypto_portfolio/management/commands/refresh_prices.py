@@ -0,0 +1,29 @@
+"""
+Worker refreshing quotes of all coins held in users portfolios.
+"""
+from crypto_portfolio.config import get_config
+from crypto_portfolio.management.base import PeriodicCommand
+from crypto_portfolio.prices import refresh_held_coin_quotes
+
+
+class Command(PeriodicCommand):
+    """Fetch quotes of distinct held coins in batches and store them in PriceQuote table."""
+
+    help = "Refresh quotes of all coins held in users portfolios."
+    interval_setting = ("PRICE_QUOTES", "REFRESH_INTERVAL")
+    interval_help = "Seconds between refreshes."
+    once_help = "Refresh quotes once and exit."
+    failure_message = "Quotes refresh failed"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=get_config("PRICE_QUOTES")["BATCH_SIZE"],
+            help="Number of coins fetched with single upstream call.",
+        )
+
+    def run_once(self, **options):
+        refreshed = refresh_held_coin_quotes(options["batch_size"])
+        return f"Refreshed {len(refreshed)} quotes"
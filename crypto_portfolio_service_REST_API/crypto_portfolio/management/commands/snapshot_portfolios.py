@@ -0,0 +1,32 @@
+"""
+Worker recording value of all users portfolios.
+"""
+from django.utils import timezone
+
+from crypto_portfolio.config import get_config
+from crypto_portfolio.history import get_snapshot_time, take_portfolio_snapshots
+from crypto_portfolio.management.base import PeriodicCommand
+
+
+class Command(PeriodicCommand):
+    """Save snapshots of all users portfolios in bulk at fixed intervals."""
+
+    help = "Record value of all users portfolios."
+    interval_setting = ("PORTFOLIO_SNAPSHOTS", "INTERVAL")
+    interval_help = "Seconds between snapshots."
+    once_help = "Take snapshots once and exit."
+    failure_message = "Portfolio snapshots failed"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=get_config("PORTFOLIO_SNAPSHOTS")["BATCH_SIZE"],
+            help="Number of snapshots saved with single query.",
+        )
+
+    def run_once(self, **options):
+        taken_at = get_snapshot_time(timezone.now(), options["interval"])
+        portfolios = take_portfolio_snapshots(taken_at, options["batch_size"])
+        return f"Saved snapshots of {portfolios} portfolios"
@@ -0,0 +1,19 @@
+"""
+Worker synchronizing local catalog of available coins.
+"""
+from crypto_portfolio.catalog import sync_coin_catalog
+from crypto_portfolio.management.base import PeriodicCommand
+
+
+class Command(PeriodicCommand):
+    """Synchronize Coin table with coins list of external API."""
+
+    help = "Synchronize catalog of available coins."
+    interval_setting = ("COIN_CATALOG", "SYNC_INTERVAL")
+    interval_help = "Seconds between synchronizations."
+    once_help = "Synchronize catalog once and exit."
+    failure_message = "Coins synchronization failed"
+
+    def run_once(self, **options):
+        result = sync_coin_catalog()
+        return f"Coins created: {result['created']}, updated: {result['updated']}, deleted: {result['deleted']}"
@@ -0,0 +1,153 @@
+"""
+Per request profiling and Prometheus metrics of API.
+"""
+import contextvars
+import os
+import time
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Wall time of request.",
+    ["view", "method", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries run by request.",
+    ["view"],
+    buckets=COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time of database queries run by request.",
+    ["view"],
+)
+REQUEST_UPSTREAM_CALLS = Histogram(
+    "http_request_upstream_calls",
+    "CoinGecko API calls made by request.",
+    ["view"],
+    buckets=COUNT_BUCKETS,
+)
+REQUEST_UPSTREAM_DURATION = Histogram(
+    "http_request_upstream_duration_seconds",
+    "Time of CoinGecko API calls made by request.",
+    ["view"],
+)
+UPSTREAM_CALL_DURATION = Histogram(
+    "coingecko_call_duration_seconds",
+    "Time of CoinGecko API calls, also made by workers.",
+    ["method", "outcome"],
+)
+PRICE_LOOKUPS = Counter(
+    "price_lookups",
+    "Coin quotes looked up by source they were found in, hit ratio of price cache is cache/all.",
+    ["source"],
+)
+
+_current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    """Wall time, database queries and CoinGecko calls of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_duration = 0.0
+        self.upstream_calls = 0
+        self.upstream_duration = 0.0
+
+    @property
+    def duration(self):
+        return time.perf_counter() - self.started
+
+    def activate(self):
+        """Make profile current one, return token restoring previous one."""
+        return _current_profile.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current_profile.reset(token)
+
+    def server_timing(self, duration):
+        """Return value of Server-Timing header, durations in ms."""
+        return ", ".join([
+            f'db;dur={self.db_duration * 1000:.1f};desc="{self.db_queries} queries"',
+            f'coingecko;dur={self.upstream_duration * 1000:.1f};desc="{self.upstream_calls} calls"',
+            f"total;dur={duration * 1000:.1f}",
+        ])
+
+    def observe(self, view, method, status, duration):
+        """Add request to Prometheus metrics of its view."""
+        REQUEST_DURATION.labels(view, method, status).observe(duration)
+        REQUEST_DB_QUERIES.labels(view).observe(self.db_queries)
+        REQUEST_DB_DURATION.labels(view).observe(self.db_duration)
+        REQUEST_UPSTREAM_CALLS.labels(view).observe(self.upstream_calls)
+        REQUEST_UPSTREAM_DURATION.labels(view).observe(self.upstream_duration)
+
+
+def profile_query(execute, sql, params, many, context):
+    """Database execute wrapper adding query to profile of current request, if any."""
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.db_queries += 1
+        profile.db_duration += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_profiler(sender, connection, **kwargs):
+    """Wrap queries of every new connection, profile is found by context, so it also works across threads."""
+    if profile_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(profile_query)
+
+
+def record_upstream_call(method, duration, outcome):
+    """Add CoinGecko call to metrics and to profile of current request, if any."""
+    UPSTREAM_CALL_DURATION.labels(method, outcome).observe(duration)
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.upstream_calls += 1
+        profile.upstream_duration += duration
+
+
+def record_price_lookups(cache=0, database=0, upstream=0):
+    """Add numbers of coin quotes found in price cache, PriceQuote table and fetched from upstream."""
+    for source, count in (("cache", cache), ("database", database), ("upstream", upstream)):
+        if count:
+            PRICE_LOOKUPS.labels(source).inc(count)
+
+
+def metrics_view(request):
+    """Return all metrics in Prometheus text format.
+
+    With PROMETHEUS_MULTIPROC_DIR environment variable set, metrics of all
+    server processes are collected from that directory.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
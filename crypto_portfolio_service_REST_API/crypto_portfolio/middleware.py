@@ -0,0 +1,64 @@
+"""
+Middleware of API.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import RequestProfile
+
+
+def get_view_name(request):
+    """Return name of view class or function which handled request."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+
+    view = getattr(match.func, "view_class", None) or getattr(match.func, "cls", None) or match.func
+    return getattr(view, "__name__", match.view_name)
+
+
+class RequestProfilingMiddleware:
+    """Measure wall time, database queries and CoinGecko calls of every request.
+
+    Totals are sent in Server-Timing header and added to Prometheus metrics
+    of view which handled request. Under ASGI server the middleware runs in
+    event loop, so async views aren't moved to a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        profile = RequestProfile()
+        token = profile.activate()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.deactivate(token)
+
+        return self._finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = profile.activate()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile.deactivate(token)
+
+        return self._finish(request, response, profile)
+
+    @staticmethod
+    def _finish(request, response, profile):
+        duration = profile.duration
+        response["Server-Timing"] = profile.server_timing(duration)
+        profile.observe(get_view_name(request), request.method, response.status_code, duration)
+
+        return response
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto_portfolio', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceQuote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('coin_id', models.CharField(max_length=100)),
+                ('vs_currency', models.CharField(default='usd', max_length=10)),
+                ('price', models.DecimalField(decimal_places=12, max_digits=30)),
+                ('change_24h_percent', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='pricequote',
+            constraint=models.UniqueConstraint(fields=('coin_id', 'vs_currency'), name='unique_price_quote_per_currency'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:23
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_outdated_portfolio_data(apps, schema_editor):
+    """Keep only the latest created PortfolioData row of each user."""
+    PortfolioData = apps.get_model('crypto_portfolio', 'PortfolioData')
+    latest_ids = PortfolioData.objects.values('user').annotate(latest_id=Max('id')).values('latest_id')
+    PortfolioData.objects.exclude(id__in=latest_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto_portfolio', '0002_price_quote'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_outdated_portfolio_data, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='portfoliodata',
+            constraint=models.UniqueConstraint(fields=('user',), name='unique_portfolio_data_per_user'),
+        ),
+    ]
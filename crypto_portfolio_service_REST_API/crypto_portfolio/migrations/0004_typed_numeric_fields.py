@@ -0,0 +1,133 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:25
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+CRYPTOCURRENCY_DECIMAL_FIELDS = {
+    'price': 12,
+    'amount': 18,
+    'worth': 8,
+    'coin_profit_loss_percent_24h': 2,
+    'coin_participation_in_portfolio': 2,
+}
+PORTFOLIO_DATA_DECIMAL_FIELDS = {
+    'total_value': 8,
+    'total_profit_loss': 2,
+    'total_profit_loss_percent': 2,
+    'total_profit_loss_24h': 2,
+    'total_profit_loss_percent_24h': 2,
+}
+
+
+def convert_decimal(value, decimal_places):
+    """Return stored text as numeric literal castable by database, 0 if it isn't a number."""
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        return '0'
+    if not number.is_finite():
+        return '0'
+    return str(number.quantize(Decimal(1).scaleb(-decimal_places)))
+
+
+def convert_datetime(value):
+    """Return stored text as ISO 8601 date with time zone, None if it isn't a date."""
+    try:
+        date = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date.isoformat()
+
+
+def convert_stored_values(apps, schema_editor):
+    """Convert text values to formats castable to numeric and timestamp columns."""
+    Cryptocurrency = apps.get_model('crypto_portfolio', 'Cryptocurrency')
+    PortfolioData = apps.get_model('crypto_portfolio', 'PortfolioData')
+
+    for coin in Cryptocurrency.objects.iterator():
+        for field, decimal_places in CRYPTOCURRENCY_DECIMAL_FIELDS.items():
+            setattr(coin, field, convert_decimal(getattr(coin, field), decimal_places))
+        coin.last_update = convert_datetime(coin.last_update)
+        coin.save(update_fields=[*CRYPTOCURRENCY_DECIMAL_FIELDS, 'last_update'])
+
+    for portfolio_data in PortfolioData.objects.iterator():
+        for field, decimal_places in PORTFOLIO_DATA_DECIMAL_FIELDS.items():
+            setattr(portfolio_data, field, convert_decimal(getattr(portfolio_data, field), decimal_places))
+        portfolio_data.save(update_fields=list(PORTFOLIO_DATA_DECIMAL_FIELDS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto_portfolio', '0003_single_portfolio_data_per_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cryptocurrency',
+            name='last_update',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(convert_stored_values, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cryptocurrency',
+            name='amount',
+            field=models.DecimalField(decimal_places=18, default=0, max_digits=36),
+        ),
+        migrations.AlterField(
+            model_name='cryptocurrency',
+            name='coin_participation_in_portfolio',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AlterField(
+            model_name='cryptocurrency',
+            name='coin_profit_loss_percent_24h',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='cryptocurrency',
+            name='last_update',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cryptocurrency',
+            name='price',
+            field=models.DecimalField(decimal_places=12, default=0, max_digits=30),
+        ),
+        migrations.AlterField(
+            model_name='cryptocurrency',
+            name='worth',
+            field=models.DecimalField(decimal_places=8, default=0, max_digits=30),
+        ),
+        migrations.AlterField(
+            model_name='portfoliodata',
+            name='total_profit_loss',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=30),
+        ),
+        migrations.AlterField(
+            model_name='portfoliodata',
+            name='total_profit_loss_24h',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=30),
+        ),
+        migrations.AlterField(
+            model_name='portfoliodata',
+            name='total_profit_loss_percent',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='portfoliodata',
+            name='total_profit_loss_percent_24h',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AlterField(
+            model_name='portfoliodata',
+            name='total_value',
+            field=models.DecimalField(decimal_places=8, default=0, max_digits=30),
+        ),
+    ]
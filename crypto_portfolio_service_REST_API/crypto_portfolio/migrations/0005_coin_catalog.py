@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto_portfolio', '0004_typed_numeric_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Coin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('coin_id', models.CharField(max_length=100, unique=True)),
+                ('symbol', models.CharField(max_length=100)),
+                ('name', models.CharField(max_length=200)),
+            ],
+        ),
+    ]
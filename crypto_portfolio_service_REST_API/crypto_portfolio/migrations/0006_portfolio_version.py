@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto_portfolio', '0005_coin_catalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfoliodata',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
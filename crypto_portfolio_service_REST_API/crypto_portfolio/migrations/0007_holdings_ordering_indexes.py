@@ -0,0 +1,25 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto_portfolio', '0006_portfolio_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cryptocurrency',
+            index=models.Index(fields=['user', 'worth'], name='crypto_user_worth_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cryptocurrency',
+            index=models.Index(fields=['user', 'coin_participation_in_portfolio'], name='crypto_user_participation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cryptocurrency',
+            index=models.Index(fields=['user', 'last_update'], name='crypto_user_last_update_idx'),
+        ),
+    ]
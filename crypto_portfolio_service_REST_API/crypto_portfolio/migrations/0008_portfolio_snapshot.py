@@ -0,0 +1,31 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('crypto_portfolio', '0007_holdings_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('total_value', models.DecimalField(decimal_places=8, max_digits=30)),
+                ('total_profit_loss', models.DecimalField(decimal_places=2, max_digits=30)),
+                ('coins', models.JSONField(default=dict)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='portfoliosnapshot',
+            constraint=models.UniqueConstraint(fields=('user', 'taken_at'), name='unique_portfolio_snapshot_per_time'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F
+from django.utils import timezone
+
+
+def open_ledger_with_current_positions(apps, schema_editor):
+    """Set cost basis of held coins and record them as initial buy trades at average price."""
+    Cryptocurrency = apps.get_model('crypto_portfolio', 'Cryptocurrency')
+    Trade = apps.get_model('crypto_portfolio', 'Trade')
+    Cryptocurrency.objects.update(cost_basis=F('price') * F('amount'))
+
+    now = timezone.now()
+    Trade.objects.bulk_create(
+        [
+            Trade(
+                user_id=coin.user_id,
+                coin=coin.name,
+                side='buy',
+                amount=coin.amount,
+                price=coin.price,
+                executed_at=coin.last_update or now,
+            )
+            for coin in Cryptocurrency.objects.filter(amount__gt=0).iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('crypto_portfolio', '0008_portfolio_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cryptocurrency',
+            name='cost_basis',
+            field=models.DecimalField(decimal_places=20, default=0, max_digits=50),
+        ),
+        migrations.AddField(
+            model_name='cryptocurrency',
+            name='realized_profit_loss',
+            field=models.DecimalField(decimal_places=8, default=0, max_digits=30),
+        ),
+        migrations.CreateModel(
+            name='Trade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('coin', models.CharField(max_length=30)),
+                ('side', models.CharField(choices=[('buy', 'Buy'), ('sell', 'Sell')], max_length=4)),
+                ('amount', models.DecimalField(decimal_places=18, max_digits=36)),
+                ('price', models.DecimalField(decimal_places=12, max_digits=30)),
+                ('executed_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trades', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'executed_at'], name='trade_user_executed_at_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger_with_current_positions, migrations.RunPython.noop),
+    ]
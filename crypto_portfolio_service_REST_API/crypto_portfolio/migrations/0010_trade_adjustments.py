@@ -0,0 +1,55 @@
+# Generated by Django 4.2.4 on 2026-10-18 18:05
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+
+def reconcile_ledger_with_positions(apps, schema_editor):
+    """Record adjustments of held amounts changed or removed without trade, so ledger matches positions."""
+    Cryptocurrency = apps.get_model('crypto_portfolio', 'Cryptocurrency')
+    Trade = apps.get_model('crypto_portfolio', 'Trade')
+
+    ledger_amounts = defaultdict(Decimal)
+    for user_id, coin, bought, sold in Trade.objects.values('user_id', 'coin').annotate(
+        bought=Sum('amount', filter=Q(side='buy')), sold=Sum('amount', filter=Q(side='sell'))
+    ).values_list('user_id', 'coin', 'bought', 'sold'):
+        ledger_amounts[(user_id, coin)] = (bought or 0) - (sold or 0)
+
+    held = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    for user_id, name, amount, price in Cryptocurrency.objects.values_list('user_id', 'name', 'amount', 'price'):
+        held[(user_id, name)][0] += amount
+        held[(user_id, name)][1] = price
+
+    now = timezone.now()
+    adjustments = []
+    for key in set(ledger_amounts) | set(held):
+        # Average cost of removed coins isn't known anymore, their adjustments have price 0.
+        amount, price = held.get(key, (Decimal(0), Decimal(0)))
+        change = amount - ledger_amounts.get(key, Decimal(0))
+        if change:
+            user_id, coin = key
+            adjustments.append(Trade(
+                user_id=user_id, coin=coin, side='adjust', amount=change, price=price, executed_at=now,
+            ))
+
+    Trade.objects.bulk_create(adjustments, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto_portfolio', '0009_trade_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trade',
+            name='side',
+            field=models.CharField(choices=[('buy', 'Buy'), ('sell', 'Sell'), ('adjust', 'Adjustment')], max_length=6),
+        ),
+        migrations.RunPython(reconcile_ledger_with_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.4 on 2026-10-18 19:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+import django.utils.timezone
+
+
+def fill_missing_last_update(apps, schema_editor):
+    """Set last_update of holdings without one to their latest trade, or to now for holdings without trades."""
+    Cryptocurrency = apps.get_model('crypto_portfolio', 'Cryptocurrency')
+    Trade = apps.get_model('crypto_portfolio', 'Trade')
+
+    latest_trade = Trade.objects.filter(
+        user_id=OuterRef('user_id'), coin=OuterRef('name'),
+    ).order_by('-executed_at').values('executed_at')[:1]
+    Cryptocurrency.objects.filter(last_update__isnull=True).update(
+        last_update=Coalesce(Subquery(latest_trade), Value(timezone.now())),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crypto_portfolio', '0010_trade_adjustments'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cryptocurrency',
+            name='crypto_user_worth_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cryptocurrency',
+            name='crypto_user_participation_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cryptocurrency',
+            name='crypto_user_last_update_idx',
+        ),
+        migrations.RunPython(fill_missing_last_update, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cryptocurrency',
+            name='last_update',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='cryptocurrency',
+            index=models.Index(fields=['user', 'worth', 'id'], name='crypto_user_worth_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cryptocurrency',
+            index=models.Index(fields=['user', 'coin_participation_in_portfolio', 'id'], name='crypto_user_particip_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cryptocurrency',
+            index=models.Index(fields=['user', 'last_update', 'id'], name='crypto_user_last_update_id_idx'),
+        ),
+    ]
@@ -1,5 +1,46 @@
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, NullIf, Round
 from django.conf import settings
+from django.utils import timezone
+
+
+class CryptocurrencyQuerySet(models.QuerySet):
+    """Aggregations of cryptocurrencies computed by database."""
+
+    def total_value(self):
+        """Return summed worth of coins in queryset."""
+        return self.aggregate(total_value=Coalesce(Sum("worth"), Value(0), output_field=DecimalField()))[
+            "total_value"
+        ]
+
+    def with_participation(self):
+        """Annotate coins with total value of their user portfolio and participation percent in it.
+
+        Total value is summed over all user coins, so it isn't affected by filters applied to queryset.
+        """
+        portfolio_total_value = (
+            Cryptocurrency.objects.filter(user=OuterRef("user"))
+            .order_by()
+            .values("user")
+            .annotate(total_value=Sum("worth"))
+            .values("total_value")
+        )
+        return self.annotate(
+            portfolio_total_value=Subquery(portfolio_total_value, output_field=DecimalField()),
+        ).annotate(
+            participation=Coalesce(
+                Round(
+                    ExpressionWrapper(
+                        100 * F("worth") / NullIf(F("portfolio_total_value"), 0),
+                        output_field=DecimalField(),
+                    ),
+                    2,
+                ),
+                Value(0),
+                output_field=DecimalField(),
+            ),
+        )
 
 
 class Cryptocurrency(models.Model):
@@ -9,12 +50,27 @@ class Cryptocurrency(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="crypto"
     )
     name = models.CharField(max_length=30)
-    price = models.CharField(default=0)
-    amount = models.CharField(default=0)
-    worth = models.CharField(default=0)
-    coin_profit_loss_percent_24h = models.CharField(default=0)
-    coin_participation_in_portfolio = models.CharField(default=0)
-    last_update = models.CharField(max_length=50, default="")
+    price = models.DecimalField(max_digits=30, decimal_places=12, default=0)
+    amount = models.DecimalField(max_digits=36, decimal_places=18, default=0)
+    worth = models.DecimalField(max_digits=30, decimal_places=8, default=0)
+    coin_profit_loss_percent_24h = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    coin_participation_in_portfolio = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    last_update = models.DateTimeField(default=timezone.now)
+    # Position aggregates kept up to date with every trade, price is average cost of held amount.
+    cost_basis = models.DecimalField(max_digits=50, decimal_places=20, default=0)
+    realized_profit_loss = models.DecimalField(max_digits=30, decimal_places=8, default=0)
+
+    objects = CryptocurrencyQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Holdings are ordered by these fields with id as tiebreaker.
+            models.Index(fields=["user", "worth", "id"], name="crypto_user_worth_id_idx"),
+            models.Index(
+                fields=["user", "coin_participation_in_portfolio", "id"], name="crypto_user_particip_id_idx"
+            ),
+            models.Index(fields=["user", "last_update", "id"], name="crypto_user_last_update_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -26,11 +82,105 @@ class PortfolioData(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="general_data"
     )
-    total_value = models.CharField(default=0)
-    total_profit_loss = models.CharField(default=0)
-    total_profit_loss_percent = models.CharField(default=0)
-    total_profit_loss_24h = models.CharField(default=0)
-    total_profit_loss_percent_24h = models.CharField(default=0)
+    total_value = models.DecimalField(max_digits=30, decimal_places=8, default=0)
+    total_profit_loss = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    total_profit_loss_percent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_profit_loss_24h = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    total_profit_loss_percent_24h = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Increased on every change of user portfolio, used as validator of cached responses.
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user"], name="unique_portfolio_data_per_user"),
+        ]
 
     def __str__(self):
         return f"{self.user}'s portfolio"
+
+
+class PriceQuote(models.Model):
+    """This class represents latest cryptocurrency quote fetched from external API."""
+
+    coin_id = models.CharField(max_length=100)
+    vs_currency = models.CharField(max_length=10, default="usd")
+    price = models.DecimalField(max_digits=30, decimal_places=12)
+    change_24h_percent = models.DecimalField(max_digits=12, decimal_places=2)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["coin_id", "vs_currency"], name="unique_price_quote_per_currency"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.coin_id}/{self.vs_currency}"
+
+
+class Coin(models.Model):
+    """This class represents cryptocurrency available via external API."""
+
+    coin_id = models.CharField(max_length=100, unique=True)
+    symbol = models.CharField(max_length=100)
+    name = models.CharField(max_length=200)
+
+    def __str__(self):
+        return self.name
+
+
+class PortfolioSnapshot(models.Model):
+    """This class represents value of user portfolio at selected time."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="snapshots"
+    )
+    taken_at = models.DateTimeField()
+    total_value = models.DecimalField(max_digits=30, decimal_places=8)
+    total_profit_loss = models.DecimalField(max_digits=30, decimal_places=2)
+    # Current worth of each coin in portfolio, {coin name: worth}.
+    coins = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "taken_at"], name="unique_portfolio_snapshot_per_time"),
+        ]
+
+    def __str__(self):
+        return f"{self.user}'s portfolio at {self.taken_at}"
+
+
+class Trade(models.Model):
+    """This class represents buy or sell of cryptocurrency, trades aren't changed once saved.
+
+    Adjustment records correction or removal of held amount which isn't a trade,
+    its amount is signed change of held amount and price is average cost of change.
+    """
+
+    BUY = "buy"
+    SELL = "sell"
+    ADJUST = "adjust"
+    SIDE_CHOICES = [(BUY, "Buy"), (SELL, "Sell"), (ADJUST, "Adjustment")]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="trades"
+    )
+    coin = models.CharField(max_length=30)
+    side = models.CharField(max_length=6, choices=SIDE_CHOICES)
+    amount = models.DecimalField(max_digits=36, decimal_places=18)
+    price = models.DecimalField(max_digits=30, decimal_places=12)
+    executed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "executed_at"], name="trade_user_executed_at_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Saved trade can't be changed!")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.side} {self.amount} {self.coin}"
@@ -0,0 +1,41 @@
+"""
+Pagination classes for the crypto portfolio API.
+"""
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class AvailableCoinsPagination(PageNumberPagination):
+    """Pagination of available coins, results are returned under "available_coins" key."""
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 250
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("count", self.page.paginator.count),
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("available_coins", data),
+        ]))
+
+
+class HoldingsCursorPagination(CursorPagination):
+    """Cursor pagination of user holdings, ordered by id unless other ordering was requested."""
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = "id"
+
+
+class TradesCursorPagination(CursorPagination):
+    """Cursor pagination of user trades, the newest first."""
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = "-id"
@@ -0,0 +1,490 @@
+"""
+Calculations of data related with user cryptocurrency portfolio.
+"""
+from collections import defaultdict, deque
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .config import get_config
+from .models import Cryptocurrency, PortfolioData, Trade
+from .prices import format_coin_id, get_coin_quote, get_prices
+
+
+CENTS = Decimal("0.01")
+PRICE_PRECISION = Decimal("1e-12")
+WORTH_PRECISION = Decimal("1e-8")
+
+
+def is_participation_stored():
+    """Return True if coins participation is saved in database, False if derived at read time."""
+    return get_config("PORTFOLIO")["PARTICIPATION_MODE"] == "stored"
+
+
+def calculate_worth_of_added_coin(coin_price_usd, amount):
+    """Calculate current worth of added cryptocurrency in USD."""
+    try:
+        return (coin_price_usd * amount).quantize(WORTH_PRECISION)
+    except Exception:
+        raise Exception("Entered coin amount can't be less than 0!")
+
+
+class TradeError(Exception):
+    """Raised when trade can't be executed with user portfolio."""
+
+
+def calculate_average_price(cost_basis, amount, current_price):
+    """Return average cost of coin amount, current price if nothing is held."""
+    if not amount:
+        return current_price
+
+    return (cost_basis / amount).quantize(PRICE_PRECISION)
+
+
+def calculate_total_profit_loss_in_percent(total_value, total_profit_loss, total_profit_loss_24h):
+    """Calculate current and initial coins value, return profit/loss balance in percent."""
+    result = {
+        'total_profit_loss_percent': None,
+        'total_profit_loss_percent_24h': None,
+    }
+    if not total_value:
+        result['total_profit_loss_percent'] = Decimal(0)
+        result['total_profit_loss_percent_24h'] = Decimal(0)
+        return result
+
+    result['total_profit_loss_percent'] = ((100 * total_profit_loss) / total_value).quantize(CENTS)
+    result['total_profit_loss_percent_24h'] = ((100 * total_profit_loss_24h) / total_value).quantize(CENTS)
+
+    return result
+
+
+def lock_portfolio(user):
+    """Lock user row until end of current transaction.
+
+    Every portfolio change of user takes this lock first, so concurrent changes,
+    also ones adding new coins, run one after another.
+    """
+    list(get_user_model().objects.select_for_update().filter(pk=user.pk).values_list("pk", flat=True))
+
+
+def complete_quotes(quotes, coin_names):
+    """Return quotes extended by quotes of coins missing in them, e.g. coins added by concurrent request."""
+    missing_coin_names = [coin_name for coin_name in coin_names if format_coin_id(coin_name) not in quotes]
+    if not missing_coin_names:
+        return quotes
+
+    return {**quotes, **get_prices(missing_coin_names)}
+
+
+class HoldingsSnapshot:
+    """Coins of user portfolio loaded once and shared by all portfolio calculations.
+
+    Snapshot loaded for update locks portfolio of user and its coins until end of
+    current transaction, changes written back from it can't overwrite concurrent ones.
+    """
+
+    def __init__(self, user, for_update=False):
+        self.user = user
+        coins = user.crypto.all()
+        if for_update:
+            lock_portfolio(user)
+            coins = coins.select_for_update()
+        self.coins = list(coins)
+
+    @property
+    def coin_names(self):
+        """Return names of coins in portfolio."""
+        return [coin.name for coin in self.coins]
+
+    def get(self, coin_name):
+        """Return coin with selected name or None if it isn't in portfolio."""
+        for coin in self.coins:
+            if coin.name == coin_name:
+                return coin
+        return None
+
+    def add(self, coin):
+        """Add created coin to snapshot."""
+        self.coins.append(coin)
+
+    def remove(self, coins_to_remove):
+        """Remove deleted coins from snapshot."""
+        removed_ids = {coin.id for coin in coins_to_remove}
+        self.coins = [coin for coin in self.coins if coin.id not in removed_ids]
+
+    def calculate_coins_participation_in_portfolio(self, total_value):
+        """Calculate participation percent for coins in portfolio in single pass.
+
+        Return coins which participation changed.
+        """
+        changed_coins = []
+
+        for coin in self.coins:
+            if total_value:
+                participation = (100 * coin.worth / total_value).quantize(CENTS, ROUND_HALF_UP)
+            else:
+                participation = Decimal(0)
+            # Participation derived at read time is attached to coin the same way database annotates it.
+            coin.participation = participation
+
+            if coin.coin_participation_in_portfolio != participation:
+                coin.coin_participation_in_portfolio = participation
+                changed_coins.append(coin)
+
+        return changed_coins
+
+    def calculate_total_profit_loss_in_usd(self, quotes, initial_total_value):
+        """Calculate current coins value, return profit/loss balance in usd."""
+        result = {
+            'total_balance_in_usd': None,
+            'total_balance_in_usd_24h': None,
+        }
+        current_total_value = Decimal(0)
+        total_value_24h = Decimal(0)
+
+        for coin in self.coins:
+            coin_price = get_coin_quote(quotes, coin.name)
+            current_total_value += coin_price['price_in_usd'] * coin.amount
+
+            # Get coin price 24h diff in percent -> calculate each coin price 24h ago -> sum all coin prices.
+            coin_diff_24h = coin_price['change_24h_percent']
+            coin_price_24h = coin_price['price_in_usd'] * (1 + (coin_diff_24h / 100))
+            total_value_24h += coin_price_24h * coin.amount
+
+        result['total_balance_in_usd'] = (current_total_value - initial_total_value).quantize(CENTS)
+        result['total_balance_in_usd_24h'] = (total_value_24h - initial_total_value).quantize(CENTS)
+
+        return result
+
+
+def get_portfolio_version(user):
+    """Return version of user portfolio read from database, increased on every portfolio change."""
+    return PortfolioData.objects.filter(user=user).values_list("version", flat=True).first() or 0
+
+
+def get_portfolio_summary(user, version=None):
+    """Return PortfolioData of user from cache entry of its current version, read from database on cache miss.
+
+    Cache entry is keyed by version read from database, so changed portfolio is
+    never served from entry cached by other process. User without portfolio
+    data gets empty, not saved one.
+    """
+    if version is None:
+        version = get_portfolio_version(user)
+
+    config = get_config("PORTFOLIO")
+    cache = caches[config["CACHE_ALIAS"]]
+    cache_key = f"portfolio_data:{user.pk}:{version}"
+
+    portfolio_data = cache.get(cache_key)
+    if portfolio_data is None:
+        portfolio_data = PortfolioData.objects.filter(user=user).first() or PortfolioData(user_id=user.pk)
+        cache.set(cache_key, portfolio_data, timeout=config["SUMMARY_CACHE_TTL"])
+
+    return portfolio_data
+
+
+def update_portfolio_data(snapshot, worth_delta, quotes=None):
+    """Apply change of portfolio worth to the single PortfolioData row of user.
+
+    Total value is moved by worth delta of changed holdings, all other totals
+    are recalculated from snapshot and current quotes. Changed coins participation
+    is saved with single bulk update unless it is derived at read time.
+    Portfolio version is increased with every update.
+    """
+    if quotes is None:
+        quotes = get_prices(snapshot.coin_names)
+
+    user = snapshot.user
+    with transaction.atomic():
+        portfolio_data = PortfolioData.objects.select_for_update().filter(user=user).first()
+        if portfolio_data is None:
+            portfolio_data = PortfolioData(user=user, total_value=user.crypto.total_value() - worth_delta)
+        total_value = portfolio_data.total_value + worth_delta
+
+        total_profit_loss_in_usd = snapshot.calculate_total_profit_loss_in_usd(quotes, total_value)
+        total_profit_loss = total_profit_loss_in_usd['total_balance_in_usd']
+        total_profit_loss_24h = total_profit_loss_in_usd['total_balance_in_usd_24h']
+        calculated_balance = calculate_total_profit_loss_in_percent(total_value,
+                                                                    total_profit_loss,
+                                                                    total_profit_loss_24h)
+
+        portfolio_data.total_value = total_value
+        portfolio_data.total_profit_loss = total_profit_loss
+        portfolio_data.total_profit_loss_percent = calculated_balance['total_profit_loss_percent']
+        portfolio_data.total_profit_loss_24h = total_profit_loss_24h
+        portfolio_data.total_profit_loss_percent_24h = calculated_balance['total_profit_loss_percent_24h']
+        portfolio_data.version += 1
+        portfolio_data.save()
+
+        changed_coins = snapshot.calculate_coins_participation_in_portfolio(total_value)
+        if changed_coins and is_participation_stored():
+            Cryptocurrency.objects.bulk_update(changed_coins, ["coin_participation_in_portfolio"])
+
+    return portfolio_data
+
+
+def add_coins(user, coins_to_add):
+    """Add list of (coin name, amount) to user portfolio and return added coins.
+
+    Quotes of all coins are resolved with single lookup before transaction is
+    opened, coins are saved in one transaction and portfolio data is recalculated once.
+    """
+    # Fetch quotes of added coins and all coins needed for recalculation at once.
+    held_coin_names = list(user.crypto.values_list("name", flat=True))
+    quotes = get_prices(held_coin_names + [coin_name for coin_name, _ in coins_to_add])
+
+    with transaction.atomic():
+        # Load locked portfolio once, all calculations below share this snapshot.
+        snapshot = HoldingsSnapshot(user, for_update=True)
+        quotes = complete_quotes(quotes, snapshot.coin_names)
+
+        return _add_coins(snapshot, coins_to_add, quotes)
+
+
+def _add_coins(snapshot, coins_to_add, quotes):
+    """Add coins to locked snapshot and save them, return added coins."""
+    user = snapshot.user
+    now = timezone.now()
+    worth_delta = Decimal(0)
+    coins_to_create = []
+    coins_to_update = {}
+    added_coins = []
+    trades = []
+
+    for coin_name, coin_amount in coins_to_add:
+        coin_price = get_coin_quote(quotes, coin_name)
+        worth = calculate_worth_of_added_coin(coin_price["price_in_usd"], coin_amount)
+        trades.append(Trade(
+            user=user,
+            coin=coin_name,
+            side=Trade.BUY,
+            amount=coin_amount,
+            price=coin_price["price_in_usd"].quantize(PRICE_PRECISION),
+            executed_at=now,
+        ))
+
+        coin = snapshot.get(coin_name)
+        if coin is not None:
+            coin.cost_basis = coin.cost_basis + coin_price["price_in_usd"] * coin_amount
+            coin.amount = coin.amount + coin_amount
+            coin.price = calculate_average_price(coin.cost_basis, coin.amount, coin_price["price_in_usd"])
+            coin.worth = coin.worth + worth
+            coin.coin_profit_loss_percent_24h = coin_price["change_24h_percent"]
+            coin.last_update = now
+            if coin.pk is not None:
+                coins_to_update[coin.pk] = coin
+        else:
+            coin = Cryptocurrency(
+                user=user,
+                name=coin_name,
+                price=coin_price["price_in_usd"].quantize(PRICE_PRECISION),
+                amount=coin_amount,
+                worth=worth,
+                cost_basis=coin_price["price_in_usd"] * coin_amount,
+                coin_profit_loss_percent_24h=coin_price["change_24h_percent"],
+                last_update=now,
+            )
+            coins_to_create.append(coin)
+            snapshot.add(coin)
+
+        worth_delta += worth
+        added_coins.append(coin)
+
+    Cryptocurrency.objects.bulk_create(coins_to_create)
+    Cryptocurrency.objects.bulk_update(
+        coins_to_update.values(),
+        ["price", "amount", "worth", "cost_basis", "coin_profit_loss_percent_24h", "last_update"],
+    )
+    Trade.objects.bulk_create(trades)
+    update_portfolio_data(snapshot, worth_delta, quotes)
+
+    return added_coins
+
+
+def sell_coins(user, coins_to_sell):
+    """Sell list of (coin name, amount) from user portfolio at current price and return sold coins.
+
+    Sold amount is taken out of position at its average cost, difference to
+    current price is added to realized profit/loss of position.
+    """
+    quotes = get_prices(user.crypto.values_list("name", flat=True))
+
+    with transaction.atomic():
+        snapshot = HoldingsSnapshot(user, for_update=True)
+        quotes = complete_quotes(quotes, snapshot.coin_names)
+
+        return _sell_coins(snapshot, coins_to_sell, quotes)
+
+
+def _sell_coins(snapshot, coins_to_sell, quotes):
+    """Sell coins from locked snapshot and save them, return sold coins."""
+    user = snapshot.user
+    now = timezone.now()
+    worth_delta = Decimal(0)
+    sold_coins = {}
+    trades = []
+
+    for coin_name, coin_amount in coins_to_sell:
+        coin = snapshot.get(coin_name)
+        if coin is None:
+            raise TradeError(f"Cryptocurrency {coin_name} isn't in portfolio!")
+        if coin_amount <= 0:
+            raise TradeError(f"Entered amount of {coin_name} must be greater than 0!")
+        if coin_amount > coin.amount:
+            raise TradeError(f"Entered amount of {coin_name} is greater than held one!")
+        coin_price = get_coin_quote(quotes, coin_name)["price_in_usd"]
+
+        # Fully sold position has nothing left to take cost from.
+        sold_cost = coin.cost_basis * coin_amount / coin.amount if coin.amount else Decimal(0)
+        coin.realized_profit_loss += (coin_price * coin_amount - sold_cost).quantize(WORTH_PRECISION)
+        coin.cost_basis -= sold_cost
+        coin.amount -= coin_amount
+
+        worth = coin.cost_basis.quantize(WORTH_PRECISION)
+        worth_delta += worth - coin.worth
+        coin.worth = worth
+        coin.last_update = now
+        sold_coins[coin.pk] = coin
+        trades.append(Trade(
+            user=user,
+            coin=coin.name,
+            side=Trade.SELL,
+            amount=coin_amount,
+            price=coin_price.quantize(PRICE_PRECISION),
+            executed_at=now,
+        ))
+
+    Cryptocurrency.objects.bulk_update(
+        sold_coins.values(), ["amount", "worth", "cost_basis", "realized_profit_loss", "last_update"]
+    )
+    Trade.objects.bulk_create(trades)
+    update_portfolio_data(snapshot, worth_delta, quotes)
+
+    return list(sold_coins.values())
+
+
+def new_adjustment(coin, amount_change, executed_at):
+    """Return adjustment of held amount of coin by amount change at average cost of position, not saved."""
+    return Trade(
+        user_id=coin.user_id,
+        coin=coin.name,
+        side=Trade.ADJUST,
+        amount=amount_change,
+        price=calculate_average_price(coin.cost_basis, coin.amount, coin.price),
+        executed_at=executed_at,
+    )
+
+
+def change_coin_amount(user, coin_name, coin_amount):
+    """Correct amount of coin in user portfolio and return corrected coin.
+
+    Correction isn't a trade, average cost of position is kept and change is
+    recorded in ledger as adjustment. Quotes are resolved before transaction is
+    opened, so upstream failure doesn't leave totals out of sync and upstream
+    calls don't hold database locks.
+    """
+    quotes = get_prices(user.crypto.values_list("name", flat=True))
+
+    with transaction.atomic():
+        snapshot = HoldingsSnapshot(user, for_update=True)
+        quotes = complete_quotes(quotes, snapshot.coin_names)
+        coin = snapshot.get(coin_name)
+        if coin is None:
+            raise TradeError(f"Cryptocurrency {coin_name} isn't in portfolio!")
+        worth_before = coin.worth
+        now = timezone.now()
+        adjustment = new_adjustment(coin, coin_amount - coin.amount, now)
+
+        coin.cost_basis = coin.cost_basis * coin_amount / coin.amount if coin.amount else coin.price * coin_amount
+        coin.amount = coin_amount
+        coin.worth = calculate_worth_of_added_coin(coin.price, coin_amount)
+        coin.last_update = now
+
+        coin.save()
+        if adjustment.amount:
+            adjustment.save()
+        update_portfolio_data(snapshot, coin.worth - worth_before, quotes)
+
+    return coin
+
+
+def calculate_realized_profit_loss(user, method="fifo"):
+    """Return realized profit/loss of each coin replayed from user trades in single pass.
+
+    Method "fifo" matches sells with the oldest bought lots, "average" with average cost.
+    Adjustments add lots at their price or take amount out like sells, without realizing profit/loss.
+    """
+    lots = defaultdict(deque)
+    positions = defaultdict(lambda: [Decimal(0), Decimal(0)])
+    realized = defaultdict(Decimal)
+
+    trades = user.trades.order_by("executed_at", "id").values_list("coin", "side", "amount", "price")
+    for coin, side, amount, price in trades.iterator():
+        if side == Trade.BUY or (side == Trade.ADJUST and amount > 0):
+            lots[coin].append([amount, price])
+            positions[coin][0] += amount
+            positions[coin][1] += amount * price
+            continue
+
+        is_sell = side == Trade.SELL
+        amount = abs(amount)
+        if method == "fifo":
+            while amount and lots[coin]:
+                lot = lots[coin][0]
+                matched = min(amount, lot[0])
+                if is_sell:
+                    realized[coin] += matched * (price - lot[1])
+                lot[0] -= matched
+                amount -= matched
+                if not lot[0]:
+                    lots[coin].popleft()
+        else:
+            position = positions[coin]
+            if position[0]:
+                sold_amount = min(amount, position[0])
+                sold_cost = position[1] * sold_amount / position[0]
+                if is_sell:
+                    realized[coin] += sold_amount * price - sold_cost
+                position[1] -= sold_cost
+                position[0] -= sold_amount
+
+    return {coin: value.quantize(CENTS) for coin, value in realized.items()}
+
+
+def remove_coins(user, coin_names=(), coin_ids=()):
+    """Remove coins selected by names or ids from user portfolio and return removed coins.
+
+    Coins are deleted with single query, their removal is recorded in ledger as
+    adjustments and portfolio data is updated by their worth.
+    Quotes of remaining coins are resolved before transaction is opened, so
+    upstream calls don't hold database locks.
+    """
+    coin_names = set(coin_names)
+    coin_ids = set(coin_ids)
+
+    def is_removed(coin_id, coin_name):
+        return coin_name in coin_names or coin_id in coin_ids
+
+    held_coins = user.crypto.values_list("id", "name")
+    quotes = get_prices([coin_name for coin_id, coin_name in held_coins if not is_removed(coin_id, coin_name)])
+
+    with transaction.atomic():
+        snapshot = HoldingsSnapshot(user, for_update=True)
+        coins_to_remove = [coin for coin in snapshot.coins if is_removed(coin.id, coin.name)]
+        if not coins_to_remove:
+            return []
+
+        snapshot.remove(coins_to_remove)
+        quotes = complete_quotes(quotes, snapshot.coin_names)
+        user.crypto.filter(id__in=[coin.id for coin in coins_to_remove]).delete()
+        now = timezone.now()
+        Trade.objects.bulk_create([
+            new_adjustment(coin, -coin.amount, now) for coin in coins_to_remove if coin.amount
+        ])
+        update_portfolio_data(snapshot, -sum(coin.worth for coin in coins_to_remove), quotes)
+
+    return coins_to_remove
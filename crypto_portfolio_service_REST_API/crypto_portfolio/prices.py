@@ -0,0 +1,417 @@
+"""
+Price lookup layer for cryptocurrency portfolio.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+import httpx
+
+from .config import get_config
+from .metrics import record_price_lookups
+from .models import Cryptocurrency, PriceQuote
+from .upstream import cg, get_coingecko_client
+
+
+class CoinNotFoundError(Exception):
+    """Raised when quote of selected cryptocurrency isn't available."""
+
+
+class LocalPriceCache:
+    """Per process cache of coin quotes with time to live and LRU eviction."""
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        """Return not expired quotes for selected (coin id, vs currency) keys."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, quote = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = quote
+
+        return found
+
+    def set_many(self, quotes):
+        """Store quotes and evict least recently used ones above size limit."""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, quote in quotes.items():
+                self._entries[key] = (expires_at, quote)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached quotes."""
+        with self._lock:
+            self._entries.clear()
+
+    async def aget_many(self, keys):
+        """Return not expired quotes, in-memory lookup doesn't block event loop."""
+        return self.get_many(keys)
+
+    async def aset_many(self, quotes):
+        """Store quotes, in-memory write doesn't block event loop."""
+        self.set_many(quotes)
+
+
+class DjangoPriceCache:
+    """Cache of coin quotes shared between processes via Django cache framework.
+
+    Eviction is left to configured cache backend.
+    """
+
+    key_prefix = "coin_quote"
+
+    def __init__(self, ttl, cache_alias):
+        self.ttl = ttl
+        self.cache = caches[cache_alias]
+
+    def _make_key(self, key):
+        coin_id, vs_currency = key
+        return f"{self.key_prefix}:{coin_id}:{vs_currency}"
+
+    def get_many(self, keys):
+        """Return not expired quotes for selected (coin id, vs currency) keys."""
+        cache_keys = {self._make_key(key): key for key in keys}
+        found = self.cache.get_many(list(cache_keys))
+        return {cache_keys[cache_key]: quote for cache_key, quote in found.items()}
+
+    def set_many(self, quotes):
+        """Store quotes with configured time to live."""
+        self.cache.set_many(
+            {self._make_key(key): quote for key, quote in quotes.items()},
+            timeout=self.ttl,
+        )
+
+    async def aget_many(self, keys):
+        """Return not expired quotes using async API of cache backend."""
+        cache_keys = {self._make_key(key): key for key in keys}
+        found = await self.cache.aget_many(list(cache_keys))
+        return {cache_keys[cache_key]: quote for cache_key, quote in found.items()}
+
+    async def aset_many(self, quotes):
+        """Store quotes using async API of cache backend."""
+        await self.cache.aset_many(
+            {self._make_key(key): quote for key, quote in quotes.items()},
+            timeout=self.ttl,
+        )
+
+
+_price_cache = None
+
+
+def get_price_cache():
+    """Return price cache configured with PRICE_CACHE setting."""
+    global _price_cache
+
+    if _price_cache is None:
+        config = get_config("PRICE_CACHE")
+        if config["BACKEND"] == "django":
+            _price_cache = DjangoPriceCache(config["TTL"], config["CACHE_ALIAS"])
+        else:
+            _price_cache = LocalPriceCache(config["TTL"], config["MAX_SIZE"])
+
+    return _price_cache
+
+
+@receiver(setting_changed)
+def reset_price_cache(setting, **kwargs):
+    """Rebuild price cache after PRICE_CACHE setting change."""
+    global _price_cache
+
+    if setting == "PRICE_CACHE":
+        _price_cache = None
+
+
+def get_vs_currencies():
+    """Return currencies in which quotes are fetched, USD is always the first one."""
+    vs_currencies = [currency.lower() for currency in get_config("PRICE_QUOTES")["VS_CURRENCIES"]]
+    return ["usd"] + [currency for currency in vs_currencies if currency != "usd"]
+
+
+def format_price_key(vs_currency):
+    """Return key of price in quote of selected currency, e.g. "price_in_eur"."""
+    return f"price_in_{vs_currency}"
+
+
+def format_coin_id(coin_name):
+    """Return coin name formatted as CoinGecko coin id."""
+    return coin_name.lower().strip()
+
+
+def get_coin_quote(quotes, coin_name):
+    """Return quote of selected coin from already fetched quotes."""
+    try:
+        return quotes[format_coin_id(coin_name)]
+    except KeyError:
+        raise CoinNotFoundError("Selected cryptocurrency wasn't found!")
+
+
+def _parse_quotes(response, vs_currencies):
+    """Return {(coin id, vs currency): quote} from upstream simple price response."""
+    quotes = {}
+    for coin_id, data in response.items():
+        for vs_currency in vs_currencies:
+            try:
+                quotes[(coin_id, vs_currency)] = {
+                    format_price_key(vs_currency): Decimal(str(data[vs_currency])),
+                    'change_24h_percent': Decimal(str(round(data[f"{vs_currency}_24h_change"], 2))),
+                }
+            except (KeyError, TypeError):
+                # Coin without complete quote is treated like not found one.
+                continue
+
+    return quotes
+
+
+def _fetch_prices(coin_ids):
+    """Fetch quotes of selected coin ids in all configured currencies with one upstream call."""
+    vs_currencies = get_vs_currencies()
+    response = get_coingecko_client().get_price(
+        ids=coin_ids,
+        vs_currencies=",".join(vs_currencies),
+        include_24hr_change="true",
+    )
+
+    return _parse_quotes(response, vs_currencies)
+
+
+def _async_client():
+    """Return non-blocking HTTP client of external API."""
+    return httpx.AsyncClient(base_url=cg.api_base_url, timeout=cg.request_timeout)
+
+
+async def _afetch_prices(coin_ids):
+    """Fetch quotes of selected coin ids in all configured currencies without blocking.
+
+    Batches of coins are fetched concurrently.
+    """
+    batch_size = get_config("PRICE_QUOTES")["BATCH_SIZE"]
+    vs_currencies = get_vs_currencies()
+    coingecko = get_coingecko_client()
+    async with _async_client() as client:
+        responses = await asyncio.gather(*[
+            coingecko.aget_price(
+                client,
+                ids=coin_ids[start:start + batch_size],
+                vs_currencies=",".join(vs_currencies),
+                include_24hr_change="true",
+            )
+            for start in range(0, len(coin_ids), batch_size)
+        ])
+
+    quotes = {}
+    for response in responses:
+        quotes.update(_parse_quotes(response, vs_currencies))
+
+    return quotes
+
+
+def _stored_quotes_queryset(coin_ids, vs_currency):
+    fresh_after = timezone.now() - timedelta(seconds=get_config("PRICE_QUOTES")["MAX_AGE"])
+    return PriceQuote.objects.filter(
+        coin_id__in=coin_ids, vs_currency=vs_currency, fetched_at__gte=fresh_after
+    )
+
+
+def _stored_quote(quote):
+    return {
+        format_price_key(quote.vs_currency): quote.price,
+        'change_24h_percent': quote.change_24h_percent,
+    }
+
+
+def _read_stored_quotes(coin_ids, vs_currency):
+    """Return stored quotes of selected coin ids in selected currency which are not older than allowed."""
+    return {
+        (quote.coin_id, vs_currency): _stored_quote(quote)
+        for quote in _stored_quotes_queryset(coin_ids, vs_currency)
+    }
+
+
+async def _aread_stored_quotes(coin_ids, vs_currency):
+    """Return stored quotes of selected coin ids in selected currency which are not older than allowed."""
+    return {
+        (quote.coin_id, vs_currency): _stored_quote(quote)
+        async for quote in _stored_quotes_queryset(coin_ids, vs_currency)
+    }
+
+
+def _price_quotes(quotes):
+    fetched_at = timezone.now()
+    return [
+        PriceQuote(
+            coin_id=coin_id,
+            vs_currency=vs_currency,
+            price=quote[format_price_key(vs_currency)],
+            change_24h_percent=quote['change_24h_percent'],
+            fetched_at=fetched_at,
+        )
+        for (coin_id, vs_currency), quote in quotes.items()
+    ]
+
+
+def store_quotes(quotes):
+    """Insert or update {(coin id, vs currency): quote} in PriceQuote table."""
+    PriceQuote.objects.bulk_create(
+        _price_quotes(quotes),
+        update_conflicts=True,
+        unique_fields=["coin_id", "vs_currency"],
+        update_fields=["price", "change_24h_percent", "fetched_at"],
+    )
+
+
+async def astore_quotes(quotes):
+    """Insert or update {(coin id, vs currency): quote} in PriceQuote table."""
+    await PriceQuote.objects.abulk_create(
+        _price_quotes(quotes),
+        update_conflicts=True,
+        unique_fields=["coin_id", "vs_currency"],
+        update_fields=["price", "change_24h_percent", "fetched_at"],
+    )
+
+
+def _get_held_coin_ids():
+    coin_names = Cryptocurrency.objects.values_list("name", flat=True).distinct()
+    return sorted({format_coin_id(coin_name) for coin_name in coin_names})
+
+
+def refresh_held_coin_quotes(batch_size=None):
+    """Fetch and store quotes of all distinct coins held in users portfolios."""
+    return _refresh_quotes(_get_held_coin_ids(), batch_size)
+
+
+def get_held_coin_prices(vs_currency="usd"):
+    """Return price in selected currency and 24h change of all distinct coins held in users portfolios.
+
+    Quotes are read from PriceQuote table, only coins without fresh stored
+    quote are fetched, in batches like by "refresh_prices" worker.
+    """
+    coin_ids = _get_held_coin_ids()
+    quotes = _read_stored_quotes(coin_ids, vs_currency)
+
+    missing_coin_ids = [coin_id for coin_id in coin_ids if (coin_id, vs_currency) not in quotes]
+    record_price_lookups(database=len(quotes), upstream=len(missing_coin_ids))
+    if missing_coin_ids:
+        quotes.update(_refresh_quotes(missing_coin_ids))
+
+    return _select_currency(quotes, vs_currency)
+
+
+def _refresh_quotes(coin_ids, batch_size=None):
+    """Fetch quotes of selected coin ids in batches, store and cache them."""
+    batch_size = batch_size or get_config("PRICE_QUOTES")["BATCH_SIZE"]
+    refreshed = {}
+    for start in range(0, len(coin_ids), batch_size):
+        quotes = _fetch_prices(coin_ids[start:start + batch_size])
+        store_quotes(quotes)
+        refreshed.update(quotes)
+
+    get_price_cache().set_many(refreshed)
+
+    return refreshed
+
+
+def _select_currency(quotes, vs_currency):
+    """Return {coin id: quote} of selected currency from {(coin id, vs currency): quote}."""
+    return {coin_id: quote for (coin_id, currency), quote in quotes.items() if currency == vs_currency}
+
+
+def get_prices(coin_names, vs_currency="usd"):
+    """Return current price in selected currency and 24h change of all selected coins.
+
+    Quotes are read from cache and then from PriceQuote table kept up to date
+    by "refresh_prices" worker. Only coins missing in both are fetched, all in
+    one upstream call together with quotes in all other configured currencies,
+    so switching currency is served from cache.
+    """
+    coin_ids = sorted({format_coin_id(coin_name) for coin_name in coin_names})
+    if not coin_ids:
+        return {}
+
+    price_cache = get_price_cache()
+    quotes = price_cache.get_many([(coin_id, vs_currency) for coin_id in coin_ids])
+
+    missing_coin_ids = [coin_id for coin_id in coin_ids if (coin_id, vs_currency) not in quotes]
+    record_price_lookups(cache=len(quotes))
+    if missing_coin_ids:
+        found = _read_stored_quotes(missing_coin_ids, vs_currency)
+
+        missing_coin_ids = [coin_id for coin_id in missing_coin_ids if (coin_id, vs_currency) not in found]
+        record_price_lookups(database=len(found), upstream=len(missing_coin_ids))
+        if missing_coin_ids:
+            fetched = _fetch_prices(missing_coin_ids)
+            store_quotes(fetched)
+            found.update(fetched)
+
+        price_cache.set_many(found)
+        quotes.update(found)
+
+    return _select_currency(quotes, vs_currency)
+
+
+async def aget_prices(coin_names, vs_currency="usd"):
+    """Return current price in selected currency and 24h change of all selected coins without blocking.
+
+    Works like get_prices, but coins missing in cache and PriceQuote table are
+    fetched with non-blocking client, batches of them concurrently.
+    """
+    coin_ids = sorted({format_coin_id(coin_name) for coin_name in coin_names})
+    if not coin_ids:
+        return {}
+
+    price_cache = get_price_cache()
+    quotes = await price_cache.aget_many([(coin_id, vs_currency) for coin_id in coin_ids])
+
+    missing_coin_ids = [coin_id for coin_id in coin_ids if (coin_id, vs_currency) not in quotes]
+    record_price_lookups(cache=len(quotes))
+    if missing_coin_ids:
+        found = await _aread_stored_quotes(missing_coin_ids, vs_currency)
+
+        missing_coin_ids = [coin_id for coin_id in missing_coin_ids if (coin_id, vs_currency) not in found]
+        record_price_lookups(database=len(found), upstream=len(missing_coin_ids))
+        if missing_coin_ids:
+            fetched = await _afetch_prices(missing_coin_ids)
+            await astore_quotes(fetched)
+            found.update(fetched)
+
+        await price_cache.aset_many(found)
+        quotes.update(found)
+
+    return _select_currency(quotes, vs_currency)
+
+
+def get_exchange_rate(vs_currency):
+    """Return rate of USD to selected currency derived from quotes of reference coin.
+
+    Both quotes come from the same upstream call, so rate doesn't need another one.
+    """
+    if vs_currency == "usd":
+        return Decimal(1)
+
+    coin_id = get_config("PRICE_QUOTES")["RATE_REFERENCE_COIN"]
+    usd_quote = get_coin_quote(get_prices([coin_id]), coin_id)
+    quote = get_coin_quote(get_prices([coin_id], vs_currency), coin_id)
+
+    return quote[format_price_key(vs_currency)] / usd_quote["price_in_usd"]
@@ -0,0 +1,66 @@
+"""
+Renderers of row exports for the crypto portfolio API.
+"""
+import csv
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class _Echo:
+    """File-like object returning written line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def _format_csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return value
+
+
+class RowsRenderer(BaseRenderer, ABC):
+    """Renderer of rows which can also be streamed one by one with stream()."""
+
+    charset = "utf-8"
+
+    @abstractmethod
+    def stream(self, fields, rows):
+        """Yield rendered chunks of rows, tuples of values of fields."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+        return "".join(self.stream(fields, ([row.get(field) for field in fields] for row in rows))).encode()
+
+
+class CSVRenderer(RowsRenderer):
+    """CSV with header row, nested values are written as JSON."""
+
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, fields, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([_format_csv_value(value) for value in row])
+
+
+class NDJSONRenderer(RowsRenderer):
+    """Newline delimited JSON, one object per row."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def stream(self, fields, rows):
+        for row in rows:
+            yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + "\n"
@@ -1,19 +1,65 @@
 """
 Serializers for cryptocurrency portfolio.
 """
-from datetime import datetime
-from pycoingecko import CoinGeckoAPI
+from datetime import timedelta
+from decimal import Decimal
 
-from rest_framework import serializers, status
-from rest_framework.response import Response
+from django.utils import timezone
+from rest_framework import serializers
 
-from .models import Cryptocurrency, PortfolioData
-from user.models import User
+from .config import get_config
+from .history import HISTORY_INTERVALS
+from .models import Cryptocurrency, PortfolioData, Trade
+from .portfolio import TradeError, add_coins, change_coin_amount, sell_coins
+from .prices import CoinNotFoundError
 
 
-class CryptocurrencySerializer(serializers.ModelSerializer):
+class BaseCurrencySerializerMixin:
+    """Money fields stored in USD are represented in base currency.
+
+    Rate of USD to base currency is taken from "exchange_rate" of serializer context.
+    """
+
+    currency_fields = []
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        exchange_rate = self.context.get("exchange_rate", 1)
+        if exchange_rate == 1:
+            return data
+
+        for field_name in self.currency_fields:
+            if data.get(field_name) is not None:
+                data[field_name] = self.fields[field_name].to_representation(
+                    Decimal(data[field_name]) * exchange_rate
+                )
+        return data
+
+
+class CryptocurrencyListSerializer(serializers.ListSerializer):
+    """Serializer for many cryptocurrencies added to portfolio at once."""
+
+    def validate(self, attrs):
+        """Validate amounts of all added cryptocurrencies."""
+        if any(coin["amount"] < 0 for coin in attrs):
+            raise serializers.ValidationError("Entered coin amount can't be less than 0!")
+        return attrs
+
+    def create(self, validated_data):
+        """Create cryptocurrencies in authenticated user portfolio with single recalculation."""
+        user = self.context["request"].user
+        try:
+            return add_coins(user, [(coin["name"], coin["amount"]) for coin in validated_data])
+        except CoinNotFoundError as error:
+            raise serializers.ValidationError(str(error))
+
+
+class CryptocurrencySerializer(BaseCurrencySerializerMixin, serializers.ModelSerializer):
     """Serializer for Cryptocurrency."""
 
+    coin_participation_in_portfolio = serializers.SerializerMethodField()
+    currency_fields = ["price", "worth", "realized_profit_loss"]
+
     class Meta:
         model = Cryptocurrency
         fields = [
@@ -24,215 +70,101 @@ class CryptocurrencySerializer(serializers.ModelSerializer):
             "coin_profit_loss_percent_24h",
             "coin_participation_in_portfolio",
             "last_update",
+            "realized_profit_loss",
         ]
         read_only_fields = [
             'price',
             'worth',
-            'coin_profit_loss_percent_24h'
+            'coin_profit_loss_percent_24h',
             'coin_participation_in_portfolio',
-            'last_update'
+            'last_update',
+            'realized_profit_loss',
         ]
+        list_serializer_class = CryptocurrencyListSerializer
 
-    cg = CoinGeckoAPI()
+    @staticmethod
+    def get_coin_participation_in_portfolio(coin):
+        """Return participation percent derived at read time if available, stored one otherwise."""
+        participation = getattr(coin, "participation", coin.coin_participation_in_portfolio)
+        return serializers.DecimalField(max_digits=5, decimal_places=2).to_representation(participation)
 
-    def _get_coin_price(self, coin_name):
-        """Get coin name and return it's current price in USD."""
+    def create(self, validated_data):
+        """Create cryptocurrency in authenticated user portfolio."""
+        user = self.context["request"].user
+        coin_amount = validated_data["amount"]
+        if coin_amount < 0:
+            raise serializers.ValidationError({"amount": "Entered coin amount can't be less than 0!"})
 
-        coin_string_formatted = coin_name.lower().strip()
-        current_coin_price = self.cg.get_price(
-            ids=coin_string_formatted,
-            vs_currencies="usd",
-            include_24hr_change="true",
-        )
         try:
-            price_in_usd = current_coin_price[f"{coin_string_formatted}"]["usd"]
-            change_24h_percent = round(current_coin_price[f"{coin_string_formatted}"]["usd_24h_change"], 2)
-        except Exception:
-            raise Exception("Selected cryptocurrency wasn't found!")
+            return add_coins(user, [(validated_data["name"], coin_amount)])[0]
+        except CoinNotFoundError as error:
+            raise serializers.ValidationError(str(error))
 
-        return {
-            'price_in_usd': float(price_in_usd),
-            'change_24h_percent': float(change_24h_percent)
-        }
+    def update(self, instance, validated_data):
+        """Correct amount of cryptocurrency in authenticated user portfolio.
 
-    @staticmethod
-    def _get_coin_names_from_portfolio(user):
-        """Return coin list of already existing coins in selected user portfolio."""
-        return [coin.name for coin in user.crypto.all()]
+        Correction isn't a trade, average cost of position is kept.
+        """
+        coin_amount = validated_data.get("amount", instance.amount)
+        if coin_amount < 0:
+            raise serializers.ValidationError({"amount": "Entered coin amount can't be less than 0!"})
 
-    @staticmethod
-    def _calculate_worth_of_added_coin(coin_price_usd, amount):
-        """Calculate current worth of added cryptocurrency in USD."""
         try:
-            return coin_price_usd * float(amount)
-        except Exception:
-            raise Exception("Entered coin amount can't be less than 0!")
-
-    @staticmethod
-    def _calculate_average_price(
-        average_price_before, current_price, coin_amount_before, coin_amount_to_add
-    ):
-        """Return average price for coin if user added it before."""
-        return round(
-            (
-                coin_amount_before * average_price_before
-                + coin_amount_to_add * current_price
-            ),
-            2,
-        ) / (coin_amount_before + coin_amount_to_add)
-
-    def _get_coin_for_update(self, user, coin_name):
-        """Get and return selected coin for update from user portfolio."""
-        available_coins = self._get_coin_names_from_portfolio(user)
-        index = available_coins.index(coin_name)
-        return user.crypto.all()[index]
+            return change_coin_amount(self.context["request"].user, instance.name, coin_amount)
+        except TradeError as error:
+            raise serializers.ValidationError(str(error))
 
-    @staticmethod
-    def _read_current_date_and_time():
-        """Return current date and time."""
-        return datetime.now()
 
-    @staticmethod
-    def _calculate_total_coins_value(user):
-        """Calculate total value of coins already existing in authenticated user portfolio."""
-        read_portfolio = [round(float(coin.worth), 2) for coin in user.crypto.all()]
-
-        return sum(read_portfolio)
-
-    def _calculate_coins_participation_in_portfolio(self, user):
-        """Calculate participation percent for coins in authenticated user portfolio."""
-        coin_data = {coin.name: coin.worth for coin in user.crypto.all()}
-        total_portfolio_value = round(self._calculate_total_coins_value(user), 2)
-
-        for coin_name, coin_worth in coin_data.items():
-            for coin in user.crypto.all():
-                if coin.name == coin_name:
-                    try:
-                        coin.coin_participation_in_portfolio = round((100 * float(coin_worth)) /
-                                                                     total_portfolio_value, 2)
-                    except ZeroDivisionError:
-                        coin.coin_participation_in_portfolio = 0
-                    coin.save()
-
-    def _calculate_total_profit_loss_in_usd(self, user):
-        """Calculate current and initial coins value, return profit/loss balance in usd."""
-        result = {
-            'total_balance_in_usd': None,
-            'total_balance_in_usd_24h': None,
-        }
-
-        initial_total_value = self._calculate_total_coins_value(user)
-        current_total_value = 0
-        total_value_24h = 0
-
-        for coin in User.objects.all()[0].crypto.all():
-            current_coin_price = self._get_coin_price(coin.name)['price_in_usd']
-            current_coin_amount = float(coin.amount)
-            current_total_value += current_coin_price * current_coin_amount
-
-            # Get coin price 24h diff in percent -> calculate each coin price 24h ago -> sum all coin prices.
-            coin_diff_24h = self._get_coin_price(coin.name)['change_24h_percent']
-            coin_price_24h = self._get_coin_price(coin.name)['price_in_usd'] * (1 + (coin_diff_24h / 100))
-            total_value_24h += coin_price_24h * current_coin_amount
-
-        result['total_balance_in_usd'] = round(current_total_value - initial_total_value, 2)
-        result['total_balance_in_usd_24h'] = round(total_value_24h - initial_total_value, 2)
-
-        return result
+class SellListSerializer(serializers.ListSerializer):
+    """Serializer for many cryptocurrencies sold at once."""
 
-    @staticmethod
-    def _calculate_total_profit_loss_in_percent(total_value, total_profit_loss, total_profit_loss_24h):
-        """Calculate current and initial coins value, return profit/loss balance in percent."""
-        result = {
-            'total_profit_loss_percent': None,
-            'total_profit_loss_percent_24h': None,
-        }
+    def create(self, validated_data):
+        """Sell cryptocurrencies from authenticated user portfolio with single recalculation."""
+        user = self.context["request"].user
         try:
-            result['total_profit_loss_percent'] = (100 * total_profit_loss) / total_value
-            result['total_profit_loss_percent_24h'] = (100 * total_profit_loss_24h) / total_value
-        except ZeroDivisionError:
-            result['total_profit_loss_percent'] = 0
-            result['total_profit_loss_percent_24h'] = 0
+            return sell_coins(user, [(coin["name"], coin["amount"]) for coin in validated_data])
+        except (TradeError, CoinNotFoundError) as error:
+            raise serializers.ValidationError(str(error))
 
-        return result
+
+class SellSerializer(serializers.Serializer):
+    """Serializer for cryptocurrency sold from portfolio."""
+    name = serializers.CharField(max_length=30)
+    amount = serializers.DecimalField(max_digits=36, decimal_places=18)
+
+    class Meta:
+        list_serializer_class = SellListSerializer
+
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Sold amount must be greater than 0!")
+        return value
 
     def create(self, validated_data):
-        """Create cryptocurrency in authenticated user portfolio."""
-        try:
-            # Get and calculate cryptocurrency parameters.
-            user = self.context["request"].user
-            coin_name = validated_data["name"]
-            coin_amount = validated_data["amount"]
-
-            if float(coin_amount) < 0:
-                return Response(status=status.HTTP_400_BAD_REQUEST)
-
-            portfolio_coins = self._get_coin_names_from_portfolio(user)
-
-            # Calculate coin properties.
-            coin_price_usd = self._get_coin_price(coin_name)["price_in_usd"]
-            worth = self._calculate_worth_of_added_coin(
-                coin_price_usd, validated_data["amount"]
-            )
-            change_24h_percent = self._get_coin_price(coin_name)["change_24h_percent"]
-
-            # Set cryptocurrency parameters.
-            if coin_name in portfolio_coins:
-                coin_for_update = self._get_coin_for_update(user, coin_name)
-                coin_for_update.price = self._calculate_average_price(
-                    float(coin_for_update.price),
-                    float(coin_price_usd),
-                    float(coin_for_update.amount),
-                    float(coin_amount),
-                )
+        """Sell cryptocurrency from authenticated user portfolio."""
+        return SellListSerializer(child=SellSerializer(), context=self.context).create([validated_data])[0]
+
+
+class TradeSerializer(serializers.ModelSerializer):
+    """Serializer for Trade."""
+
+    class Meta:
+        model = Trade
+        fields = ["id", "coin", "side", "amount", "price", "executed_at"]
+        read_only_fields = fields
+
+
+class RealizedProfitLossQuerySerializer(serializers.Serializer):
+    """Serializer for method of realized profit/loss calculation."""
+    method = serializers.ChoiceField(choices=["fifo", "average"], default="fifo")
+
 
-                coin_for_update.amount = float(coin_for_update.amount) + float(coin_amount)
-                coin_for_update.worth = float(coin_for_update.worth) + float(worth)
-                coin_for_update.last_update = self._read_current_date_and_time()
-                coin_for_update.coin_profit_loss_percent_24h = change_24h_percent
-                coin_for_update.save()
-            else:
-                validated_data["price"] = coin_price_usd
-                validated_data["worth"] = worth
-                validated_data["coin_profit_loss_percent_24h"] = change_24h_percent
-                validated_data["last_update"] = self._read_current_date_and_time()
-                user.crypto.create(**validated_data)
-
-            # Calculate data related with PortfolioData model.
-            total_value = self._calculate_total_coins_value(user)
-            total_profit_loss = self._calculate_total_profit_loss_in_usd(user)['total_balance_in_usd']
-            total_profit_loss_24h = self._calculate_total_profit_loss_in_usd(user)['total_balance_in_usd_24h']
-            calculated_balance = self._calculate_total_profit_loss_in_percent(total_value,
-                                                                              total_profit_loss,
-                                                                              total_profit_loss_24h)
-            total_profit_loss_percent = calculated_balance['total_profit_loss_percent']
-            total_profit_loss_percent_24h = calculated_balance['total_profit_loss_percent_24h']
-
-            # Generate data related with PortfolioData model.
-            portfolio_data = {
-                'total_value': total_value,
-                'total_profit_loss': total_profit_loss,
-                'total_profit_loss_percent': total_profit_loss_percent,
-                'total_profit_loss_24h': total_profit_loss_24h,
-                'total_profit_loss_percent_24h': total_profit_loss_percent_24h
-            }
-
-            # Moved here because coin must be created before calculation.
-            self._calculate_coins_participation_in_portfolio(user)
-
-            # Always clean general_data queryset to hava always maximum 1 object in queryset with updated data.
-            user.general_data.all().delete()
-            user.general_data.create(**portfolio_data)
-
-            return Cryptocurrency
-
-        except KeyError:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-
-
-class PortfolioDataSerializer(serializers.ModelSerializer):
+class PortfolioDataSerializer(BaseCurrencySerializerMixin, serializers.ModelSerializer):
     """Serializer for PortfolioData."""
 
+    currency = serializers.SerializerMethodField()
+    currency_fields = ["total_value", "total_profit_loss", "total_profit_loss_24h"]
+
     class Meta:
         model = PortfolioData
         fields = [
@@ -240,7 +172,8 @@ class PortfolioDataSerializer(serializers.ModelSerializer):
             'total_profit_loss',
             'total_profit_loss_percent',
             'total_profit_loss_24h',
-            'total_profit_loss_percent_24h'
+            'total_profit_loss_percent_24h',
+            'currency',
         ]
         read_only_fields = [
             'total_value',
@@ -250,6 +183,60 @@ class PortfolioDataSerializer(serializers.ModelSerializer):
             'total_profit_loss_percent_24h'
         ]
 
+    def get_currency(self, portfolio_data) -> str:
+        """Return currency in which money fields are represented."""
+        return self.context.get("currency", "usd")
+
+
+class PortfolioHistoryQuerySerializer(serializers.Serializer):
+    """Serializer for range and downsampling interval of portfolio history."""
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    interval = serializers.ChoiceField(choices=HISTORY_INTERVALS, default="day")
+
+    def validate(self, attrs):
+        attrs.setdefault("end", timezone.now())
+        attrs.setdefault("start", attrs["end"] - timedelta(days=30))
+        if attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("Start of range can't be after its end!")
+        return attrs
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """Serializer for optional range of exported portfolio history."""
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if "start" in attrs and "end" in attrs and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("Start of range can't be after its end!")
+        return attrs
+
+
+class PortfolioHistorySerializer(serializers.Serializer):
+    """Serializer for portfolio value at selected time."""
+    time = serializers.DateTimeField()
+    total_value = serializers.DecimalField(max_digits=30, decimal_places=8)
+    total_profit_loss = serializers.DecimalField(max_digits=30, decimal_places=2)
+    coins = serializers.DictField(child=serializers.DecimalField(max_digits=30, decimal_places=8), required=False)
+
+
+class PortfolioValueCurveQuerySerializer(serializers.Serializer):
+    """Serializer for range of portfolio value curve."""
+    days = serializers.IntegerField(min_value=1, default=30)
+
+    def validate_days(self, value):
+        max_days = get_config("MARKET_CHARTS")["MAX_DAYS"]
+        if value > max_days:
+            raise serializers.ValidationError(f"Value curve is available for up to {max_days} days!")
+        return value
+
+
+class PortfolioValuePointSerializer(serializers.Serializer):
+    """Serializer for value of current holdings at selected time."""
+    time = serializers.DateTimeField()
+    total_value = serializers.DecimalField(max_digits=30, decimal_places=2)
+
 
 class AvailableCoinsSerializer(serializers.Serializer):
     """Serializer for available cryptocurrency coins via external API."""
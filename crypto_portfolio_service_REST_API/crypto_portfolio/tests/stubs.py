@@ -0,0 +1,22 @@
+"""
+Stubs of external API used by cryptocurrency portfolio tests.
+"""
+UPSTREAM_QUOTES = {
+    "bitcoin": {"usd": 30000.0, "usd_24h_change": 2.5, "eur": 27000.0, "eur_24h_change": 2.4},
+    "ethereum": {"usd": 2000.0, "usd_24h_change": -1.25, "eur": 1800.0, "eur_24h_change": -1.3},
+    "cardano": {"usd": 0.3, "usd_24h_change": 4.0, "eur": 0.27, "eur_24h_change": 3.9},
+}
+# Error raised by external API client for rate limited response.
+RATE_LIMITED = ValueError({"status": {"error_code": 429, "error_message": "You've exceeded the Rate Limit."}})
+
+
+def fake_get_price(ids, vs_currencies, **kwargs):
+    """Return stubbed upstream response for selected coin ids in selected currencies."""
+    vs_currencies = vs_currencies.split(",")
+    return {
+        coin_id: {
+            key: value for key, value in UPSTREAM_QUOTES[coin_id].items()
+            if key.split("_")[0] in vs_currencies
+        }
+        for coin_id in ids if coin_id in UPSTREAM_QUOTES
+    }
@@ -0,0 +1,48 @@
+"""
+Tests for offline benchmarks of API endpoints.
+"""
+from django.test import TestCase
+
+from crypto_portfolio import benchmarks, upstream
+from crypto_portfolio.models import Coin, Cryptocurrency
+
+
+class BenchmarksTests(TestCase):
+    """Tests for benchmarks run with stubbed external API."""
+
+    def test_run_benchmarks_measures_all_endpoints(self):
+        """Test every endpoint is measured for every size without network and data is rolled back."""
+        results = benchmarks.run_benchmarks(sizes=[1, 3], repeat=2, warmup=0)
+
+        self.assertEqual(
+            [(result["endpoint"], result["coins"]) for result in results],
+            [(endpoint, size) for size in [1, 3] for endpoint in benchmarks.ENDPOINTS],
+        )
+        coin_list = next(result for result in results if result["endpoint"] == "coin_list")
+        self.assertEqual(coin_list["upstream_calls"], 0)
+        self.assertGreater(coin_list["queries"], 0)
+        self.assertLessEqual(coin_list["latency_ms"]["min"], coin_list["latency_ms"]["max"])
+        self.assertFalse(Cryptocurrency.objects.exists())
+        self.assertFalse(Coin.objects.exists())
+        self.assertNotIsInstance(upstream.get_coingecko_client().api, benchmarks.StubCoinGeckoAPI)
+
+    def test_compare_results(self):
+        """Test changes against baseline are reported for matching endpoint and size."""
+        baseline = [
+            {"endpoint": "coin_add", "coins": 10, "latency_ms": {"median": 10}, "queries": 12, "upstream_calls": 1},
+        ]
+        results = [
+            {"endpoint": "coin_add", "coins": 10, "latency_ms": {"median": 5}, "queries": 10, "upstream_calls": 0},
+            {"endpoint": "coin_add", "coins": 100, "latency_ms": {"median": 5}, "queries": 10, "upstream_calls": 0},
+        ]
+
+        self.assertEqual(
+            benchmarks.compare_results(baseline, results),
+            [{
+                "endpoint": "coin_add",
+                "coins": 10,
+                "latency_change_percent": -50.0,
+                "queries_change": -2,
+                "upstream_calls_change": -1,
+            }],
+        )
@@ -0,0 +1,146 @@
+"""
+Tests for the local catalog of available coins.
+"""
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from crypto_portfolio import prices
+from crypto_portfolio.catalog import CoinSearchIndex, reset_coin_search_index, sync_coin_catalog
+from crypto_portfolio.management import base
+from crypto_portfolio.models import Coin
+from crypto_portfolio.upstream import get_coingecko_client
+
+
+GET_COIN_LIST_URL = reverse("crypto_portfolio:available_coins")
+
+UPSTREAM_COINS = [
+    {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+    {"id": "ethereum", "symbol": "eth", "name": "Ethereum"},
+    {"id": "cardano", "symbol": "ada", "name": "Cardano"},
+]
+
+
+class CoinCatalogTests(TestCase):
+    """Tests for coin catalog synchronization."""
+
+    def setUp(self):
+        reset_coin_search_index()
+        get_coingecko_client().reset()
+        self.client = APIClient()
+
+    @mock.patch.object(prices.cg, "get_coins_list", return_value=UPSTREAM_COINS)
+    def test_sync_coins_command_creates_catalog(self, get_coins_list):
+        """Test worker stores all coins returned by external API."""
+        call_command("sync_coins", "--once", stdout=StringIO())
+
+        self.assertEqual(get_coins_list.call_count, 1)
+        self.assertEqual(
+            set(Coin.objects.values_list("coin_id", "symbol", "name")),
+            {(coin["id"], coin["symbol"], coin["name"]) for coin in UPSTREAM_COINS},
+        )
+
+    @mock.patch.object(
+        prices.cg, "get_coins_list", side_effect=[ValueError("upstream down"), UPSTREAM_COINS, KeyboardInterrupt]
+    )
+    def test_sync_coins_worker_reports_failure_and_runs_again_after_interval(self, get_coins_list):
+        """Test failed run of worker is reported and next runs start after interval."""
+        stdout, stderr = StringIO(), StringIO()
+
+        with mock.patch.object(base.time, "sleep") as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command("sync_coins", "--interval", "5", stdout=stdout, stderr=stderr)
+
+        self.assertIn("[ERROR] --- Coins synchronization failed: upstream down ---", stderr.getvalue())
+        self.assertIn("[INFO] --- Coins created: 3, updated: 0, deleted: 0 ---", stdout.getvalue())
+        # Calls of external API don't wait, rate limit isn't reached.
+        interval_sleeps = [call.args[0] for call in sleep.call_args_list if call.args[0]]
+        self.assertEqual(len(interval_sleeps), 2)
+        self.assertAlmostEqual(interval_sleeps[-1], 5, places=0)
+
+    def test_sync_coins_writes_only_changes(self):
+        """Test synchronization creates new, updates changed and deletes removed coins."""
+        Coin.objects.create(coin_id="bitcoin", symbol="btc", name="Bitcoin")
+        Coin.objects.create(coin_id="ethereum", symbol="eth", name="Ether")
+        Coin.objects.create(coin_id="terra-luna", symbol="luna", name="Terra")
+
+        with mock.patch.object(prices.cg, "get_coins_list", return_value=UPSTREAM_COINS):
+            result = sync_coin_catalog()
+
+        self.assertEqual(result, {"created": 1, "updated": 1, "deleted": 1})
+        self.assertEqual(Coin.objects.get(coin_id="ethereum").name, "Ethereum")
+        self.assertFalse(Coin.objects.filter(coin_id="terra-luna").exists())
+
+    @mock.patch.object(prices.cg, "get_coins_list")
+    def test_available_coins_served_from_catalog(self, get_coins_list):
+        """Test available coins are read from catalog without external API call."""
+        for coin in UPSTREAM_COINS:
+            Coin.objects.create(coin_id=coin["id"], symbol=coin["symbol"], name=coin["name"])
+
+        result = self.client.get(GET_COIN_LIST_URL)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(result.data["available_coins"], ["Bitcoin", "Cardano", "Ethereum"])
+        get_coins_list.assert_not_called()
+
+
+class CoinSearchTests(TestCase):
+    """Tests for search and pagination of available coins."""
+
+    def setUp(self):
+        reset_coin_search_index()
+        self.client = APIClient()
+        for coin_id, symbol, name in [
+            ("bitcoin", "btc", "Bitcoin"),
+            ("bitcoin-cash", "bch", "Bitcoin Cash"),
+            ("wrapped-bitcoin", "wbtc", "Wrapped Bitcoin"),
+            ("binancecoin", "bnb", "BNB"),
+            ("ethereum", "eth", "Ethereum"),
+        ]:
+            Coin.objects.create(coin_id=coin_id, symbol=symbol, name=name)
+
+    def test_search_prefix_matches_first(self):
+        """Test coins starting with query are returned before coins containing it."""
+        result = self.client.get(GET_COIN_LIST_URL, {"q": "BitC"})
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(result.data["count"], 3)
+        self.assertEqual(result.data["available_coins"], ["Bitcoin", "Bitcoin Cash", "Wrapped Bitcoin"])
+
+    def test_search_by_symbol(self):
+        """Test coins are found by symbol."""
+        result = self.client.get(GET_COIN_LIST_URL, {"q": "bnb"})
+
+        self.assertEqual(result.data["available_coins"], ["BNB"])
+
+    def test_search_index_matches_each_coin_once(self):
+        """Test coin matched by id, symbol and name is returned once."""
+        index = CoinSearchIndex([("eth", "eth", "ETH")])
+
+        self.assertEqual(index.search("et"), [("eth", "eth", "ETH")])
+
+    def test_available_coins_paginated(self):
+        """Test available coins are split into pages."""
+        result = self.client.get(GET_COIN_LIST_URL, {"page_size": 2, "page": 2})
+
+        self.assertEqual(result.data["count"], 5)
+        self.assertEqual(result.data["available_coins"], ["Bitcoin Cash", "Ethereum"])
+        self.assertIsNotNone(result.data["next"])
+        self.assertIsNotNone(result.data["previous"])
+
+    def test_search_index_rebuilt_after_sync(self):
+        """Test coins added by synchronization are searchable."""
+        self.client.get(GET_COIN_LIST_URL, {"q": "cardano"})
+        upstream_coins = UPSTREAM_COINS + [{"id": "bitcoin-cash", "symbol": "bch", "name": "Bitcoin Cash"}]
+
+        with mock.patch.object(prices.cg, "get_coins_list", return_value=upstream_coins):
+            sync_coin_catalog()
+        result = self.client.get(GET_COIN_LIST_URL, {"q": "cardano"})
+
+        self.assertEqual(result.data["available_coins"], ["Cardano"])
@@ -1,16 +1,18 @@
 """
 Tests for the cryptocurrency API.
 """
-from datetime import datetime, timedelta
+from datetime import timedelta
 from pycoingecko import CoinGeckoAPI
 
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from crypto_portfolio.upstream import get_coingecko_client
 from user.models import User
 
 
@@ -60,7 +62,7 @@ def get_list_of_user_portfolio_general_data(user_index):
 
 def read_current_date_and_time():
     """Return current date and time."""
-    return datetime.now()
+    return timezone.now()
 
 
 def get_24h_coin_price_change_percent(coin_name):
@@ -101,6 +103,7 @@ class AuthenticatedUserTests(TestCase):
     """Tests for authenticated user."""
 
     def setUp(self):
+        get_coingecko_client().reset()
         self.user = create_user(
             email="test_email@example.com",
             username="test_username",
@@ -149,12 +152,12 @@ class AuthenticatedUserTests(TestCase):
         result2 = self.client.post(CREATE_COIN_URL, payload)
 
         user_portfolio = get_list_of_crypto_selected_user_portfolio(user_index=0)
-        total_amount = str(float(payload["amount"] + payload["amount"]))
+        total_amount = payload["amount"] + payload["amount"]
 
         self.assertEqual(result.status_code, status.HTTP_201_CREATED)
         self.assertEqual(result2.status_code, status.HTTP_201_CREATED)
         self.assertEqual(len(user_portfolio), 1)
-        self.assertEqual(total_amount, user_portfolio[0].amount)
+        self.assertEqual(total_amount, float(user_portfolio[0].amount))
 
     def test_created_multiple_coins_successful(self):
         print(f"Started {'test_created_multiple_coins_successful'}")
@@ -216,7 +219,7 @@ class AuthenticatedUserTests(TestCase):
 
         expected_result = \
             True if current_date_and_time + timedelta(minutes=2) > \
-                    datetime.strptime(user_portfolio[0].last_update, '%Y-%m-%d %H:%M:%S.%f') > \
+                    user_portfolio[0].last_update > \
                     current_date_and_time + timedelta(minutes=-2) else False
 
         self.assertEqual(result.status_code, status.HTTP_201_CREATED)
@@ -276,15 +279,19 @@ class AuthenticatedUserTests(TestCase):
         print(f"Started {'test_incorrect_coin_name_create_error'}")
         """Test sending incorrect coin name to create returns bad request status."""
         payload = generate_coin_payload('b_i_t_c_o_i_n', 2)
-        with self.assertRaises(Exception):
-            self.client.post(CREATE_COIN_URL, payload)
+        result = self.client.post(CREATE_COIN_URL, payload)
+
+        self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.user.crypto.exists())
 
     def test_incorrect_coin_amount_create_error(self):
         print(f"Started {'test_incorrect_coin_amount_create_error'}")
         """Test sending incorrect coin amount to create returns bad request status."""
         payload = generate_coin_payload('bitcoin', -2)
-        with self.assertRaises(Exception):
-            self.client.post(CREATE_COIN_URL, payload)
+        result = self.client.post(CREATE_COIN_URL, payload)
+
+        self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.user.crypto.exists())
 
     def test_user_has_no_access_to_read_only_fields(self):
         print(f"Started {'test_user_has_no_access_to_read_only_fields'}")
@@ -327,9 +334,9 @@ class AuthenticatedUserTests(TestCase):
         user_portfolio = get_list_of_crypto_selected_user_portfolio(user_index=0)
 
         for coin in user_portfolio:
-            total_value += round(float(coin.price) * float(coin.amount), 2)
+            total_value += float(coin.price) * float(coin.amount)
 
-        self.assertEqual(float(self.user.general_data.all()[0].total_value), total_value)
+        self.assertAlmostEqual(float(self.user.general_data.all()[0].total_value), total_value, places=2)
 
     def test_coin_24h_change_percent(self):
         print(f"Started {'test_coin_24h_change_percent'}")
@@ -413,7 +420,7 @@ class AuthenticatedUserTests(TestCase):
 
         balance_percent_queryset = float(self.user.general_data.all()[0].total_profit_loss_percent)
 
-        self.assertEqual(calculated_balance, balance_percent_queryset)
+        self.assertAlmostEqual(calculated_balance, balance_percent_queryset, places=2)
 
     def test_calculate_total_profit_loss_in_usd_24h(self):
         print(f"Started {'test_calculate_total_profit_loss_in_usd_24h'}")
@@ -466,4 +473,4 @@ class AuthenticatedUserTests(TestCase):
 
         balance_percent_queryset_24h = float(self.user.general_data.all()[0].total_profit_loss_percent_24h)
 
-        self.assertEqual(calculated_balance, balance_percent_queryset_24h)
+        self.assertAlmostEqual(calculated_balance, balance_percent_queryset_24h, places=2)
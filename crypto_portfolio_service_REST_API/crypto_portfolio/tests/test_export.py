@@ -0,0 +1,105 @@
+"""
+Tests for streaming export of holdings and portfolio history.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from crypto_portfolio.export import HOLDINGS_FIELDS
+
+
+EXPORT_HOLDINGS_URL = reverse("crypto_portfolio:export-holdings")
+EXPORT_HISTORY_URL = reverse("crypto_portfolio:export-history")
+
+
+def read_content(response):
+    return b"".join(response.streaming_content).decode()
+
+
+class ExportTests(TestCase):
+    """Tests for export endpoints."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for name, amount, worth in [("bitcoin", 2, 200), ("ethereum", 10, 100)]:
+            self.user.crypto.create(name=name, amount=amount, price=worth / amount, worth=worth)
+        for day in range(1, 6):
+            self.user.snapshots.create(
+                taken_at=datetime(2026, 1, day, tzinfo=dt_timezone.utc),
+                total_value=100 * day,
+                total_profit_loss=day,
+                coins={"bitcoin": str(100 * day)},
+            )
+
+    def test_export_holdings_csv_by_default(self):
+        """Test holdings are streamed as CSV with header row when no format is requested."""
+        result = self.client.get(EXPORT_HOLDINGS_URL)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertTrue(result.streaming)
+        self.assertEqual(result["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="holdings.csv"', result["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(read_content(result))))
+        self.assertEqual(rows[0], HOLDINGS_FIELDS)
+        self.assertEqual([(row[1], Decimal(row[4])) for row in rows[1:]], [("bitcoin", 200), ("ethereum", 100)])
+
+    @override_settings(EXPORT={"CHUNK_SIZE": 2})
+    def test_export_history_ndjson_in_range(self):
+        """Test snapshots in range are streamed as NDJSON selected by Accept header, read lazily in chunks."""
+        with CaptureQueriesContext(connection) as queries:
+            result = self.client.get(
+                EXPORT_HISTORY_URL,
+                {"start": "2026-01-02T00:00:00Z", "end": "2026-01-04T00:00:00Z"},
+                HTTP_ACCEPT="application/x-ndjson",
+            )
+            self.assertEqual(len(queries), 0)
+            content = read_content(result)
+
+        # Two chunks, the second one shorter than chunk size is the last.
+        self.assertEqual(len(queries), 2)
+
+        self.assertEqual(result["Content-Type"], "application/x-ndjson; charset=utf-8")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([Decimal(row["total_value"]) for row in rows], [200, 300, 400])
+        self.assertEqual(rows[0]["coins"], {"bitcoin": "200"})
+
+    @override_settings(EXPORT={"CHUNK_SIZE": 1})
+    def test_export_holdings_in_chunks_without_server_side_cursor(self):
+        """Test every holding is exported once when rows are read in chunks after the last exported id."""
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(csv.reader(io.StringIO(read_content(self.client.get(EXPORT_HOLDINGS_URL)))))
+
+        self.assertEqual([row[1] for row in rows[1:]], ["bitcoin", "ethereum"])
+        self.assertEqual(len(queries), 3)
+        self.assertTrue(all("LIMIT 1" in query["sql"] for query in queries))
+
+    def test_export_errors(self):
+        """Test unsupported format, reversed range and anonymous user are rejected."""
+        self.assertEqual(
+            self.client.get(EXPORT_HOLDINGS_URL, HTTP_ACCEPT="application/json").status_code,
+            status.HTTP_406_NOT_ACCEPTABLE,
+        )
+        self.assertEqual(
+            self.client.get(
+                EXPORT_HISTORY_URL, {"start": "2026-01-04T00:00:00Z", "end": "2026-01-02T00:00:00Z"}
+            ).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(APIClient().get(EXPORT_HOLDINGS_URL).status_code, status.HTTP_401_UNAUTHORIZED)
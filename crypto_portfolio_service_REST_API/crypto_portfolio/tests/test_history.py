@@ -0,0 +1,221 @@
+"""
+Tests for portfolio value time series.
+"""
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from crypto_portfolio import prices
+from crypto_portfolio.history import get_snapshot_time, take_portfolio_snapshots
+from crypto_portfolio.models import PortfolioSnapshot, PriceQuote
+from crypto_portfolio.valuation import align_prices, get_day_grid
+from crypto_portfolio.tests.stubs import fake_get_price
+from crypto_portfolio.upstream import get_coingecko_client
+
+
+CREATE_COIN_URL = reverse("crypto_portfolio:manage-list")
+HISTORY_URL = reverse("crypto_portfolio:portfolio-history")
+VALUE_CURVE_URL = reverse("crypto_portfolio:portfolio-value-curve")
+DAY_MS = 86_400_000
+
+
+def utc(*args):
+    """Return UTC datetime."""
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+@mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+class PortfolioSnapshotTests(TestCase):
+    """Tests for recording portfolio snapshots."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_snapshots_saved_in_bulk(self, get_price):
+        """Test snapshots of all portfolios are saved with current value of coins."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        self.client.post(CREATE_COIN_URL, {"name": "ethereum", "amount": 2.0})
+        other_user = get_user_model().objects.create_user(
+            email="test_email2@example.com",
+            username="test_username2",
+            password="test_password2",
+        )
+        other_user.crypto.create(name="cardano", amount=10, worth=Decimal("2"))
+        prices.get_price_cache().clear()
+
+        with self.assertNumQueries(6):
+            portfolios = take_portfolio_snapshots(utc(2026, 1, 1))
+
+        self.assertEqual(portfolios, 2)
+        snapshot = self.user.snapshots.get()
+        self.assertEqual(snapshot.total_value, Decimal("34000"))
+        self.assertEqual(snapshot.total_profit_loss, 0)
+        self.assertEqual(Decimal(snapshot.coins["ethereum"]), Decimal("4000"))
+        self.assertEqual(other_user.snapshots.get().total_value, Decimal("3"))
+
+    @override_settings(PRICE_QUOTES={"BATCH_SIZE": 2})
+    def test_snapshot_quotes_read_from_table_and_fetched_in_batches(self, get_price):
+        """Test coins with fresh stored quote aren't fetched, the others are fetched in batches."""
+        for coin_name in ["bitcoin", "ethereum", "cardano", "tether"]:
+            self.user.crypto.create(name=coin_name, amount=1)
+        PriceQuote.objects.create(coin_id="bitcoin", price=25000, change_24h_percent=0, fetched_at=timezone.now())
+
+        take_portfolio_snapshots(utc(2026, 1, 1))
+
+        self.assertEqual(
+            [call.kwargs["ids"] for call in get_price.call_args_list], [["cardano", "ethereum"], ["tether"]]
+        )
+        self.assertEqual(Decimal(self.user.snapshots.get().coins["bitcoin"]), Decimal(25000))
+
+    def test_snapshot_command_idempotent_within_interval(self, get_price):
+        """Test snapshot taken again within the same interval is not duplicated."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+
+        call_command("snapshot_portfolios", "--once", stdout=StringIO())
+        call_command("snapshot_portfolios", "--once", stdout=StringIO())
+
+        self.assertEqual(PortfolioSnapshot.objects.count(), 1)
+
+    def test_snapshot_time_aligned_to_interval(self, get_price):
+        """Test snapshot time is start of interval."""
+        self.assertEqual(get_snapshot_time(utc(2026, 1, 1, 10, 59, 30), 3600), utc(2026, 1, 1, 10))
+
+
+class PortfolioHistoryTests(TestCase):
+    """Tests for portfolio history endpoint."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for hour, value in [(0, 100), (12, 200), (24, 300), (36, 500)]:
+            self.user.snapshots.create(
+                taken_at=utc(2026, 1, 1 + hour // 24, hour % 24),
+                total_value=value,
+                total_profit_loss=value - 100,
+                coins={"bitcoin": str(value)},
+            )
+
+    def test_history_downsampled_per_day(self):
+        """Test snapshots are averaged per day."""
+        result = self.client.get(HISTORY_URL, {"start": "2026-01-01T00:00:00Z", "end": "2026-01-03T00:00:00Z"})
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(Decimal(point["total_value"]), Decimal(point["total_profit_loss"])) for point in result.data],
+            [(Decimal(150), Decimal(50)), (Decimal(400), Decimal(300))],
+        )
+
+    def test_raw_history_in_range(self):
+        """Test raw snapshots in range contain worth of each coin."""
+        result = self.client.get(HISTORY_URL, {
+            "start": "2026-01-01T06:00:00Z",
+            "end": "2026-01-02T00:00:00Z",
+            "interval": "raw",
+        })
+
+        self.assertEqual(len(result.data), 2)
+        self.assertEqual(Decimal(result.data[0]["coins"]["bitcoin"]), Decimal(200))
+
+    def test_history_invalid_query_error(self):
+        """Test unknown interval and reversed range return error."""
+        self.assertEqual(
+            self.client.get(HISTORY_URL, {"interval": "second"}).status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.client.get(HISTORY_URL, {"start": "2026-01-02T00:00:00Z", "end": "2026-01-01T00:00:00Z"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+
+def fake_market_chart(id, vs_currency, days, **kwargs):
+    """Return daily prices of last days, newest first, falling by 1 each day back from today."""
+    grid = get_day_grid(datetime.now(dt_timezone.utc), days)
+    base = {"bitcoin": 100, "ethereum": 40}[id]
+    return {"prices": [[int(timestamp), base - day] for day, timestamp in enumerate(grid[::-1])]}
+
+
+@mock.patch.object(prices.cg, "get_coin_market_chart_by_id", side_effect=fake_market_chart)
+class PortfolioValueCurveTests(TestCase):
+    """Tests for portfolio value curve built from market charts."""
+
+    def setUp(self):
+        cache.clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.user.crypto.create(name="bitcoin", amount=Decimal("0.5"))
+        self.user.crypto.create(name="ethereum", amount=Decimal("2"))
+
+    def test_value_curve(self, get_market_chart):
+        """Test value curve is sum of coin amounts multiplied by daily prices."""
+        result = self.client.get(VALUE_CURVE_URL, {"days": 3})
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [Decimal(point["total_value"]) for point in result.data],
+            [Decimal("122.5"), Decimal(125), Decimal("127.5"), Decimal(130)],
+        )
+
+    def test_market_chart_fetched_once_per_coin_and_day(self, get_market_chart):
+        """Test market charts of all ranges are sliced from one cached chart per coin."""
+        self.client.get(VALUE_CURVE_URL, {"days": 3})
+        self.client.get(VALUE_CURVE_URL, {"days": 3})
+        result = self.client.get(VALUE_CURVE_URL, {"days": 30})
+
+        self.assertEqual(get_market_chart.call_count, 2)
+        self.assertEqual({call.kwargs["days"] for call in get_market_chart.call_args_list}, {365})
+        self.assertEqual(len(result.data), 31)
+        self.assertEqual(Decimal(result.data[0]["total_value"]), Decimal(55))
+
+    def test_refresh_market_charts_command(self, get_market_chart):
+        """Test worker warms market charts of held coins, so value curve makes no upstream call."""
+        self.user.crypto.create(name="BITCOIN ", amount=Decimal("1"))
+
+        call_command("refresh_market_charts", "--once", stdout=StringIO())
+        result = self.client.get(VALUE_CURVE_URL, {"days": 3})
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_market_chart.call_count, 2)
+
+    def test_value_curve_days_limit(self, get_market_chart):
+        """Test value curve longer than allowed returns error."""
+        result = self.client.get(VALUE_CURVE_URL, {"days": 10000})
+
+        self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_align_prices_carries_last_price_forward(self, get_market_chart):
+        """Test prices are aligned to grid with last known price carried forward."""
+        chart = [[2 * DAY_MS + 5, 3.0], [0, 1.0]]
+        grid = [0, DAY_MS, 2 * DAY_MS, 3 * DAY_MS]
+
+        self.assertEqual(align_prices(chart, grid).tolist(), [1.0, 1.0, 1.0, 3.0])
+        self.assertEqual(align_prices([[DAY_MS, 2.0]], grid).tolist(), [0.0, 2.0, 2.0, 2.0])
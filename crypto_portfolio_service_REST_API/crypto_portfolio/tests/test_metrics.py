@@ -0,0 +1,103 @@
+"""
+Tests for request profiling and metrics.
+"""
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from crypto_portfolio import prices, upstream
+from crypto_portfolio.tests.stubs import fake_get_price
+
+
+CREATE_COIN_URL = reverse("crypto_portfolio:manage-list")
+METRICS_URL = reverse("metrics")
+CREATE_USER_URL = reverse("user:create")
+
+
+def get_sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class RequestProfilingTests(TestCase):
+    """Tests for Server-Timing header and Prometheus metrics of requests."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        upstream.get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_server_timing_header(self, get_price):
+        """Test database queries and upstream calls of request are reported in Server-Timing header."""
+        result = self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+
+        self.assertEqual(result.status_code, status.HTTP_201_CREATED)
+        timing = dict(entry.strip().split(";", 1) for entry in result["Server-Timing"].split(","))
+        self.assertEqual(set(timing), {"db", "coingecko", "total"})
+        self.assertRegex(timing["db"], r'^dur=[\d.]+;desc="[1-9]\d* queries"$')
+        self.assertIn('desc="1 calls"', timing["coingecko"])
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_metrics_per_view(self, get_price):
+        """Test requests are counted per view and price lookups per source they were served from."""
+        requests = get_sample("http_request_duration_seconds_count", view="CryptocurrencyViewSet", method="GET", status="200")
+        calls = get_sample("http_request_upstream_calls_sum", view="CryptocurrencyViewSet")
+        cache_hits = get_sample("price_lookups_total", source="cache")
+
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        self.client.get(CREATE_COIN_URL)
+        result = self.client.get(METRICS_URL)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertIn(b"http_request_db_queries_bucket", result.content)
+        self.assertEqual(
+            get_sample("http_request_duration_seconds_count", view="CryptocurrencyViewSet", method="GET", status="200"),
+            requests + 1,
+        )
+        self.assertEqual(get_sample("http_request_upstream_calls_sum", view="CryptocurrencyViewSet"), calls + 1)
+        self.assertGreater(get_sample("price_lookups_total", source="cache"), cache_hits)
+
+
+class AsyncRequestProfilingTests(TestCase):
+    """Tests for profiling of requests handled by ASGI server."""
+
+    async def test_async_request_profiled(self):
+        """Test queries run by view in worker thread are reported for request handled in event loop."""
+        result = await AsyncClient().post(
+            CREATE_USER_URL,
+            {"email": "test_email@example.com", "username": "test_username", "password": "test_password"},
+        )
+
+        self.assertEqual(result.status_code, status.HTTP_201_CREATED)
+        self.assertRegex(result["Server-Timing"], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+
+class AsgiMiddlewareChainTests(SimpleTestCase):
+    """Tests for middleware chain of ASGI handler."""
+
+    @override_settings(DEBUG=True)
+    def test_middleware_chain_not_adapted(self):
+        """Test no middleware makes ASGI handler run chain in thread, so async views stay non-blocking.
+
+        Adapted handlers are logged only in debug mode.
+        """
+        with self.assertNoLogs("django.request", level="DEBUG"):
+            handler = ASGIHandler()
+
+        self.assertTrue(iscoroutinefunction(handler._middleware_chain))
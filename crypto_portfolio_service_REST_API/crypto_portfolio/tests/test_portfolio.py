@@ -0,0 +1,620 @@
+"""
+Tests for maintenance of portfolio data.
+"""
+import threading
+from decimal import Decimal
+from functools import partial
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from crypto_portfolio import portfolio, prices
+from crypto_portfolio.models import PortfolioData, PriceQuote
+from crypto_portfolio.portfolio import HoldingsSnapshot, add_coins, sell_coins, update_portfolio_data
+from crypto_portfolio.tests.stubs import RATE_LIMITED, fake_get_price
+from crypto_portfolio.upstream import get_coingecko_client
+
+
+CREATE_COIN_URL = reverse("crypto_portfolio:manage-list")
+BULK_COINS_URL = reverse("crypto_portfolio:manage-bulk")
+PORTFOLIO_URL = reverse("crypto_portfolio:portfolio")
+
+
+def detail_url(coin_id):
+    """Return url of selected coin."""
+    return reverse("crypto_portfolio:manage-detail", args=[coin_id])
+
+
+@mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+class PortfolioDataTests(TestCase):
+    """Tests for incremental PortfolioData updates."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_single_portfolio_data_row_updated_in_place(self, get_price):
+        """Test every add updates the same PortfolioData row."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        portfolio_data_id = self.user.general_data.get().id
+
+        self.client.post(CREATE_COIN_URL, {"name": "ethereum", "amount": 2.0})
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+
+        portfolio_data = self.user.general_data.get()
+        self.assertEqual(portfolio_data.id, portfolio_data_id)
+        self.assertEqual(float(portfolio_data.total_value), 64000.0)
+
+    def test_portfolio_data_updated_after_coin_removed(self, get_price):
+        """Test removing coin subtracts its worth and recalculates participation."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        self.client.post(CREATE_COIN_URL, {"name": "ethereum", "amount": 5.0})
+
+        result = self.client.delete(f"{CREATE_COIN_URL}{self.user.crypto.filter(name='bitcoin')}/")
+
+        self.assertEqual(result.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(float(self.user.general_data.get().total_value), 10000.0)
+        self.assertEqual(float(self.user.crypto.get().coin_participation_in_portfolio), 100.0)
+
+    def test_coin_removal_quotes_resolved_outside_transaction(self, get_price):
+        """Test quotes of remaining coins are fetched before removal transaction is opened."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        self.client.post(CREATE_COIN_URL, {"name": "ethereum", "amount": 5.0})
+        coin = self.user.crypto.get(name="bitcoin")
+        prices.get_price_cache().clear()
+        PriceQuote.objects.all().delete()
+        outer_atomic_blocks = len(connection.atomic_blocks)
+        atomic_blocks = []
+
+        def record_atomic_blocks(*args, **kwargs):
+            atomic_blocks.append(len(connection.atomic_blocks))
+            return fake_get_price(*args, **kwargs)
+
+        get_price.side_effect = record_atomic_blocks
+        result = self.client.delete(detail_url(coin.id))
+
+        self.assertEqual(result.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(atomic_blocks, [outer_atomic_blocks])
+        self.assertEqual(float(self.user.general_data.get().total_value), 10000.0)
+
+    def test_portfolio_data_updated_after_coin_amount_changed(self, get_price):
+        """Test changing coin amount moves total value by worth difference."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        self.client.post(CREATE_COIN_URL, {"name": "ethereum", "amount": 5.0})
+        coin = self.user.crypto.get(name="ethereum")
+
+        result = self.client.put(detail_url(coin.id), {"name": "ethereum", "amount": 10.0})
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(float(self.user.general_data.get().total_value), 50000.0)
+        self.assertEqual(PortfolioData.objects.filter(user=self.user).count(), 1)
+
+    def test_coin_amount_not_changed_when_upstream_fails(self, get_price):
+        """Test amount change failing on upstream quotes leaves coin and totals untouched."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        coin = self.user.crypto.get()
+        prices.get_price_cache().clear()
+        PriceQuote.objects.all().delete()
+        get_price.side_effect = RATE_LIMITED
+
+        result = self.client.patch(detail_url(coin.id), {"amount": 3.0})
+
+        self.assertEqual(result.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        coin.refresh_from_db()
+        self.assertEqual(coin.amount, 1)
+        self.assertEqual(coin.worth, self.user.general_data.get().total_value)
+
+
+@mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+class ConcurrentPortfolioChangesTests(TransactionTestCase):
+    """Tests for portfolio changes of the same user made by concurrent requests."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+
+    def _run_concurrently(self, *changes):
+        """Run changes in threads, each of them resolves quotes only after all of them did."""
+        barrier = threading.Barrier(len(changes), timeout=10)
+        errors = []
+
+        def get_prices_together(*args, **kwargs):
+            quotes = prices.get_prices(*args, **kwargs)
+            barrier.wait()
+            return quotes
+
+        def run(change):
+            try:
+                change()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        with mock.patch.object(portfolio, "get_prices", side_effect=get_prices_together):
+            threads = [threading.Thread(target=run, args=(change,)) for change in changes]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+
+    def test_concurrent_buys_not_lost(self, get_price):
+        """Test concurrent buys of held coin are both added to position and portfolio total."""
+        add_coins(self.user, [("bitcoin", Decimal(1))])
+
+        buy = partial(add_coins, self.user, [("bitcoin", Decimal(1))])
+        self._run_concurrently(buy, buy)
+
+        coin = self.user.crypto.get()
+        self.assertEqual(coin.amount, 3)
+        self.assertEqual(self.user.trades.count(), 3)
+        self.assertEqual(self.user.general_data.get().total_value, self.user.crypto.total_value())
+
+    def test_concurrent_buys_of_new_coin_create_single_holding(self, get_price):
+        """Test concurrent buys of coin not held yet add up in one holding."""
+        buy = partial(add_coins, self.user, [("cardano", Decimal(10))])
+        self._run_concurrently(buy, buy)
+
+        self.assertEqual(list(self.user.crypto.values_list("name", "amount")), [("cardano", 20)])
+
+    def test_concurrent_buy_and_sell(self, get_price):
+        """Test concurrent buy and sell of the same coin are both applied."""
+        add_coins(self.user, [("bitcoin", Decimal(2)), ("ethereum", Decimal(1))])
+
+        self._run_concurrently(
+            partial(add_coins, self.user, [("ethereum", Decimal(1))]),
+            partial(sell_coins, self.user, [("ethereum", Decimal("0.5"))]),
+        )
+
+        self.assertEqual(self.user.crypto.get(name="ethereum").amount, Decimal("1.5"))
+        self.assertEqual(self.user.general_data.get().total_value, self.user.crypto.total_value())
+
+
+class CryptocurrencyAggregationTests(TestCase):
+    """Tests for portfolio aggregations computed by database."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.user.crypto.create(name="bitcoin", worth=Decimal("300"))
+        self.user.crypto.create(name="ethereum", worth=Decimal("100"))
+        other_user = get_user_model().objects.create_user(
+            email="test_email2@example.com",
+            username="test_username2",
+            password="test_password2",
+        )
+        other_user.crypto.create(name="bitcoin", worth=Decimal("1000"))
+
+    def test_total_value(self):
+        """Test total value is summed by database for selected user only."""
+        self.assertEqual(self.user.crypto.total_value(), Decimal("400"))
+
+    def test_total_value_of_empty_portfolio(self):
+        """Test total value of empty portfolio is 0."""
+        self.user.crypto.all().delete()
+
+        self.assertEqual(self.user.crypto.total_value(), 0)
+
+    def test_with_participation(self):
+        """Test participation percent is annotated by database."""
+        participation = dict(
+            self.user.crypto.with_participation().values_list("name", "participation")
+        )
+
+        self.assertEqual(participation, {"bitcoin": Decimal("75.00"), "ethereum": Decimal("25.00")})
+
+
+@mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+class CoinParticipationTests(TestCase):
+    """Tests for coins participation in portfolio."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_participation_saved_with_single_update(self, get_price):
+        """Test participation of all changed coins is saved with one query."""
+        for coin_name in ["bitcoin", "ethereum", "cardano"]:
+            self.user.crypto.create(name=coin_name, amount=1, worth=Decimal("100"))
+
+        with CaptureQueriesContext(connection) as context:
+            update_portfolio_data(HoldingsSnapshot(self.user), Decimal("300"))
+
+        participation_updates = [
+            query for query in context.captured_queries
+            if "coin_participation_in_portfolio" in query["sql"] and query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(participation_updates), 1)
+        self.assertEqual(
+            set(self.user.crypto.values_list("coin_participation_in_portfolio", flat=True)),
+            {Decimal("33.33")},
+        )
+
+    def test_unchanged_participation_not_saved(self, get_price):
+        """Test coins with unchanged participation are not updated."""
+        self.user.crypto.create(name="bitcoin", amount=1, worth=Decimal("100"),
+                                coin_participation_in_portfolio=100)
+        self.user.general_data.create(total_value=Decimal("100"))
+
+        with CaptureQueriesContext(connection) as context:
+            update_portfolio_data(HoldingsSnapshot(self.user), Decimal("0"))
+
+        self.assertFalse(
+            any(query["sql"].startswith('UPDATE "crypto_portfolio_cryptocurrency"')
+                for query in context.captured_queries)
+        )
+
+    @override_settings(PORTFOLIO={"PARTICIPATION_MODE": "read_time"})
+    def test_participation_derived_at_read_time(self, get_price):
+        """Test participation is not stored and is derived from worth when holdings are listed."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        self.client.post(CREATE_COIN_URL, {"name": "ethereum", "amount": 5.0})
+
+        result = self.client.get(CREATE_COIN_URL)
+
+        participation = {coin["name"]: coin["coin_participation_in_portfolio"] for coin in result.data["results"]}
+        self.assertEqual(participation, {"bitcoin": "75.00", "ethereum": "25.00"})
+        self.assertEqual(
+            set(self.user.crypto.values_list("coin_participation_in_portfolio", flat=True)), {0}
+        )
+
+
+@mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+class BulkCoinsTests(TestCase):
+    """Tests for adding and removing many coins at once."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_add_coins(self, get_price):
+        """Test many coins are added with single upstream call and single recalculation."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        prices.get_price_cache().clear()
+        get_price.reset_mock()
+        payload = [
+            {"name": "bitcoin", "amount": 1.0},
+            {"name": "ethereum", "amount": 5.0},
+            {"name": "cardano", "amount": 100.0},
+            {"name": "cardano", "amount": 100.0},
+        ]
+
+        result = self.client.post(BULK_COINS_URL, payload, format="json")
+
+        self.assertEqual(result.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(result.data), 4)
+        self.assertEqual(get_price.call_count, 1)
+        self.assertEqual(self.user.crypto.count(), 3)
+        self.assertEqual(self.user.crypto.get(name="cardano").amount, 200)
+        self.assertEqual(self.user.general_data.get().total_value, Decimal("70060"))
+        self.assertEqual(self.user.crypto.get(name="ethereum").coin_participation_in_portfolio,
+                         Decimal("14.27"))
+
+    def test_bulk_add_negative_amount_error(self, get_price):
+        """Test no coin is added if any amount is negative."""
+        payload = [{"name": "bitcoin", "amount": 1.0}, {"name": "ethereum", "amount": -5.0}]
+
+        result = self.client.post(BULK_COINS_URL, payload, format="json")
+
+        self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.user.crypto.exists())
+
+    def test_bulk_add_unknown_coin_error(self, get_price):
+        """Test no coin is added if any of them isn't found."""
+        payload = [{"name": "bitcoin", "amount": 1.0}, {"name": "b_i_t_c_o_i_n", "amount": 5.0}]
+
+        result = self.client.post(BULK_COINS_URL, payload, format="json")
+
+        self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.user.crypto.exists())
+
+    def test_bulk_delete_coins_by_names(self, get_price):
+        """Test coins selected by names are deleted with single query and aggregates updated."""
+        self.user.crypto.create(name="ethereum", amount=5, worth=Decimal("10000"))
+        self.client.post(BULK_COINS_URL, [
+            {"name": "bitcoin", "amount": 1.0},
+            {"name": "ethereum", "amount": 5.0},
+            {"name": "cardano", "amount": 100.0},
+        ], format="json")
+
+        with CaptureQueriesContext(connection) as context:
+            result = self.client.delete(f"{BULK_COINS_URL}?names=bitcoin,cardano")
+
+        deletes = [query for query in context.captured_queries if query["sql"].startswith("DELETE")]
+        self.assertEqual(result.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(len(deletes), 1)
+        self.assertEqual(list(self.user.crypto.values_list("name", flat=True)), ["ethereum"])
+        self.assertEqual(self.user.general_data.get().total_value, Decimal("20000"))
+        self.assertEqual(self.user.crypto.get().coin_participation_in_portfolio, 100)
+
+    def test_bulk_delete_coins_by_ids(self, get_price):
+        """Test coins selected by ids sent in request body are deleted and removals logged."""
+        self.client.post(BULK_COINS_URL, [
+            {"name": "bitcoin", "amount": 1.0},
+            {"name": "ethereum", "amount": 5.0},
+        ], format="json")
+        coin_ids = list(self.user.crypto.values_list("id", flat=True))
+
+        with self.assertLogs("crypto_portfolio.views", level="INFO") as logs:
+            result = self.client.delete(BULK_COINS_URL, {"ids": coin_ids}, format="json")
+
+        self.assertEqual(result.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            sorted(record.getMessage() for record in logs.records),
+            ["Removed following coin: bitcoin", "Removed following coin: ethereum"],
+        )
+        self.assertFalse(self.user.crypto.exists())
+        self.assertEqual(self.user.general_data.get().total_value, 0)
+
+    def test_bulk_delete_without_identifiers_error(self, get_price):
+        """Test bulk delete without names and ids returns bad request status."""
+        result = self.client.delete(BULK_COINS_URL)
+
+        self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_delete_coin_by_id(self, get_price):
+        """Test coin is deleted by its id only from authenticated user portfolio."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        other_user = get_user_model().objects.create_user(
+            email="test_email2@example.com",
+            username="test_username2",
+            password="test_password2",
+        )
+        other_coin = other_user.crypto.create(name="bitcoin")
+
+        result = self.client.delete(detail_url(self.user.crypto.get().id))
+        other_result = self.client.delete(detail_url(other_coin.id))
+
+        self.assertEqual(result.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(other_result.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(self.user.crypto.exists())
+        self.assertTrue(other_user.crypto.exists())
+
+
+class ConditionalGetTests(TestCase):
+    """Tests for ETag and conditional GET of holdings."""
+
+    def setUp(self):
+        # Started here, so portfolio created below is also priced by stub.
+        patcher = mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+
+    def test_not_modified_holdings_not_read(self):
+        """Test matching If-None-Match gets 304 without reading holdings."""
+        etag = self.client.get(CREATE_COIN_URL)["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            result = self.client.get(CREATE_COIN_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(result.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(result["ETag"], etag)
+        self.assertFalse(
+            [query for query in queries.captured_queries if "crypto_portfolio_cryptocurrency" in query["sql"]]
+        )
+
+    def test_etag_changed_after_portfolio_change(self):
+        """Test every portfolio write changes ETag of holdings."""
+        etag = self.client.get(CREATE_COIN_URL)["ETag"]
+        self.client.post(CREATE_COIN_URL, {"name": "ethereum", "amount": 1.0})
+
+        result = self.client.get(CREATE_COIN_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(result.data["results"]), 2)
+        self.assertNotEqual(result["ETag"], etag)
+
+        coin_id = self.user.crypto.get(name="ethereum").id
+        self.client.delete(detail_url(coin_id))
+
+        self.assertNotEqual(self.client.get(CREATE_COIN_URL)["ETag"], result["ETag"])
+
+    def test_etag_depends_on_query_string(self):
+        """Test responses for different query strings have different ETags."""
+        etag = self.client.get(CREATE_COIN_URL)["ETag"]
+
+        result = self.client.get(CREATE_COIN_URL, {"format": "json"}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+
+
+class HoldingsListTests(TestCase):
+    """Tests for pagination, ordering and filtering of holdings."""
+
+    def setUp(self):
+        # Started here, so portfolio created below is also priced by stub.
+        patcher = mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.client.post(BULK_COINS_URL, [
+            {"name": "bitcoin", "amount": 1.0},
+            {"name": "ethereum", "amount": 5.0},
+            {"name": "cardano", "amount": 1.0},
+        ], format="json")
+
+    def test_holdings_cursor_paginated_by_ordering(self):
+        """Test pages of holdings follow requested ordering."""
+        result = self.client.get(CREATE_COIN_URL, {"ordering": "-worth", "page_size": 2})
+        next_page = self.client.get(result.data["next"])
+
+        self.assertEqual([coin["name"] for coin in result.data["results"]], ["bitcoin", "ethereum"])
+        self.assertEqual([coin["name"] for coin in next_page.data["results"]], ["cardano"])
+        self.assertIsNone(next_page.data["next"])
+
+    def test_holdings_with_equal_values_paginated_by_id(self):
+        """Test holdings with equal ordered values are neither skipped nor repeated between pages."""
+        self.user.crypto.update(worth=0, last_update=timezone.now())
+        names = list(self.user.crypto.order_by("id").values_list("name", flat=True))
+
+        for ordering in ("worth", "-last_update"):
+            pages = [self.client.get(CREATE_COIN_URL, {"ordering": ordering, "page_size": 1})]
+            while pages[-1].data["next"]:
+                pages.append(self.client.get(pages[-1].data["next"]))
+
+            self.assertEqual([coin["name"] for page in pages for coin in page.data["results"]], names)
+
+    def test_holdings_filtered_by_min_worth(self):
+        """Test holdings worth less than minimum are skipped."""
+        result = self.client.get(CREATE_COIN_URL, {"min_worth": "1", "ordering": "participation"})
+
+        self.assertEqual([coin["name"] for coin in result.data["results"]], ["ethereum", "bitcoin"])
+
+    def test_invalid_ordering_and_filter_error(self):
+        """Test unsupported ordering and invalid minimum worth return error."""
+        self.assertEqual(
+            self.client.get(CREATE_COIN_URL, {"ordering": "price"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.client.get(CREATE_COIN_URL, {"min_worth": "nan"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    @override_settings(PORTFOLIO={"PARTICIPATION_MODE": "read_time"})
+    def test_read_time_participation_not_affected_by_filters(self):
+        """Test participation derived at read time is calculated from whole portfolio."""
+        result = self.client.get(
+            CREATE_COIN_URL, {"ordering": "-participation", "min_worth": "1", "page_size": 1}
+        )
+        next_page = self.client.get(result.data["next"])
+
+        self.assertEqual(result.data["results"][0]["name"], "bitcoin")
+        self.assertEqual(result.data["results"][0]["coin_participation_in_portfolio"], "75.00")
+        self.assertEqual(next_page.data["results"][0]["name"], "ethereum")
+        self.assertEqual(next_page.data["results"][0]["coin_participation_in_portfolio"], "25.00")
+
+
+@mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+class PortfolioSummaryTests(TestCase):
+    """Tests for cached portfolio summary endpoint."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_empty_portfolio_summary(self, get_price):
+        """Test user without coins gets summary with zero values."""
+        result = self.client.get(PORTFOLIO_URL)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(result.data["total_value"]), 0)
+
+    def test_portfolio_summary_served_from_cache(self, get_price):
+        """Test repeated summary request reads only portfolio version from database."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        self.client.get(PORTFOLIO_URL)
+
+        with self.assertNumQueries(1):
+            result = self.client.get(PORTFOLIO_URL)
+
+        self.assertEqual(Decimal(result.data["total_value"]), Decimal("30000"))
+
+    def test_portfolio_summary_invalidated_by_write(self, get_price):
+        """Test summary is refreshed after portfolio change."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        etag = self.client.get(PORTFOLIO_URL)["ETag"]
+
+        self.client.post(CREATE_COIN_URL, {"name": "ethereum", "amount": 1.0})
+        result = self.client.get(PORTFOLIO_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(result.data["total_value"]), Decimal("32000"))
+        self.assertEqual(
+            self.client.get(PORTFOLIO_URL, HTTP_IF_NONE_MATCH=result["ETag"]).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+    def test_portfolio_changed_by_other_process_not_served_from_cache(self, get_price):
+        """Test summary and ETag follow version in database, not cache entry which other process didn't drop."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        etag = self.client.get(PORTFOLIO_URL)["ETag"]
+
+        # Change made by other process, which can't remove entries from local cache of this one.
+        PortfolioData.objects.filter(user=self.user).update(total_value=Decimal("32000"), version=F("version") + 1)
+        result = self.client.get(PORTFOLIO_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(result.data["total_value"]), Decimal("32000"))
+
+    def test_portfolio_summary_in_base_currency(self, get_price):
+        """Test summary is converted to base currency without recalculation or upstream call."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+        etag = self.client.get(PORTFOLIO_URL)["ETag"]
+
+        self.user.base_currency = "eur"
+        self.user.save()
+        with self.assertNumQueries(1):
+            result = self.client.get(PORTFOLIO_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(result.data["currency"], "eur")
+        self.assertEqual(Decimal(result.data["total_value"]), Decimal("27000"))
+        self.assertEqual(get_price.call_count, 1)
@@ -0,0 +1,305 @@
+"""
+Tests for the price lookup layer.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+import httpx
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from crypto_portfolio import prices
+from crypto_portfolio.models import Coin, PriceQuote
+from crypto_portfolio.tests.stubs import fake_get_price
+from crypto_portfolio.upstream import get_coingecko_client
+
+
+CREATE_COIN_URL = reverse("crypto_portfolio:manage-list")
+QUOTES_URL = reverse("crypto_portfolio:quotes")
+
+
+def fake_async_client(requests, status_code=200):
+    """Return factory of non-blocking clients answering with stubbed upstream quotes."""
+
+    def handler(request):
+        requests.append(request)
+        ids = request.url.params["ids"].split(",")
+        return httpx.Response(status_code, json=fake_get_price(ids, request.url.params["vs_currencies"]))
+
+    return lambda: httpx.AsyncClient(
+        base_url=prices.cg.api_base_url, transport=httpx.MockTransport(handler)
+    )
+
+
+class PriceLookupTests(TestCase):
+    """Tests for batched price lookup."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_get_prices_single_upstream_call(self, get_price):
+        """Test quotes of many coins are fetched with one upstream call."""
+        quotes = prices.get_prices(["bitcoin", " ETHEREUM", "cardano", "bitcoin"])
+
+        self.assertEqual(get_price.call_count, 1)
+        self.assertEqual(get_price.call_args.kwargs["ids"], ["bitcoin", "cardano", "ethereum"])
+        self.assertEqual(quotes["ethereum"], {"price_in_usd": 2000.0, "change_24h_percent": -1.25})
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_get_prices_skips_unknown_coin(self, get_price):
+        """Test unknown coin is not present in returned quotes."""
+        quotes = prices.get_prices(["bitcoin", "b_i_t_c_o_i_n"])
+
+        self.assertIn("bitcoin", quotes)
+        self.assertNotIn("b_i_t_c_o_i_n", quotes)
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_get_prices_fetches_all_currencies_at_once(self, get_price):
+        """Test quotes in all configured currencies are fetched with one call and cached."""
+        prices.get_prices(["bitcoin"])
+        quotes = prices.get_prices(["bitcoin"], "eur")
+
+        self.assertEqual(get_price.call_count, 1)
+        self.assertEqual(get_price.call_args.kwargs["vs_currencies"], "usd,eur,gbp,pln,btc")
+        self.assertEqual(quotes["bitcoin"], {"price_in_eur": Decimal(27000), "change_24h_percent": Decimal("2.4")})
+        self.assertEqual(prices.get_exchange_rate("eur"), Decimal("0.9"))
+        self.assertEqual(get_price.call_count, 1)
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_add_coin_single_upstream_call(self, get_price):
+        """Test adding coin to existing portfolio fetches all quotes at once."""
+        for coin_name in ["bitcoin", "ethereum", "cardano"]:
+            self.client.post(CREATE_COIN_URL, {"name": coin_name, "amount": 1.0})
+        prices.get_price_cache().clear()
+        PriceQuote.objects.all().delete()
+        get_price.reset_mock()
+
+        result = self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+
+        self.assertEqual(result.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(get_price.call_count, 1)
+
+
+class PriceCacheTests(TestCase):
+    """Tests for cache of upstream quotes."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        cache.clear()
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_cached_quotes_not_fetched_again(self, get_price):
+        """Test only quotes missing in cache are fetched from upstream."""
+        prices.get_prices(["bitcoin"])
+        quotes = prices.get_prices(["bitcoin", "ethereum"])
+
+        self.assertEqual(get_price.call_count, 2)
+        self.assertEqual(get_price.call_args.kwargs["ids"], ["ethereum"])
+        self.assertEqual(set(quotes), {"bitcoin", "ethereum"})
+
+    def test_local_cache_expires_after_ttl(self):
+        """Test quote is not returned after time to live passed."""
+        price_cache = prices.LocalPriceCache(ttl=10, max_size=10)
+
+        with mock.patch.object(prices.time, "monotonic", return_value=100):
+            price_cache.set_many({("bitcoin", "usd"): 1})
+        with mock.patch.object(prices.time, "monotonic", return_value=109):
+            self.assertEqual(price_cache.get_many([("bitcoin", "usd")]), {("bitcoin", "usd"): 1})
+        with mock.patch.object(prices.time, "monotonic", return_value=110):
+            self.assertEqual(price_cache.get_many([("bitcoin", "usd")]), {})
+
+    def test_local_cache_evicts_least_recently_used(self):
+        """Test least recently used quote is evicted above size limit."""
+        price_cache = prices.LocalPriceCache(ttl=60, max_size=2)
+        price_cache.set_many({("bitcoin", "usd"): 1, ("ethereum", "usd"): 2})
+        price_cache.get_many([("bitcoin", "usd")])
+        price_cache.set_many({("cardano", "usd"): 3})
+
+        cached = price_cache.get_many([("bitcoin", "usd"), ("ethereum", "usd"), ("cardano", "usd")])
+
+        self.assertEqual(set(cached), {("bitcoin", "usd"), ("cardano", "usd")})
+
+    @override_settings(PRICE_CACHE={"BACKEND": "django", "TTL": 60})
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_django_cache_backend(self, get_price):
+        """Test quotes are shared via Django cache framework."""
+        self.assertIsInstance(prices.get_price_cache(), prices.DjangoPriceCache)
+
+        prices.get_prices(["cardano"])
+        quotes = prices.get_prices(["cardano"])
+
+        self.assertEqual(get_price.call_count, 1)
+        self.assertEqual(quotes["cardano"]["price_in_usd"], Decimal("0.3"))
+
+
+class StoredPriceQuotesTests(TestCase):
+    """Tests for quotes refreshed by price worker."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_refresh_prices_command_stores_held_coins_in_batches(self, get_price):
+        """Test worker fetches distinct held coins in batches and stores their quotes."""
+        for coin_name in ["bitcoin", "BITCOIN ", "ethereum", "cardano"]:
+            self.user.crypto.create(name=coin_name)
+
+        call_command("refresh_prices", "--once", "--batch-size", "2", stdout=StringIO())
+
+        self.assertEqual(get_price.call_count, 2)
+        self.assertEqual(
+            set(PriceQuote.objects.values_list("coin_id", flat=True)),
+            {"bitcoin", "ethereum", "cardano"},
+        )
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_get_prices_reads_stored_quotes(self, get_price):
+        """Test fresh stored quote is used without upstream call."""
+        PriceQuote.objects.create(
+            coin_id="bitcoin", price=25000, change_24h_percent=1.5, fetched_at=timezone.now()
+        )
+
+        quotes = prices.get_prices(["bitcoin"])
+
+        get_price.assert_not_called()
+        self.assertEqual(quotes["bitcoin"], {"price_in_usd": 25000.0, "change_24h_percent": 1.5})
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+    def test_get_prices_refetches_outdated_stored_quotes(self, get_price):
+        """Test outdated stored quote is fetched again and updated."""
+        PriceQuote.objects.create(
+            coin_id="bitcoin",
+            price=25000,
+            change_24h_percent=1.5,
+            fetched_at=timezone.now() - timedelta(days=1),
+        )
+
+        quotes = prices.get_prices(["bitcoin"])
+
+        self.assertEqual(get_price.call_count, 1)
+        self.assertEqual(quotes["bitcoin"]["price_in_usd"], 30000.0)
+        self.assertEqual(PriceQuote.objects.get(coin_id="bitcoin", vs_currency="usd").price, 30000)
+
+
+class AsyncPriceLookupTests(TestCase):
+    """Tests for non-blocking price lookup."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.requests = []
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        Coin.objects.bulk_create([
+            Coin(coin_id=coin_id, symbol=coin_id[:3], name=coin_id.title())
+            for coin_id in ["bitcoin", "ethereum", "cardano"]
+        ])
+
+    @override_settings(PRICE_QUOTES={"BATCH_SIZE": 2})
+    async def test_aget_prices_fetches_batches_concurrently(self):
+        """Test missing quotes are fetched in batches and stored."""
+        with mock.patch.object(prices, "_async_client", fake_async_client(self.requests)):
+            quotes = await prices.aget_prices(["bitcoin", "ETHEREUM", "cardano", "b_i_t_c_o_i_n"])
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(set(quotes), {"bitcoin", "ethereum", "cardano"})
+        self.assertEqual(quotes["ethereum"], {"price_in_usd": 2000.0, "change_24h_percent": -1.25})
+        self.assertEqual(await PriceQuote.objects.filter(vs_currency="usd").acount(), 3)
+
+    async def test_aget_prices_reads_cache_and_stored_quotes(self):
+        """Test cached and stored quotes are used without upstream call."""
+        await PriceQuote.objects.acreate(
+            coin_id="bitcoin", price=25000, change_24h_percent=1.5, fetched_at=timezone.now()
+        )
+        prices.get_price_cache().set_many(
+            {("ethereum", "usd"): {"price_in_usd": Decimal(1), "change_24h_percent": Decimal(0)}}
+        )
+
+        with mock.patch.object(prices, "_async_client", fake_async_client(self.requests)):
+            quotes = await prices.aget_prices(["bitcoin", "ethereum"])
+
+        self.assertEqual(self.requests, [])
+        self.assertEqual(quotes["bitcoin"]["price_in_usd"], 25000)
+
+    def test_quotes_view(self):
+        """Test async view returns quotes of selected coins."""
+        with mock.patch.object(prices, "_async_client", fake_async_client(self.requests)):
+            result = self.client.get(QUOTES_URL, {"ids": "bitcoin,cardano"})
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            result.json()["quotes"]["cardano"], {"price_in_usd": "0.3", "change_24h_percent": "4.0"}
+        )
+
+    def test_quotes_view_in_selected_currency(self):
+        """Test quotes are returned in selected supported currency."""
+        with mock.patch.object(prices, "_async_client", fake_async_client(self.requests)):
+            result = self.client.get(QUOTES_URL, {"ids": "cardano", "vs_currency": "EUR"})
+
+        self.assertEqual(
+            result.json()["quotes"]["cardano"], {"price_in_eur": "0.27", "change_24h_percent": "3.9"}
+        )
+        self.assertEqual(
+            self.client.get(QUOTES_URL, {"ids": "cardano", "vs_currency": "xyz"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_quotes_view_errors(self):
+        """Test missing ids and unavailable external API return errors."""
+        self.assertEqual(self.client.get(QUOTES_URL).status_code, status.HTTP_400_BAD_REQUEST)
+
+        with mock.patch.object(prices, "_async_client", fake_async_client(self.requests, 429)):
+            result = self.client.get(QUOTES_URL, {"ids": "bitcoin"})
+
+        self.assertEqual(result.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_quotes_view_requires_authentication(self):
+        """Test anonymous user gets no quotes and no upstream call is made."""
+        with mock.patch.object(prices, "_async_client", fake_async_client(self.requests)):
+            result = APIClient().get(QUOTES_URL, {"ids": "bitcoin"})
+
+        self.assertEqual(result.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("WWW-Authenticate", result)
+        self.assertEqual(self.requests, [])
+
+    def test_quotes_view_skips_coins_missing_in_catalog(self):
+        """Test unknown coins aren't requested from upstream."""
+        with mock.patch.object(prices, "_async_client", fake_async_client(self.requests)):
+            result = self.client.get(QUOTES_URL, {"ids": "b_i_t_c_o_i_n,unknown"})
+            self.assertEqual(result.json()["quotes"], {})
+            self.assertEqual(self.requests, [])
+
+            result = self.client.get(QUOTES_URL, {"ids": "BITCOIN,unknown"})
+
+        self.assertEqual(set(result.json()["quotes"]), {"bitcoin"})
+        self.assertEqual([request.url.params["ids"] for request in self.requests], ["bitcoin"])
@@ -0,0 +1,222 @@
+"""
+Tests for query and upstream call budgets of API endpoints.
+"""
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from crypto_portfolio import upstream, urls as crypto_portfolio_urls
+from crypto_portfolio.benchmarks import StubCoinGeckoAPI
+from crypto_portfolio.catalog import reset_coin_search_index, sync_coin_catalog
+from crypto_portfolio.history import take_portfolio_snapshots
+from crypto_portfolio.portfolio import add_coins, sell_coins
+from crypto_portfolio.prices import get_price_cache, refresh_held_coin_quotes
+from user import urls as user_urls
+
+
+SIZES = [1, 30]
+PASSWORD = "test_password"
+
+# Upper bounds of (SQL queries, upstream calls) of single request, the same for every portfolio size.
+# Caches kept warm by workers and earlier requests are warmed up before measuring,
+# so upstream calls are made only for coins never seen before.
+BUDGETS = {
+    "user:create POST": (4, 0),
+    "user:token POST": (2, 0),
+    "user:me GET": (0, 0),
+    "user:me PATCH": (3, 0),
+    "user:logout POST": (3, 0),
+    "crypto_portfolio:manage-list GET": (2, 0),
+    "crypto_portfolio:manage-list POST": (14, 1),
+    "crypto_portfolio:manage-detail GET": (2, 0),
+    "crypto_portfolio:manage-detail PATCH": (12, 0),
+    "crypto_portfolio:manage-detail DELETE": (12, 0),
+    "crypto_portfolio:manage-bulk POST": (14, 1),
+    "crypto_portfolio:manage-bulk DELETE": (12, 0),
+    "crypto_portfolio:manage-sell POST": (12, 0),
+    "crypto_portfolio:trades-list GET": (1, 0),
+    "crypto_portfolio:trades-detail GET": (1, 0),
+    "crypto_portfolio:portfolio GET": (1, 0),
+    "crypto_portfolio:portfolio-history GET": (1, 0),
+    "crypto_portfolio:portfolio-value-curve GET": (1, 0),
+    "crypto_portfolio:portfolio-realized GET": (1, 0),
+    "crypto_portfolio:available_coins GET": (0, 0),
+    "crypto_portfolio:quotes GET": (1, 0),
+    "crypto_portfolio:export-holdings GET": (1, 0),
+    "crypto_portfolio:export-history GET": (1, 0),
+}
+
+
+class EndpointBudgetTests(TestCase):
+    """Tests for SQL queries and upstream calls of every endpoint for portfolios of different sizes."""
+
+    def setUp(self):
+        self.provider = StubCoinGeckoAPI(max(SIZES) + 20)
+        patcher = mock.patch.object(upstream, "cg", self.provider)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Budgets are measured with cached tokens, used by deployment with shared cache.
+        settings = override_settings(COINGECKO={"RATE_LIMIT": 10 ** 9}, AUTHENTICATION={"MODE": "cached_token"})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(reset_coin_search_index)
+        self.addCleanup(get_price_cache().clear)
+        get_price_cache().clear()
+
+        sync_coin_catalog()
+        reset_coin_search_index()
+
+    def _authenticate(self, client, credentials):
+        token = APIClient().post(reverse("user:token"), credentials).data
+        client.credentials(HTTP_AUTHORIZATION=f"{token.get('token_type', 'Token')} {token['token']}")
+        return client
+
+    def _get_scenarios(self, size):
+        """Return {endpoint: prepare}, prepare() sets up state and returns request to measure."""
+        credentials = {"email": f"user{size}@example.com", "username": f"user{size}", "password": PASSWORD}
+        user = get_user_model().objects.create_user(**credentials)
+        coin_ids = self.provider.coin_ids[:size]
+        add_coins(user, [(coin_id, Decimal(2)) for coin_id in coin_ids])
+        sell_coins(user, [(coin_id, Decimal(1)) for coin_id in coin_ids])
+        refresh_held_coin_quotes()
+        take_portfolio_snapshots(timezone.now())
+
+        client = self._authenticate(APIClient(), credentials)
+        anonymous = APIClient()
+        new_coin_ids = iter(self.provider.coin_ids[size:])
+        numbers = iter(range(100))
+
+        def url(name, *args):
+            return reverse(name, args=args)
+
+        def new_holding():
+            return add_coins(user, [(next(new_coin_ids), Decimal(1))])[0]
+
+        def new_user():
+            number = next(numbers)
+            return {"email": f"new{size}_{number}@example.com", "username": f"new{size}_{number}", "password": PASSWORD}
+
+        def create_user():
+            payload = new_user()
+            return lambda: anonymous.post(url("user:create"), payload)
+
+        def logout():
+            # Logout revokes all tokens of user, so other user logs out.
+            other_credentials = new_user()
+            get_user_model().objects.create_user(**other_credentials)
+            other = self._authenticate(APIClient(), other_credentials)
+            return lambda: other.post(url("user:logout"))
+
+        def remove_holding():
+            holding = new_holding()
+            return lambda: client.delete(url("crypto_portfolio:manage-detail", holding.pk))
+
+        def remove_holdings():
+            names = [new_holding().name, new_holding().name]
+            return lambda: client.delete(f"{url('crypto_portfolio:manage-bulk')}?names={','.join(names)}")
+
+        def add_holding():
+            coin_id = next(new_coin_ids)
+            return lambda: client.post(url("crypto_portfolio:manage-list"), {"name": coin_id, "amount": 1})
+
+        def add_holdings():
+            payload = [{"name": next(new_coin_ids), "amount": 1}, {"name": next(new_coin_ids), "amount": 1}]
+            return lambda: client.post(url("crypto_portfolio:manage-bulk"), payload, format="json")
+
+        holding = user.crypto.order_by("id").first()
+        trade = user.trades.order_by("id").first()
+        quotes_url = f"{url('crypto_portfolio:quotes')}?ids={','.join(coin_ids[:50])}"
+
+        return {
+            "user:create POST": create_user,
+            "user:token POST": lambda: lambda: anonymous.post(url("user:token"), credentials),
+            "user:me GET": lambda: lambda: client.get(url("user:me")),
+            "user:me PATCH": lambda: lambda: client.patch(url("user:me"), {"base_currency": "usd"}),
+            "user:logout POST": logout,
+            "crypto_portfolio:manage-list GET": lambda: lambda: client.get(url("crypto_portfolio:manage-list")),
+            "crypto_portfolio:manage-list POST": add_holding,
+            "crypto_portfolio:manage-detail GET": lambda: lambda: client.get(
+                url("crypto_portfolio:manage-detail", holding.pk)
+            ),
+            "crypto_portfolio:manage-detail PATCH": lambda: lambda: client.patch(
+                url("crypto_portfolio:manage-detail", holding.pk), {"amount": 3}
+            ),
+            "crypto_portfolio:manage-detail DELETE": remove_holding,
+            "crypto_portfolio:manage-bulk POST": add_holdings,
+            "crypto_portfolio:manage-bulk DELETE": remove_holdings,
+            "crypto_portfolio:manage-sell POST": lambda: lambda: client.post(
+                url("crypto_portfolio:manage-sell"), {"name": holding.name, "amount": "0.001"}
+            ),
+            "crypto_portfolio:trades-list GET": lambda: lambda: client.get(url("crypto_portfolio:trades-list")),
+            "crypto_portfolio:trades-detail GET": lambda: lambda: client.get(
+                url("crypto_portfolio:trades-detail", trade.pk)
+            ),
+            "crypto_portfolio:portfolio GET": lambda: lambda: client.get(url("crypto_portfolio:portfolio")),
+            "crypto_portfolio:portfolio-history GET": lambda: lambda: client.get(
+                url("crypto_portfolio:portfolio-history")
+            ),
+            "crypto_portfolio:portfolio-value-curve GET": lambda: lambda: client.get(
+                url("crypto_portfolio:portfolio-value-curve")
+            ),
+            "crypto_portfolio:portfolio-realized GET": lambda: lambda: client.get(
+                url("crypto_portfolio:portfolio-realized")
+            ),
+            "crypto_portfolio:available_coins GET": lambda: lambda: client.get(
+                url("crypto_portfolio:available_coins")
+            ),
+            "crypto_portfolio:quotes GET": lambda: lambda: client.get(quotes_url),
+            "crypto_portfolio:export-holdings GET": lambda: lambda: client.get(
+                url("crypto_portfolio:export-holdings")
+            ),
+            "crypto_portfolio:export-history GET": lambda: lambda: client.get(
+                url("crypto_portfolio:export-history"), HTTP_ACCEPT="application/x-ndjson"
+            ),
+        }
+
+    def _measure(self, size):
+        """Return {endpoint: (queries, upstream calls)} of second request to every endpoint."""
+        measured = {}
+        for endpoint, prepare in self._get_scenarios(size).items():
+            prepare()()
+            request = prepare()
+            calls = self.provider.calls
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+                if response.streaming:
+                    b"".join(response.streaming_content)
+            self.assertLess(response.status_code, 400, f"{endpoint}: {getattr(response, 'data', response)}")
+            measured[endpoint] = (len(queries), self.provider.calls - calls)
+
+        return measured
+
+    def test_every_endpoint_has_budget(self):
+        """Test budgets cover all endpoints of crypto portfolio and user API."""
+        names = {f"user:{pattern.name}" for pattern in user_urls.urlpatterns}
+        names |= {
+            f"crypto_portfolio:{pattern.name}"
+            for pattern in crypto_portfolio_urls.urlpatterns + crypto_portfolio_urls.router.urls
+            if getattr(pattern, "name", None) not in (None, "api-root")
+        }
+
+        self.assertEqual(names, {endpoint.split()[0] for endpoint in BUDGETS})
+
+    def test_endpoints_stay_within_budget_for_every_portfolio_size(self):
+        """Test queries and upstream calls of every endpoint are bounded and don't grow with portfolio size."""
+        measured = {size: self._measure(size) for size in SIZES}
+
+        for size in SIZES:
+            for endpoint, (queries, calls) in measured[size].items():
+                smallest_queries, smallest_calls = measured[SIZES[0]][endpoint]
+                with self.subTest(endpoint=endpoint, coins=size):
+                    self.assertLessEqual(queries, BUDGETS[endpoint][0], "SQL queries over budget")
+                    self.assertLessEqual(calls, BUDGETS[endpoint][1], "upstream calls over budget")
+                    self.assertLessEqual(queries, smallest_queries, "SQL queries grow with portfolio size")
+                    self.assertLessEqual(calls, smallest_calls, "upstream calls grow with portfolio size")
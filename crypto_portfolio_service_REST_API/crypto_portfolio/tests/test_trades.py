@@ -0,0 +1,203 @@
+"""
+Tests for trades ledger and position aggregates.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from crypto_portfolio import prices
+from crypto_portfolio.models import Trade
+from crypto_portfolio.portfolio import TradeError, calculate_realized_profit_loss, sell_coins
+from crypto_portfolio.tests.stubs import fake_get_price
+from crypto_portfolio.upstream import get_coingecko_client
+
+
+CREATE_COIN_URL = reverse("crypto_portfolio:manage-list")
+SELL_URL = reverse("crypto_portfolio:manage-sell")
+TRADES_URL = reverse("crypto_portfolio:trades-list")
+REALIZED_URL = reverse("crypto_portfolio:portfolio-realized")
+
+
+def detail_url(coin_id):
+    """Return url of selected coin."""
+    return reverse("crypto_portfolio:manage-detail", args=[coin_id])
+
+
+def set_price(coin_id, price):
+    """Set current USD price of coin in price cache."""
+    prices.get_price_cache().set_many(
+        {(coin_id, "usd"): {"price_in_usd": Decimal(price), "change_24h_percent": Decimal(0)}}
+    )
+
+
+@mock.patch.object(prices.cg, "get_price", side_effect=fake_get_price)
+class TradesTests(TestCase):
+    """Tests for trades recorded with portfolio changes."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_buys_recorded_with_exact_cost_basis(self, get_price):
+        """Test every added amount is recorded as buy and added to cost basis without rounding."""
+        set_price("bitcoin", "1")
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1})
+        set_price("bitcoin", "2")
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 2})
+
+        coin = self.user.crypto.get()
+        self.assertEqual(coin.cost_basis, Decimal(5))
+        self.assertEqual(coin.price, Decimal("1.666666666667"))
+        self.assertEqual(
+            list(self.user.trades.order_by("id").values_list("side", "amount", "price")),
+            [("buy", 1, 1), ("buy", 2, 2)],
+        )
+
+    def test_sell_updates_position(self, get_price):
+        """Test sold amount is taken out at average cost and realized profit is stored."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 2})
+        set_price("bitcoin", "36000")
+
+        result = self.client.post(SELL_URL, {"name": "bitcoin", "amount": "0.5"}, format="json")
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        coin = self.user.crypto.get()
+        self.assertEqual(coin.amount, Decimal("1.5"))
+        self.assertEqual(coin.cost_basis, Decimal(45000))
+        self.assertEqual(coin.realized_profit_loss, Decimal(3000))
+        self.assertEqual(self.user.general_data.get().total_value, Decimal(45000))
+        self.assertEqual(self.user.trades.latest("id").side, Trade.SELL)
+
+    def test_sell_errors(self, get_price):
+        """Test selling more than held, not held coin or non-positive amount returns error."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1})
+
+        for payload in [
+            {"name": "bitcoin", "amount": 2},
+            {"name": "ethereum", "amount": 1},
+            {"name": "bitcoin", "amount": 0},
+            {"name": "bitcoin", "amount": -1},
+        ]:
+            result = self.client.post(SELL_URL, payload, format="json")
+            self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(self.user.trades.count(), 1)
+
+    def test_sell_zero_of_fully_sold_position_rejected(self, get_price):
+        """Test selling nothing of fully sold position returns error instead of dividing by zero."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1})
+        self.client.post(SELL_URL, {"name": "bitcoin", "amount": 1}, format="json")
+
+        result = self.client.post(SELL_URL, {"name": "bitcoin", "amount": 0}, format="json")
+
+        self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.user.trades.count(), 2)
+        with self.assertRaises(TradeError):
+            sell_coins(self.user, [("bitcoin", Decimal(0))])
+
+    def test_removal_recorded_as_adjustment(self, get_price):
+        """Test removed position is closed in ledger, so it isn't matched with later sells."""
+        set_price("bitcoin", "30000")
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1})
+        self.client.delete(detail_url(self.user.crypto.get().id))
+        set_price("bitcoin", "50000")
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1})
+
+        self.client.post(SELL_URL, {"name": "bitcoin", "amount": 1}, format="json")
+
+        self.assertEqual(self.user.crypto.get().realized_profit_loss, 0)
+        self.assertEqual(calculate_realized_profit_loss(self.user, "fifo"), {"bitcoin": 0})
+        self.assertEqual(calculate_realized_profit_loss(self.user, "average"), {"bitcoin": 0})
+        self.assertEqual(
+            list(self.user.trades.order_by("id").values_list("side", "amount", "price")),
+            [("buy", 1, 30000), ("adjust", -1, 30000), ("buy", 1, 50000), ("sell", 1, 50000)],
+        )
+
+    def test_amount_correction_recorded_as_adjustment(self, get_price):
+        """Test corrected amount is added to ledger at average cost, so whole position can be sold."""
+        set_price("ethereum", "2000")
+        self.client.post(CREATE_COIN_URL, {"name": "ethereum", "amount": 2})
+        self.client.patch(detail_url(self.user.crypto.get().id), {"amount": 5})
+        set_price("ethereum", "3000")
+
+        self.client.post(SELL_URL, {"name": "ethereum", "amount": 5}, format="json")
+
+        realized = self.user.crypto.get().realized_profit_loss
+        self.assertEqual(realized, 5000)
+        self.assertEqual(calculate_realized_profit_loss(self.user, "fifo"), {"ethereum": realized})
+        self.assertEqual(calculate_realized_profit_loss(self.user, "average"), {"ethereum": realized})
+        self.assertEqual(self.user.trades.get(side=Trade.ADJUST).amount, 3)
+
+    def test_trades_listed_newest_first(self, get_price):
+        """Test trades ledger of user is listed from the newest trade."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1})
+        self.client.post(CREATE_COIN_URL, {"name": "ethereum", "amount": 1})
+
+        result = self.client.get(TRADES_URL)
+
+        self.assertEqual([trade["coin"] for trade in result.data["results"]], ["ethereum", "bitcoin"])
+
+    def test_saved_trade_cant_be_changed(self, get_price):
+        """Test trades are append only."""
+        self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1})
+        trade = self.user.trades.get()
+        trade.amount = 2
+
+        with self.assertRaises(ValueError):
+            trade.save()
+
+
+class RealizedProfitLossTests(TestCase):
+    """Tests for realized profit/loss replayed from trades."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        start = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        for day, (side, amount, price) in enumerate([
+            ("buy", 1, 100),
+            ("buy", 1, 200),
+            ("sell", "1.5", 300),
+        ]):
+            Trade.objects.create(
+                user=self.user,
+                coin="bitcoin",
+                side=side,
+                amount=Decimal(amount),
+                price=price,
+                executed_at=start + timedelta(days=day),
+            )
+
+    def test_fifo_realized_profit_loss(self):
+        """Test sells are matched with the oldest lots."""
+        self.assertEqual(calculate_realized_profit_loss(self.user, "fifo"), {"bitcoin": Decimal(250)})
+
+    def test_average_realized_profit_loss(self):
+        """Test sells are matched with average cost."""
+        self.assertEqual(calculate_realized_profit_loss(self.user, "average"), {"bitcoin": Decimal(225)})
+
+    def test_realized_profit_loss_endpoint(self):
+        """Test realized profit/loss is returned per coin and in total."""
+        result = self.client.get(REALIZED_URL, {"method": "average"})
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(Decimal(result.data["total"]), Decimal(225))
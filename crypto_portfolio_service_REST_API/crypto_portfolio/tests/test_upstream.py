@@ -0,0 +1,171 @@
+"""
+Tests for the client of external API.
+"""
+import asyncio
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+import requests
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from crypto_portfolio import prices, upstream
+from crypto_portfolio.tests.stubs import RATE_LIMITED, fake_get_price
+
+
+CREATE_COIN_URL = reverse("crypto_portfolio:manage-list")
+
+
+def server_error():
+    """Return error raised by external API client for 500 response."""
+    response = requests.Response()
+    response.status_code = 500
+    return requests.HTTPError(response=response)
+
+
+class CoinGeckoClientTests(SimpleTestCase):
+    """Tests for rate limiter, circuit breaker and single-flight of external API client."""
+
+    def setUp(self):
+        self.api = mock.Mock()
+        self.api.get_price.side_effect = fake_get_price
+        self.client = upstream.CoinGeckoClient(
+            self.api, rate_limit=60, max_wait=2, failure_threshold=2, reset_timeout=30
+        )
+
+    def test_rate_limiter_waits_and_fails_above_max_wait(self):
+        """Test calls above burst wait for their turn and fail if they would wait too long."""
+        limiter = upstream.TokenBucket(rate=1, capacity=2)
+
+        with mock.patch.object(upstream.time, "monotonic", return_value=limiter._updated):
+            self.assertEqual([limiter.reserve(max_wait=2) for _ in range(4)], [0, 0, 1, 2])
+            with self.assertRaises(upstream.UpstreamUnavailableError):
+                limiter.reserve(max_wait=2)
+
+    def test_circuit_opens_after_rate_limited_response(self):
+        """Test first 429 response opens circuit and next calls fail without upstream call."""
+        self.api.get_price.side_effect = RATE_LIMITED
+
+        with self.assertRaises(upstream.UpstreamUnavailableError):
+            self.client.get_price(ids=["bitcoin"], vs_currencies="usd")
+        with self.assertRaises(upstream.UpstreamUnavailableError) as error:
+            self.client.get_price(ids=["bitcoin"], vs_currencies="usd")
+
+        self.assertEqual(self.api.get_price.call_count, 1)
+        self.assertAlmostEqual(error.exception.retry_after, 30, places=0)
+
+    def test_circuit_opens_after_threshold_and_closes_after_trial(self):
+        """Test consecutive server errors open circuit, successful trial call after timeout closes it."""
+        self.api.get_price.side_effect = server_error()
+        for _ in range(2):
+            with self.assertRaises(upstream.UpstreamUnavailableError):
+                self.client.get_price(ids=["bitcoin"], vs_currencies="usd")
+
+        self.api.get_price.side_effect = fake_get_price
+        with self.assertRaises(upstream.UpstreamUnavailableError):
+            self.client.get_price(ids=["bitcoin"], vs_currencies="usd")
+
+        self.client.breaker._opened_at -= 30
+        self.assertIn("bitcoin", self.client.get_price(ids=["bitcoin"], vs_currencies="usd"))
+        self.assertIn("bitcoin", self.client.get_price(ids=["bitcoin"], vs_currencies="usd"))
+        self.assertEqual(self.api.get_price.call_count, 4)
+
+    def test_trial_ended_without_answer_lets_next_trial_through(self):
+        """Test trial call which was rate limited locally or cancelled doesn't keep circuit open."""
+        self.api.get_price.side_effect = RATE_LIMITED
+        with self.assertRaises(upstream.UpstreamUnavailableError):
+            self.client.get_price(ids=["bitcoin"], vs_currencies="usd")
+        self.client.breaker._opened_at -= 30
+
+        with mock.patch.object(
+            self.client.limiter, "reserve", side_effect=upstream.UpstreamUnavailableError(retry_after=1)
+        ):
+            with self.assertRaises(upstream.UpstreamUnavailableError):
+                self.client.get_price(ids=["bitcoin"], vs_currencies="usd")
+        http_client = mock.Mock(get=mock.AsyncMock(side_effect=asyncio.CancelledError))
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(self.client.aget_price(http_client, ids=["bitcoin"], vs_currencies="usd"))
+
+        self.api.get_price.side_effect = fake_get_price
+        self.assertIn("bitcoin", self.client.get_price(ids=["bitcoin"], vs_currencies="usd"))
+
+    def test_client_errors_dont_open_circuit(self):
+        """Test answered request, e.g. of unknown coin, isn't counted as upstream failure."""
+        self.api.get_coin_market_chart_by_id.side_effect = ValueError({"error": "coin not found"})
+
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                self.client.get_coin_market_chart_by_id(id="b_i_t_c_o_i_n", vs_currency="usd", days=1)
+
+        self.assertEqual(self.api.get_coin_market_chart_by_id.call_count, 3)
+
+    def test_concurrent_calls_share_in_flight_fetch(self):
+        """Test coin already being fetched by other thread isn't requested again."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_get_price(ids, vs_currencies, **kwargs):
+            started.set()
+            release.wait(5)
+            return fake_get_price(ids, vs_currencies)
+
+        self.api.get_price.side_effect = slow_get_price
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(self.client.get_price(ids=["bitcoin"], vs_currencies="usd"))
+        )
+        leader.start()
+        started.wait(5)
+
+        follower = threading.Thread(
+            target=lambda: results.append(
+                self.client.get_price(ids=["bitcoin", "ethereum"], vs_currencies="usd")
+            )
+        )
+        follower.start()
+        while self.api.get_price.call_count < 2:
+            started.wait(0.01)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(
+            [call.kwargs["ids"] for call in self.api.get_price.call_args_list], [["bitcoin"], ["ethereum"]]
+        )
+        self.assertEqual(set(results[-1]), {"bitcoin", "ethereum"})
+
+
+class UpstreamUnavailableApiTests(TestCase):
+    """Tests for API responses when external API is unavailable."""
+
+    def setUp(self):
+        prices.get_price_cache().clear()
+        upstream.get_coingecko_client().reset()
+        self.user = get_user_model().objects.create_user(
+            email="test_email@example.com",
+            username="test_username",
+            password="test_password",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        upstream.get_coingecko_client().reset()
+
+    @mock.patch.object(prices.cg, "get_price", side_effect=RATE_LIMITED)
+    def test_rate_limited_upstream_returns_503(self, get_price):
+        """Test rate limited external API is reported as unavailable, not as unknown coin."""
+        result = self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+
+        self.assertEqual(result.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(result["Retry-After"], "60")
+        self.assertFalse(self.user.crypto.exists())
+
+        result = self.client.post(CREATE_COIN_URL, {"name": "bitcoin", "amount": 1.0})
+
+        self.assertEqual(result.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(get_price.call_count, 1)
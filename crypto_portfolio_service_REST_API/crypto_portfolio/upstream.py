@@ -0,0 +1,346 @@
+"""
+Client of CoinGecko API shared by all upstream calls.
+"""
+import asyncio
+import threading
+import time
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from pycoingecko import CoinGeckoAPI
+import httpx
+import requests
+
+from .config import get_config
+from .metrics import record_upstream_call
+
+
+cg = CoinGeckoAPI()
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when external API can't be called now, it is rate limited or failing."""
+
+    def __init__(self, message="External API is unavailable.", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Limiter of calls to rate per second, with bursts up to capacity calls."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait):
+        """Take token and return seconds to wait for it.
+
+        Raise UpstreamUnavailableError without taking token if wait would be longer than max wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            wait = max((1 - self._tokens) / self.rate, 0)
+            if wait > max_wait:
+                raise UpstreamUnavailableError("External API rate limit reached.", retry_after=wait)
+            self._tokens -= 1
+
+        return wait
+
+
+class CircuitBreaker:
+    """Fail fast after upstream failures.
+
+    Circuit opens after failure threshold of consecutive failures or immediately
+    when upstream limits rate. After reset timeout single trial call is let
+    through, circuit is closed again if upstream answers it.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise UpstreamUnavailableError if circuit is open, return True if call is let through as trial."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._trial:
+                raise UpstreamUnavailableError(retry_after=max(remaining, 1))
+            self._trial = True
+            return True
+
+    def end_trial(self):
+        """Let next trial call through, when trial ended without upstream answer, e.g. it was cancelled."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        """Close circuit after upstream answered."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self, rate_limited=False):
+        """Count upstream failure and open circuit above threshold."""
+        with self._lock:
+            self._failures += 1
+            if rate_limited or self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = {}
+        self.error = None
+
+
+class SingleFlight:
+    """Calls for the same keys running concurrently in threads share one fetch."""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do_many(self, keys, fetch):
+        """Return {key: value} for selected keys.
+
+        Keys which are not in flight are fetched with single fetch(keys) call
+        returning {key: value}, keys already in flight are awaited.
+        """
+        keys = list(dict.fromkeys(keys))
+        flight = _Flight()
+        with self._lock:
+            joined = {key: self._flights[key] for key in keys if key in self._flights}
+            own_keys = [key for key in keys if key not in joined]
+            for key in own_keys:
+                self._flights[key] = flight
+
+        found = {}
+        if own_keys:
+            try:
+                flight.result = fetch(own_keys)
+            except Exception as error:
+                flight.error = error
+                raise
+            finally:
+                with self._lock:
+                    for key in own_keys:
+                        del self._flights[key]
+                flight.done.set()
+            found.update(flight.result)
+
+        for key, other in joined.items():
+            other.done.wait()
+            if other.error is not None:
+                raise other.error
+            if key in other.result:
+                found[key] = other.result[key]
+
+        return found
+
+
+class AsyncSingleFlight:
+    """Calls for the same keys running concurrently in event loop share one fetch."""
+
+    def __init__(self):
+        self._flights = {}
+
+    async def do_many(self, keys, fetch):
+        """Return {key: value} for selected keys, works like SingleFlight.do_many with awaitable fetch."""
+        keys = list(dict.fromkeys(keys))
+        joined = {key: self._flights[key] for key in keys if key in self._flights}
+        own_keys = [key for key in keys if key not in joined]
+
+        found = {}
+        if own_keys:
+            flight = asyncio.get_running_loop().create_future()
+            for key in own_keys:
+                self._flights[key] = flight
+            try:
+                flight.set_result(await fetch(own_keys))
+            except BaseException as error:
+                flight.set_exception(error)
+                # Error is raised here, it doesn't have to be retrieved by waiting calls.
+                flight.exception()
+                raise
+            finally:
+                for key in own_keys:
+                    del self._flights[key]
+            found.update(flight.result())
+
+        for key, other in joined.items():
+            result = await asyncio.shield(other)
+            if key in result:
+                found[key] = result[key]
+
+        return found
+
+
+def _get_failure_status(error):
+    """Return HTTP status of upstream failure, 0 for connection error and None if it isn't a failure."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TransportError)):
+        return 0
+    if isinstance(error, (requests.HTTPError, httpx.HTTPStatusError)) and error.response is not None:
+        status = error.response.status_code
+    elif isinstance(error, ValueError) and error.args and isinstance(error.args[0], dict):
+        # Client of external API raises JSON body of error response as ValueError.
+        status = error.args[0].get("status")
+        status = status.get("error_code") if isinstance(status, dict) else None
+    else:
+        return None
+
+    return status if status == 429 or (isinstance(status, int) and status >= 500) else None
+
+
+class CoinGeckoClient:
+    """Access to CoinGecko API limited to configured rate and guarded by circuit breaker.
+
+    Concurrent calls for the same coin share single in-flight upstream call.
+    """
+
+    def __init__(self, api, rate_limit, max_wait, failure_threshold, reset_timeout):
+        self.api = api
+        self.rate_limit = rate_limit
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._flights = SingleFlight()
+        self._async_flights = AsyncSingleFlight()
+        self.reset()
+
+    def reset(self):
+        """Refill rate limiter and close circuit breaker."""
+        self.limiter = TokenBucket(self.rate_limit / 60, self.rate_limit)
+        self.breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+
+    def _handle_error(self, error):
+        status = _get_failure_status(error)
+        if status is None:
+            # Upstream answered, e.g. coin wasn't found.
+            self.breaker.record_success()
+            raise error
+        self.breaker.record_failure(rate_limited=status == 429)
+        raise UpstreamUnavailableError(retry_after=self.breaker.reset_timeout) from error
+
+    def _call(self, method, **kwargs):
+        trial = self.breaker.before_call()
+        try:
+            time.sleep(self.limiter.reserve(self.max_wait))
+            started = time.perf_counter()
+            try:
+                result = getattr(self.api, method)(**kwargs)
+            except Exception as error:
+                record_upstream_call(method, time.perf_counter() - started, "error")
+                self._handle_error(error)
+            record_upstream_call(method, time.perf_counter() - started, "ok")
+            self.breaker.record_success()
+        finally:
+            if trial:
+                self.breaker.end_trial()
+
+        return result
+
+    async def _acall(self, http_client, path, params):
+        trial = self.breaker.before_call()
+        try:
+            await asyncio.sleep(self.limiter.reserve(self.max_wait))
+            started = time.perf_counter()
+            try:
+                response = await http_client.get(path, params=params)
+                response.raise_for_status()
+            except Exception as error:
+                record_upstream_call(path, time.perf_counter() - started, "error")
+                self._handle_error(error)
+            record_upstream_call(path, time.perf_counter() - started, "ok")
+            self.breaker.record_success()
+        finally:
+            if trial:
+                self.breaker.end_trial()
+
+        return response.json()
+
+    def _do(self, key, fetch):
+        return self._flights.do_many([key], lambda keys: {key: fetch()})[key]
+
+    def get_price(self, ids, vs_currencies, **kwargs):
+        """Return simple price response for selected coin ids, coins already being fetched are awaited."""
+        options = (vs_currencies, tuple(sorted(kwargs.items())))
+
+        def fetch(keys):
+            response = self._call(
+                "get_price", ids=[coin_id for coin_id, _ in keys], vs_currencies=vs_currencies, **kwargs
+            )
+            return {(coin_id, options): data for coin_id, data in response.items()}
+
+        found = self._flights.do_many([(coin_id, options) for coin_id in ids], fetch)
+        return {coin_id: data for (coin_id, _), data in found.items()}
+
+    async def aget_price(self, http_client, ids, vs_currencies, **kwargs):
+        """Return simple price response fetched with non-blocking HTTP client, works like get_price."""
+        options = (vs_currencies, tuple(sorted(kwargs.items())))
+
+        async def fetch(keys):
+            response = await self._acall(
+                http_client,
+                "simple/price",
+                {"ids": ",".join(coin_id for coin_id, _ in keys), "vs_currencies": vs_currencies, **kwargs},
+            )
+            return {(coin_id, options): data for coin_id, data in response.items()}
+
+        found = await self._async_flights.do_many([(coin_id, options) for coin_id in ids], fetch)
+        return {coin_id: data for (coin_id, _), data in found.items()}
+
+    def get_coins_list(self):
+        """Return list of all coins available via external API."""
+        return self._do("coins_list", lambda: self._call("get_coins_list"))
+
+    def get_coin_market_chart_by_id(self, id, vs_currency, days, **kwargs):
+        """Return market chart of coin, concurrent calls for the same chart share one fetch."""
+        return self._do(
+            ("market_chart", id, vs_currency, days, tuple(sorted(kwargs.items()))),
+            lambda: self._call("get_coin_market_chart_by_id", id=id, vs_currency=vs_currency, days=days, **kwargs),
+        )
+
+
+_coingecko_client = None
+
+
+def get_coingecko_client():
+    """Return CoinGecko client configured with COINGECKO setting."""
+    global _coingecko_client
+
+    if _coingecko_client is None:
+        config = get_config("COINGECKO")
+        _coingecko_client = CoinGeckoClient(
+            cg,
+            config["RATE_LIMIT"],
+            config["MAX_WAIT"],
+            config["FAILURE_THRESHOLD"],
+            config["RESET_TIMEOUT"],
+        )
+
+    return _coingecko_client
+
+
+@receiver(setting_changed)
+def reset_coingecko_client(setting, **kwargs):
+    """Rebuild CoinGecko client after COINGECKO setting change."""
+    global _coingecko_client
+
+    if setting == "COINGECKO":
+        _coingecko_client = None
@@ -9,10 +9,18 @@ from . import views
 
 router = DefaultRouter()
 router.register("manage", views.CryptocurrencyViewSet, basename="manage")
+router.register("trades", views.TradeViewSet, basename="trades")
 
 app_name = "crypto_portfolio"
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("portfolio/", views.PortfolioDataViewSet.as_view({"get": "retrieve"}), name="portfolio"),
+    path("portfolio/history", views.PortfolioHistoryView.as_view(), name="portfolio-history"),
+    path("portfolio/value_curve", views.PortfolioValueCurveView.as_view(), name="portfolio-value-curve"),
+    path("portfolio/realized", views.RealizedProfitLossView.as_view(), name="portfolio-realized"),
+    path("export/holdings", views.HoldingsExportView.as_view(), name="export-holdings"),
+    path("export/history", views.HistoryExportView.as_view(), name="export-history"),
     path("available_coins", views.AvailableCoinsView.as_view(), name="available_coins"),
+    path("quotes", views.QuotesView.as_view(), name="quotes"),
 ]
@@ -0,0 +1,101 @@
+"""
+Historical valuation of user portfolio from market charts of external API.
+"""
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.core.cache import caches
+from django.utils import timezone
+
+from .config import get_config
+from .models import Cryptocurrency
+from .prices import format_coin_id
+from .upstream import get_coingecko_client
+
+
+def fetch_market_chart(coin_id):
+    """Return daily [timestamp in ms, USD price] points of coin over last MAX_DAYS days, the oldest first.
+
+    Chart is fetched from external API once per coin and day.
+    """
+    config = get_config("MARKET_CHARTS")
+    cache = caches[config["CACHE_ALIAS"]]
+    cache_key = f"market_chart:{coin_id}:{timezone.now().date().isoformat()}"
+
+    prices = cache.get(cache_key)
+    if prices is None:
+        response = get_coingecko_client().get_coin_market_chart_by_id(
+            id=coin_id, vs_currency="usd", days=config["MAX_DAYS"], interval="daily"
+        )
+        prices = sorted(response["prices"], key=lambda point: point[0])
+        cache.set(cache_key, prices, timeout=config["CACHE_TTL"])
+
+    return prices
+
+
+def get_market_chart(coin_id, days):
+    """Return daily [timestamp in ms, USD price] points of coin over last days.
+
+    Points are sliced from chart of MAX_DAYS days, last point before range is
+    kept, so its price is carried forward to start of range.
+    """
+    prices = fetch_market_chart(coin_id)
+    start = int(get_day_grid(timezone.now(), days)[0])
+    first = bisect_right([point[0] for point in prices], start) - 1
+
+    return prices[max(first, 0):]
+
+
+def refresh_held_coin_market_charts():
+    """Fetch market charts of all distinct coins held in users portfolios, return number of coins."""
+    coin_names = Cryptocurrency.objects.values_list("name", flat=True).distinct()
+    coin_ids = sorted({format_coin_id(coin_name) for coin_name in coin_names})
+    for coin_id in coin_ids:
+        fetch_market_chart(coin_id)
+
+    return len(coin_ids)
+
+
+def get_day_grid(now, days):
+    """Return timestamps in ms of midnights of last days, from the oldest."""
+    today = datetime(now.year, now.month, now.day, tzinfo=dt_timezone.utc)
+    start = today - timedelta(days=days)
+    return np.arange(days + 1, dtype=np.int64) * 86_400_000 + int(start.timestamp()) * 1000
+
+
+def align_prices(chart, grid):
+    """Return prices of chart at grid timestamps, last known price is carried forward.
+
+    Points before first price of chart are 0.
+    """
+    if not chart:
+        return np.zeros(len(grid))
+
+    points = np.asarray(chart, dtype=np.float64)
+    points = points[np.argsort(points[:, 0], kind="stable")]
+    positions = np.searchsorted(points[:, 0], grid, side="right") - 1
+
+    return np.where(positions >= 0, points[np.maximum(positions, 0), 1], 0.0)
+
+
+def calculate_value_curve(user, days):
+    """Return [(time, value)] of current holdings of user at midnights of last days.
+
+    Value is product of matrix of aligned daily prices (coins x days) and vector of coin amounts.
+    """
+    amounts = {}
+    for name, amount in user.crypto.values_list("name", "amount"):
+        coin_id = format_coin_id(name)
+        amounts[coin_id] = amounts.get(coin_id, 0) + float(amount)
+
+    grid = get_day_grid(timezone.now(), days)
+    coin_ids = sorted(amounts)
+    rows = [align_prices(get_market_chart(coin_id, days), grid) for coin_id in coin_ids]
+    price_matrix = np.vstack(rows) if rows else np.zeros((0, len(grid)))
+    values = np.array([amounts[coin_id] for coin_id in coin_ids], dtype=np.float64) @ price_matrix
+
+    return [
+        (datetime.fromtimestamp(timestamp / 1000, tz=dt_timezone.utc), value)
+        for timestamp, value in zip(grid.tolist(), values.round(2).tolist())
+    ]
@@ -1,22 +1,59 @@
-from pycoingecko import CoinGeckoAPI
+import hashlib
+import logging
+import math
+from abc import ABC, abstractmethod
+from decimal import Decimal
 
-from rest_framework import viewsets, status
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views import View
+import httpx
+import requests
+
+from rest_framework import exceptions, mixins, viewsets, status
+from rest_framework.decorators import action
 from rest_framework.views import APIView
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
 from rest_framework.response import Response
 
+from user.authentication import ConfiguredAuthentication
+
 from .serializers import (
     CryptocurrencySerializer,
+    ExportQuerySerializer,
     PortfolioDataSerializer,
+    PortfolioHistoryQuerySerializer,
+    PortfolioHistorySerializer,
+    PortfolioValueCurveQuerySerializer,
+    PortfolioValuePointSerializer,
+    RealizedProfitLossQuerySerializer,
+    SellSerializer,
+    TradeSerializer,
     AvailableCoinsSerializer
 )
 
-from .models import Cryptocurrency, PortfolioData
-from user.models import User
-
+from .catalog import get_coin_search_index
+from .config import get_config
+from .export import HISTORY_FIELDS, HOLDINGS_FIELDS, iter_history, iter_holdings
+from .history import get_portfolio_history
+from .filters import HoldingsFilter, HoldingsOrderingFilter
+from .models import Coin, Cryptocurrency
+from .pagination import AvailableCoinsPagination, HoldingsCursorPagination, TradesCursorPagination
+from .renderers import CSVRenderer, NDJSONRenderer
+from .prices import aget_prices, format_coin_id, get_exchange_rate, get_vs_currencies
+from .upstream import UpstreamUnavailableError
+from .valuation import calculate_value_curve
+from .portfolio import (
+    calculate_realized_profit_loss,
+    get_portfolio_summary,
+    get_portfolio_version,
+    is_participation_stored,
+    remove_coins,
+)
 
-cg = CoinGeckoAPI()
+logger = logging.getLogger(__name__)
 
 
 def retrieve_coins_to_delete(coins_to_retrieve) -> list:
@@ -25,53 +62,379 @@ def retrieve_coins_to_delete(coins_to_retrieve) -> list:
     return [coin_name.split(': ')[1].split('>')[0] for coin_name in splitted_coins]
 
 
-class CryptocurrencyViewSet(viewsets.ModelViewSet):
-    """View for cryptocurrency management."""
+def retrieve_identifiers(request, param) -> list:
+    """Return identifiers sent as comma separated query parameter or list in request body."""
+    if param in request.query_params:
+        return [value.strip() for value in request.query_params[param].split(',') if value.strip()]
+    if hasattr(request.data, "getlist"):
+        return request.data.getlist(param)
+    if isinstance(request.data, dict):
+        values = request.data.get(param, [])
+        return values if isinstance(values, list) else [values]
+    return []
+
+
+class BaseCurrencyMixin:
+    """Money values stored in USD are represented in base currency of authenticated user.
+
+    Rate is resolved once per request from cached quotes, so currency switch
+    doesn't recalculate stored portfolio.
+    """
+
+    def get_base_currency(self):
+        """Return base currency of authenticated user."""
+        return getattr(self.request.user, "base_currency", "usd")
+
+    def get_exchange_rate(self):
+        """Return rate of USD to base currency of authenticated user."""
+        if not hasattr(self, "_exchange_rate"):
+            self._exchange_rate = get_exchange_rate(self.get_base_currency())
+        return self._exchange_rate
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["currency"] = self.get_base_currency()
+        context["exchange_rate"] = self.get_exchange_rate()
+        return context
+
+
+class PortfolioETagMixin(BaseCurrencyMixin):
+    """Conditional GET of list and retrieve actions based on user portfolio version.
+
+    Strong ETag is derived from portfolio version, base currency with its current rate,
+    requested path with query string and accepted media type. Request with matching
+    "If-None-Match" header gets 304 response without reading holdings.
+    """
+
+    portfolio_version = None
+
+    def get_portfolio_etag(self, request):
+        """Return strong ETag of response for authenticated user, version of portfolio is kept in view."""
+        self.portfolio_version = get_portfolio_version(request.user)
+        validator = ":".join([
+            str(request.user.pk),
+            str(self.portfolio_version),
+            self.get_base_currency(),
+            str(self.get_exchange_rate()),
+            str(is_participation_stored()),
+            request.get_full_path(),
+            str(request.accepted_media_type),
+        ])
+        return f'"{hashlib.sha256(validator.encode()).hexdigest()}"'
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """Return 304 if ETag sent by client is current, otherwise response of handler with ETag."""
+        etag = self.get_portfolio_etag(request)
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+class CryptocurrencyViewSet(PortfolioETagMixin, viewsets.ModelViewSet):
+    """View for cryptocurrency management.
+
+    Holdings list is cursor paginated and can be ordered with "ordering" and filtered
+    with "min_worth" query parameters.
+    """
 
     serializer_class = CryptocurrencySerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [ConfiguredAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = HoldingsCursorPagination
+    filter_backends = [HoldingsOrderingFilter, HoldingsFilter]
+    ordering = "id"
 
     def get_queryset(self):
         user = self.request.user
         queryset = Cryptocurrency.objects.filter(user=user)
+        if not is_participation_stored():
+            queryset = queryset.with_participation()
         return queryset
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """Add list of {name, amount} cryptocurrencies with single portfolio recalculation."""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["post"], url_path="sell")
+    def sell(self, request):
+        """Sell {name, amount} cryptocurrency or list of them at current price."""
+        many = isinstance(request.data, list)
+        serializer = SellSerializer(data=request.data, many=many, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        sold_coins = serializer.save()
+
+        return Response(
+            self.get_serializer(sold_coins if many else [sold_coins], many=True).data,
+            status=status.HTTP_200_OK,
+        )
+
+    @bulk.mapping.delete
+    def bulk_delete(self, request):
+        """Remove coins selected by "names" and/or "ids" with single query."""
+        try:
+            coin_names = retrieve_identifiers(request, "names")
+            coin_ids = [int(coin_id) for coin_id in retrieve_identifiers(request, "ids")]
+        except (TypeError, ValueError):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        if not coin_names and not coin_ids:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        for coin in remove_coins(request.user, coin_names, coin_ids):
+            logger.info("Removed following coin: %s", coin.name)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     def destroy(self, request, *args, **kwargs):
         user = self.request.user
+        pk = kwargs['pk']
 
         # Remove selected coin if exist in authenticated user portfolio.
-        try:
-            names_to_delete = retrieve_coins_to_delete(kwargs['pk'])
-            for coin in user.crypto.all():
-                if coin.name in names_to_delete:
-                    deleted_coin = coin.name
-                    coin.delete()
-                    print(f'[INFO] --- Removed following coin: {deleted_coin} ---')
-
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        except IndexError:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
+        if pk.isdigit():
+            removed_coins = remove_coins(user, coin_ids=[int(pk)])
+            if not removed_coins:
+                return Response(status=status.HTTP_404_NOT_FOUND)
+        else:
+            # Legacy format, string representation of coins queryset.
+            try:
+                removed_coins = remove_coins(user, coin_names=retrieve_coins_to_delete(pk))
+            except IndexError:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
 
+        for coin in removed_coins:
+            logger.info("Removed following coin: %s", coin.name)
 
-class PortfolioDataViewSet(viewsets.ModelViewSet):
-    """View for portfolio data management."""
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-    serializer_class = PortfolioDataSerializer
-    authentication_classes = [TokenAuthentication]
+
+class TradeViewSet(viewsets.ReadOnlyModelViewSet):
+    """View for ledger of authenticated user trades, the newest first."""
+
+    serializer_class = TradeSerializer
+    authentication_classes = [ConfiguredAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = TradesCursorPagination
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = PortfolioData.objects.filter(user=user)
-        return queryset
+        return self.request.user.trades.all()
 
 
-class AvailableCoinsView(APIView):
-    """View for all available coins via external API."""
+class RealizedProfitLossView(APIView):
+    """View for realized profit/loss of authenticated user replayed from trades ledger."""
+
+    authentication_classes = [ConfiguredAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        query = RealizedProfitLossQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        method = query.validated_data["method"]
+        realized = calculate_realized_profit_loss(request.user, method)
+
+        return Response(
+            {
+                "method": method,
+                "total": str(sum(realized.values(), Decimal(0))),
+                "coins": {coin: str(value) for coin, value in realized.items()},
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class PortfolioDataViewSet(PortfolioETagMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """View for summary of authenticated user portfolio, served from per user cache entry."""
+
+    serializer_class = PortfolioDataSerializer
+    authentication_classes = [ConfiguredAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        return get_portfolio_summary(self.request.user, self.portfolio_version)
+
+
+class PortfolioHistoryView(APIView):
+    """View for value of authenticated user portfolio over time.
+
+    Snapshots between "start" and "end" are averaged by database per "interval"
+    (hour, day, week or month), "raw" returns snapshots with worth of each coin.
+    """
+
+    authentication_classes = [ConfiguredAuthentication]
+    permission_classes = [IsAuthenticated]
 
     def get(self, request, format=None):
-        available_coins = [coin['name'] for coin in cg.get_coins_list()]
-        serializer = AvailableCoinsSerializer({'available_coins': available_coins})
+        query = PortfolioHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        history = get_portfolio_history(request.user, **query.validated_data)
+        serializer = PortfolioHistorySerializer(history, many=True)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class PortfolioValueCurveView(APIView):
+    """View for value of current holdings of authenticated user over last "days" days.
+
+    Daily prices come from market charts of external API, cached per coin and day.
+    """
+
+    authentication_classes = [ConfiguredAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        query = PortfolioValueCurveQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        try:
+            curve = calculate_value_curve(request.user, query.validated_data["days"])
+        except (requests.RequestException, ValueError):
+            return Response(
+                {"detail": "External API is unavailable."}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        serializer = PortfolioValuePointSerializer(
+            [{"time": time, "total_value": value} for time, value in curve], many=True
+        )
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ExportView(APIView, ABC):
+    """Base view streaming rows of authenticated user data as CSV or NDJSON, selected by Accept header.
+
+    Rows are read from database in chunks and rendered one by one, so memory
+    use doesn't grow with their number.
+    """
+
+    authentication_classes = [ConfiguredAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+    fields = []
+    filename = "export"
+
+    @abstractmethod
+    def get_rows(self, request):
+        """Return iterator of rows, tuples of values of fields."""
+
+    def get(self, request, format=None):
+        rows = self.get_rows(request)
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(self.fields, rows), content_type=f"{renderer.media_type}; charset={renderer.charset}"
+        )
+        response["Content-Disposition"] = f'attachment; filename="{self.filename}.{renderer.format}"'
+
+        return response
+
+
+class HoldingsExportView(ExportView):
+    """View for export of all authenticated user holdings, money values in USD."""
+
+    fields = HOLDINGS_FIELDS
+    filename = "holdings"
+
+    def get_rows(self, request):
+        return iter_holdings(request.user)
+
+
+class HistoryExportView(ExportView):
+    """View for export of authenticated user portfolio snapshots, optionally between "start" and "end"."""
+
+    fields = HISTORY_FIELDS
+    filename = "history"
+
+    def get_rows(self, request):
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return iter_history(request.user, **query.validated_data)
+
+
+class AvailableCoinsView(APIView):
+    """View for all available coins via external API.
+
+    Coins are served from local catalog synchronized by "sync_coins" worker.
+    Optional "q" parameter selects coins which id, symbol or name starts with
+    or contains it, prefix matches are returned first.
+    """
+    pagination_class = AvailableCoinsPagination
+
+    def get(self, request, format=None):
+        coins = get_coin_search_index().search(request.query_params.get("q", ""))
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(coins, request, view=self)
+        serializer = AvailableCoinsSerializer({'available_coins': [name for _, _, name in page]})
+
+        return paginator.get_paginated_response(serializer.data['available_coins'])
+
+
+def get_authenticated_user(request):
+    """Return user authenticated with configured authentication, None for anonymous or invalid credentials."""
+    try:
+        user = Request(request, authenticators=[ConfiguredAuthentication()]).user
+    except exceptions.AuthenticationFailed:
+        return None
+    return user if user.is_authenticated else None
+
+
+class QuotesView(View):
+    """Async view for current quotes of selected coins, e.g. "?ids=bitcoin,ethereum&vs_currency=eur".
+
+    Quotes are in USD unless other supported "vs_currency" is selected. Only
+    authenticated users get quotes, and only of coins in the local catalog, so
+    requests can't spend shared upstream rate limit on unknown coins. Missing
+    quotes are fetched with non-blocking client, so under ASGI server one process
+    keeps many upstream requests in flight.
+    """
+
+    async def get(self, request):
+        if await sync_to_async(get_authenticated_user)(request) is None:
+            response = JsonResponse(
+                {"detail": "Authentication credentials were not provided or are invalid."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+            response["WWW-Authenticate"] = ConfiguredAuthentication().authenticate_header(request)
+            return response
+
+        coin_ids = [format_coin_id(coin_id) for coin_id in request.GET.get("ids", "").split(",") if coin_id.strip()]
+        max_coins = get_config("PRICE_QUOTES")["BATCH_SIZE"]
+        if not coin_ids or len(coin_ids) > max_coins:
+            return JsonResponse(
+                {"ids": f"Between 1 and {max_coins} comma separated coin ids are required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        vs_currency = request.GET.get("vs_currency", "usd").lower()
+        if vs_currency not in get_vs_currencies():
+            return JsonResponse(
+                {"vs_currency": f"One of {', '.join(get_vs_currencies())} is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Coins missing in catalog aren't looked up, they are never cached, so every request would reach upstream.
+        coin_ids = [
+            coin_id async for coin_id in Coin.objects.filter(coin_id__in=coin_ids).values_list("coin_id", flat=True)
+        ]
+        try:
+            quotes = await aget_prices(coin_ids, vs_currency)
+        except UpstreamUnavailableError as error:
+            response = JsonResponse({"detail": str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            if error.retry_after is not None:
+                response["Retry-After"] = str(math.ceil(error.retry_after))
+            return response
+        except httpx.HTTPError:
+            return JsonResponse(
+                {"detail": "External API is unavailable."}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        return JsonResponse({"quotes": quotes})
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,7 +45,27 @@ INSTALLED_APPS = [
     "crypto_portfolio"
 ]
 
+# Messages of project apps are written to console from LOG_LEVEL level, e.g. removed coins at INFO.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "simple": {"format": "[{levelname}] --- {message} ---", "style": "{"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "simple"},
+    },
+    "loggers": {
+        app: {"handlers": ["console"], "level": os.environ.get("LOG_LEVEL", "INFO")}
+        for app in ["crypto_portfolio", "user"]
+    },
+}
+
+# Wall time, database queries and CoinGecko calls of every request are sent in Server-Timing header
+# and aggregated per view at /metrics in Prometheus format. With several server processes, e.g. gunicorn
+# workers, set PROMETHEUS_MULTIPROC_DIR environment variable to empty directory shared by them.
 MIDDLEWARE = [
+    "crypto_portfolio.middleware.RequestProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -77,17 +99,26 @@ WSGI_APPLICATION = "crypto_portfolio_service_REST_API.wsgi.application"
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
 # DB configuration for local container execution and Jenkins container execution (docker-compose.yml adjustment needed)
+# Connection parameters can be overridden with DB_* environment variables, e.g. to connect
+# through "pgbouncer" pool from docker-compose. Connections are kept open for DB_CONN_MAX_AGE
+# seconds and checked before reuse. Transaction pooling requires DB_DISABLE_SERVER_SIDE_CURSORS=1.
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
-        "NAME": "postgres",
-        "USER": "postgres",
-        "PASSWORD": "postgres",
-        "HOST": "localhost",   # set 'localhost' for Jenkins container execution or 'db' for local container execution
-        "PORT": 5432    # default postgres port
+        "NAME": os.environ.get("DB_NAME", "postgres"),
+        "USER": os.environ.get("DB_USER", "postgres"),
+        "PASSWORD": os.environ.get("DB_PASSWORD", "postgres"),
+        "HOST": os.environ.get("DB_HOST", "localhost"),   # set 'localhost' for Jenkins container execution or 'db' for local container execution
+        "PORT": int(os.environ.get("DB_PORT", 5432)),    # default postgres port
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),  # seconds
+        "CONN_HEALTH_CHECKS": True,
+        "DISABLE_SERVER_SIDE_CURSORS": os.environ.get("DB_DISABLE_SERVER_SIDE_CURSORS", "0") == "1",
     }
 }
 
+# Redis server of cache shared by all processes, e.g. "redis://redis:6379/0".
+REDIS_URL = os.environ.get("REDIS_URL")
+
 # DB config for local debugging and execution
 # DATABASES = {
 #     "default": {
@@ -141,7 +172,119 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {"DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
                   "DEFAULT_AUTHENTICATION_CLASSES": (
-                              "rest_framework.authentication.TokenAuthentication",)
+                              "user.authentication.ConfiguredAuthentication",),
+                  "EXCEPTION_HANDLER": "crypto_portfolio.exceptions.exception_handler",
                   }
 
 AUTH_USER_MODEL = "user.User"
+
+# API authentication.
+# MODE "token" resolves every token with database query, "cached_token" keeps token to user
+# resolution in CACHES[CACHE_ALIAS] for CACHE_TTL seconds (removed on logout and user change),
+# "jwt" issues short-lived JWTs ("Bearer" header) which are verified without token lookup.
+# Cached tokens are used only with shared cache, so revoked token is rejected by all processes.
+AUTHENTICATION = {
+    "MODE": "cached_token" if REDIS_URL else "token",
+    "CACHE_TTL": 300,  # seconds
+    "CACHE_ALIAS": "default",
+}
+
+SIMPLE_JWT = {
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
+    "AUTH_HEADER_TYPES": ("Bearer",),
+}
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# With REDIS_URL set, "default" cache is shared by all processes (API workers and background
+# workers), otherwise it is kept in memory of each process.
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Cache of CoinGecko quotes keyed by coin id and vs currency.
+# BACKEND "local" keeps quotes per process with LRU eviction above MAX_SIZE entries,
+# "django" shares them between processes using CACHES[CACHE_ALIAS].
+PRICE_CACHE = {
+    "BACKEND": "local",
+    "TTL": 60,  # seconds
+    "MAX_SIZE": 1024,
+    "CACHE_ALIAS": "default",
+}
+
+# Access to CoinGecko API, shared by all upstream calls of process. Calls are limited to
+# RATE_LIMIT per minute (set to upstream quota divided by number of processes), call which
+# would wait for its turn longer than MAX_WAIT seconds fails. After FAILURE_THRESHOLD consecutive
+# 5xx responses or connection errors, or after first 429 response, calls fail fast for
+# RESET_TIMEOUT seconds. Unavailable external API is reported with 503 response.
+COINGECKO = {
+    "RATE_LIMIT": 30,  # calls per minute
+    "MAX_WAIT": 5,  # seconds
+    "FAILURE_THRESHOLD": 3,
+    "RESET_TIMEOUT": 60,  # seconds
+}
+
+# Quotes stored in PriceQuote table by "refresh_prices" worker, fetched in batches of BATCH_SIZE
+# coins every REFRESH_INTERVAL seconds. Request handlers use stored quotes not older than MAX_AGE.
+# Every upstream call fetches quotes in all VS_CURRENCIES, which are also base currencies available
+# to users. Rate of USD to base currency is derived from quotes of RATE_REFERENCE_COIN.
+PRICE_QUOTES = {
+    "REFRESH_INTERVAL": 60,  # seconds
+    "BATCH_SIZE": 250,
+    "MAX_AGE": 300,  # seconds
+    "VS_CURRENCIES": ["usd", "eur", "gbp", "pln", "btc"],
+    "RATE_REFERENCE_COIN": "bitcoin",
+}
+
+# Portfolio calculations.
+# PARTICIPATION_MODE "stored" saves coins participation in portfolio on every write,
+# "read_time" derives it from worth and total value when holdings are read.
+# Portfolio summary is cached per user and portfolio version in CACHES[CACHE_ALIAS] for
+# SUMMARY_CACHE_TTL seconds, version is read from database on every request.
+PORTFOLIO = {
+    "PARTICIPATION_MODE": "stored",
+    "SUMMARY_CACHE_TTL": 60,  # seconds
+    "CACHE_ALIAS": "default",
+}
+
+# Value of all users portfolios recorded by "snapshot_portfolios" worker every INTERVAL seconds,
+# snapshots are saved in batches of BATCH_SIZE.
+PORTFOLIO_SNAPSHOTS = {
+    "INTERVAL": 60 * 60,  # seconds
+    "BATCH_SIZE": 1000,
+}
+
+# Holdings and history exports are streamed row by row, rows are read from database CHUNK_SIZE
+# at a time with separate queries, so streams keep no server-side cursor or transaction open.
+EXPORT = {
+    "CHUNK_SIZE": 2000,
+}
+
+# Daily market charts of held coins used for portfolio value curve, fetched for MAX_DAYS days
+# once per coin and day and cached in CACHES[CACHE_ALIAS], shorter curves are sliced from them.
+# "refresh_market_charts" worker warms charts of all held coins every REFRESH_INTERVAL seconds
+# (shared with API processes when CACHE_ALIAS is "default" cache in Redis, i.e. REDIS_URL is set).
+MARKET_CHARTS = {
+    "MAX_DAYS": 365,
+    "CACHE_TTL": 24 * 60 * 60,  # seconds
+    "CACHE_ALIAS": "default",
+    "REFRESH_INTERVAL": 60 * 60,  # seconds
+}
+
+# Catalog of available coins synchronized by "sync_coins" worker every SYNC_INTERVAL seconds.
+# Search index of catalog is kept per process and rebuilt from database after INDEX_TTL seconds.
+COIN_CATALOG = {
+    "SYNC_INTERVAL": 24 * 60 * 60,  # seconds
+    "INDEX_TTL": 300,  # seconds
+}
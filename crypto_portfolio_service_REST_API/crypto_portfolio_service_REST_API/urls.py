@@ -21,6 +21,8 @@ from drf_spectacular.views import (
 from django.contrib import admin
 from django.urls import path, include
 
+from crypto_portfolio.metrics import metrics_view
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -32,4 +34,5 @@ urlpatterns = [
         name="api-docs",
     ),
     path("crypto/", include("crypto_portfolio.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
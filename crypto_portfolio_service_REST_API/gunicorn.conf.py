@@ -0,0 +1,29 @@
+"""
+Gunicorn configuration of production server.
+
+Run from project folder: gunicorn crypto_portfolio_service_REST_API.wsgi
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+# Threaded workers report to arbiter while requests are handled, so timeout restarts only hung workers
+# and doesn't cut long streamed exports, as it would with sync workers.
+worker_class = "gthread"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+
+# Restart workers periodically, so leaked memory doesn't grow without limit.
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = "-"
+
+
+def child_exit(server, worker):
+    """Drop live metrics of exited worker, when metrics are collected from PROMETHEUS_MULTIPROC_DIR."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "user"
+
+    def ready(self):
+        # Register receivers invalidating cached authentication.
+        from . import authentication  # noqa: F401
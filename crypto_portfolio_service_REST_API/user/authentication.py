@@ -0,0 +1,127 @@
+"""
+Authentication of API requests.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from rest_framework import authentication
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from crypto_portfolio.config import get_config
+
+
+def _get_cache():
+    return caches[get_config("AUTHENTICATION")["CACHE_ALIAS"]]
+
+
+def _token_cache_key(key):
+    return f"auth_token:{key}"
+
+
+def _user_cache_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+class CachedTokenAuthentication(authentication.TokenAuthentication):
+    """Token authentication with token and its user kept in cache.
+
+    Cached entry is removed when token is deleted or its user is saved, cache
+    must be shared by all processes, so removal reaches each of them.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = _get_cache()
+        token = cache.get(_token_cache_key(key))
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(_token_cache_key(key), token, timeout=get_config("AUTHENTICATION")["CACHE_TTL"])
+
+        return (token.user, token)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Authentication with short-lived JWT, user is resolved from cache instead of database."""
+
+    def get_user(self, validated_token):
+        cache = _get_cache()
+        cache_key = _user_cache_key(validated_token.get(jwt_settings.USER_ID_CLAIM))
+        user = cache.get(cache_key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(cache_key, user, timeout=get_config("AUTHENTICATION")["CACHE_TTL"])
+
+        return user
+
+
+AUTHENTICATION_MODES = {
+    "token": authentication.TokenAuthentication,
+    "cached_token": CachedTokenAuthentication,
+    "jwt": CachedJWTAuthentication,
+}
+
+
+class ConfiguredAuthentication(authentication.BaseAuthentication):
+    """Authentication selected with AUTHENTICATION["MODE"] setting."""
+
+    def get_backend(self):
+        """Return authentication class instance of configured mode."""
+        return AUTHENTICATION_MODES[get_config("AUTHENTICATION")["MODE"]]()
+
+    def authenticate(self, request):
+        return self.get_backend().authenticate(request)
+
+    def authenticate_header(self, request):
+        return self.get_backend().authenticate_header(request)
+
+
+class ConfiguredAuthenticationScheme(OpenApiAuthenticationExtension):
+    """API documentation of authentication selected with AUTHENTICATION["MODE"] setting."""
+
+    target_class = ConfiguredAuthentication
+    name = "tokenAuth"
+
+    def get_security_definition(self, auto_schema):
+        if get_config("AUTHENTICATION")["MODE"] == "jwt":
+            return {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}
+
+        return {
+            "type": "apiKey",
+            "in": "header",
+            "name": "Authorization",
+            "description": 'Token-based authentication with required prefix "Token"',
+        }
+
+
+def issue_token(user):
+    """Return response data with token of configured mode for authenticated user."""
+    if get_config("AUTHENTICATION")["MODE"] == "jwt":
+        return {"token": str(AccessToken.for_user(user)), "token_type": jwt_settings.AUTH_HEADER_TYPES[0]}
+
+    token, created = Token.objects.get_or_create(user=user)
+    return {"token": token.key}
+
+
+def revoke_tokens(user):
+    """Delete authentication token of user. JWT can't be revoked and expires after its lifetime."""
+    Token.objects.filter(user=user).delete()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Remove cached authentication of user after it was changed, e.g. after password change."""
+    cache = _get_cache()
+    cache.delete(_user_cache_key(instance.pk))
+    token_keys = Token.objects.filter(user=instance).values_list("key", flat=True)
+    cache.delete_many([_token_cache_key(key) for key in token_keys])
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    """Remove cached authentication of deleted token, e.g. after logout."""
+    _get_cache().delete(_token_cache_key(instance.key))
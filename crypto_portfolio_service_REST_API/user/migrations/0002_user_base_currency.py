@@ -0,0 +1,18 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='base_currency',
+            field=models.CharField(default='usd', max_length=10),
+        ),
+    ]
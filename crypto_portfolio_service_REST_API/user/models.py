@@ -37,6 +37,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     username = models.CharField(max_length=15, unique=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Currency in which portfolio values are presented, values are stored in USD.
+    base_currency = models.CharField(max_length=10, default="usd")
 
     objects = UserManager()
 
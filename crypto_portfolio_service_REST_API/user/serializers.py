@@ -6,15 +6,26 @@ from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from crypto_portfolio.prices import get_vs_currencies
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
 
     class Meta:
         model = get_user_model()
-        fields = ["email", "username", "password"]
+        fields = ["email", "username", "password", "base_currency"]
         extra_kwargs = {"password": {"write_only": True, "min_length": 6}}
 
+    def validate_base_currency(self, value):
+        """Validate base currency is one of currencies in which quotes are fetched."""
+        value = value.lower().strip()
+        if value not in get_vs_currencies():
+            raise serializers.ValidationError(
+                _("Base currency must be one of: %s.") % ", ".join(get_vs_currencies())
+            )
+        return value
+
     def create(self, validated_data):
         """Create and return a user with encrypted password."""
         return get_user_model().objects.create_user(**validated_data)
@@ -1,17 +1,22 @@
 """
 Tests for the user API.
 """
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from user.authentication import CachedTokenAuthentication
+
 
 TOKEN_URL = reverse("user:token")
 CREATE_USER_URL = reverse("user:create")
 ME_URL = reverse("user:me")
+LOGOUT_URL = reverse("user:logout")
 PAYLOAD = {
     "email": "test_email@example.com",
     "username": "test_username",
@@ -113,7 +118,8 @@ class PrivateUserApiTests(TestCase):
 
         self.assertEqual(result.status_code, status.HTTP_200_OK)
         self.assertEqual(
-            result.data, {"email": self.user.email, "username": self.user.username}
+            result.data,
+            {"email": self.user.email, "username": self.user.username, "base_currency": "usd"},
         )
 
     def test_post_me_not_allowed(self):
@@ -136,3 +142,86 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.email, payload["email"])
         self.assertTrue(self.user.check_password(payload["password"]))
         self.assertEqual(result.status_code, status.HTTP_200_OK)
+
+    def test_update_base_currency(self):
+        """Test base currency is updated only to one of supported currencies."""
+        result = self.client.patch(ME_URL, {"base_currency": "EUR"})
+        self.user.refresh_from_db()
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user.base_currency, "eur")
+
+        result = self.client.patch(ME_URL, {"base_currency": "xyz"})
+
+        self.assertEqual(result.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AuthenticationModeTests(TestCase):
+    """Test cached token and JWT authentication modes."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(**PAYLOAD)
+        self.client = APIClient()
+
+    def authenticate(self):
+        """Obtain token and set it as credentials of client."""
+        result = self.client.post(TOKEN_URL, PAYLOAD)
+        prefix = result.data.get("token_type", "Token")
+        self.client.credentials(HTTP_AUTHORIZATION=f"{prefix} {result.data['token']}")
+
+    @override_settings(AUTHENTICATION={"MODE": "cached_token"})
+    def test_cached_token_resolved_without_query(self):
+        """Test token is resolved from cache after first request."""
+        self.authenticate()
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            result = self.client.get(ME_URL)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+
+    def test_cached_token_authentication_returns_token(self):
+        """Test cached token authentication returns Token as auth, like TokenAuthentication."""
+        token = Token.objects.create(user=self.user)
+
+        for _ in range(2):
+            user, auth = CachedTokenAuthentication().authenticate_credentials(token.key)
+            self.assertEqual(user, self.user)
+            self.assertIsInstance(auth, Token)
+            self.assertEqual(auth.key, token.key)
+
+    @override_settings(AUTHENTICATION={"MODE": "cached_token"})
+    def test_logout_revokes_cached_token(self):
+        """Test cached token can't be used after logout."""
+        self.authenticate()
+        self.client.get(ME_URL)
+
+        result = self.client.post(LOGOUT_URL)
+
+        self.assertEqual(result.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTHENTICATION={"MODE": "cached_token"})
+    def test_password_change_invalidates_cached_token(self):
+        """Test cached user is read again after password change."""
+        self.authenticate()
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {"password": "new_password"})
+
+        with self.assertNumQueries(1):
+            result = self.client.get(ME_URL)
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTHENTICATION={"MODE": "jwt"})
+    def test_jwt_issued_and_verified(self):
+        """Test JWT is issued for valid credentials and accepted without token lookup."""
+        self.authenticate()
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            result = self.client.get(ME_URL)
+
+        self.assertEqual(result.status_code, status.HTTP_200_OK)
+        self.assertEqual(result.data["email"], PAYLOAD["email"])
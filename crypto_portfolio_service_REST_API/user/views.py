@@ -1,10 +1,13 @@
 """
 Views for the user API.
 """
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from .authentication import ConfiguredAuthentication, issue_token, revoke_tokens
 from .serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -15,17 +18,35 @@ class CreateUserView(generics.CreateAPIView):
 
 
 class CreateTokenView(ObtainAuthToken):
-    """Create a new authentication token for user."""
+    """Create a new authentication token for user, token type depends on authentication mode."""
 
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(issue_token(serializer.validated_data["user"]))
+
+
+class LogoutView(APIView):
+    """Revoke authentication token of authenticated user."""
+
+    authentication_classes = [ConfiguredAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        revoke_tokens(request.user)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
 
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [ConfiguredAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):